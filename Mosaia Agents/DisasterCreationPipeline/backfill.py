@@ -0,0 +1,284 @@
+import os
+import sys
+import time
+import json
+import argparse
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import boto3
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from checkpoints import _write_json_atomic
+from amounts import parse_amount, extract_labeled_amount, format_amount
+
+# Load environment variables
+load_dotenv()
+
+EVENTS_TABLE_NAME = "gods-hand-events"
+
+
+def _normalize_amount(item):
+    """Rewrite estimated_amount_required in the canonical plain-decimal form"""
+    stored = item.get("estimated_amount_required")
+    if stored in (None, "Unknown"):
+        return None
+    amount = parse_amount(stored)
+    if amount is None:
+        return {"estimated_amount_required": "Unknown"}
+    normalized = format_amount(amount)
+    if normalized == stored:
+        return None
+    return {"estimated_amount_required": normalized}
+
+
+def _reanalyze(item):
+    """Rerun bbox, weather and analysis agents and take the new AMOUNT: estimate"""
+    # Imported lazily so the cheap stages do not need the agent keys
+    from main import fetch_bbox, fetch_weather, fetch_analysis
+    from llm_budget import LLM_USAGE
+
+    title = item.get("title", "")
+    description = item.get("description", "")
+    read_more = item.get("source", "")
+    bbox_output = fetch_bbox(title, description, read_more, LLM_USAGE)
+    weather_data = fetch_weather(bbox_output, LLM_USAGE)
+    analysis_output = fetch_analysis(title, description, read_more, weather_data, LLM_USAGE)
+
+    amount = extract_labeled_amount(analysis_output)
+    if amount is None:
+        print(f"[BACKFILL] No amount in new analysis for {item['id']}, keeping the old one")
+        return None
+    return {
+        "estimated_amount_required": format_amount(amount),
+        "rescored_at": datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    }
+
+
+# Stages take a row and return the attributes to change, or None to leave it alone
+STAGES = {
+    "normalize-amount": _normalize_amount,
+    "reanalyze": _reanalyze,
+}
+
+
+def load_stage(name):
+    """A built-in stage name or a "module:function" path"""
+    if name in STAGES:
+        return STAGES[name]
+    if ":" not in name:
+        raise ValueError(f"Unknown stage '{name}'. Built-in stages: {', '.join(STAGES)}")
+    module_name, func_name = name.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _dynamodb_resource():
+    # boto3 resources are not thread-safe, so every segment gets its own session
+    return boto3.session.Session().resource(
+        'dynamodb',
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION")
+    )
+
+
+class BackfillProgress:
+    """Per-segment LastEvaluatedKey and counters, persisted after every page"""
+
+    def __init__(self, path, table_name, stage_name, total_segments):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+            expected = (table_name, stage_name, total_segments)
+            found = (self.data["table"], self.data["stage"], self.data["total_segments"])
+            if found != expected:
+                raise ValueError(f"Checkpoint {path} was written for {found}, not {expected}")
+            print(f"[BACKFILL] Resuming from {path}")
+        if self.data is None:
+            self.data = {
+                "table": table_name,
+                "stage": stage_name,
+                "total_segments": total_segments,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "segments": {}
+            }
+
+    def segment(self, segment):
+        with self._lock:
+            state = {"last_key": None, "done": False, "scanned": 0, "changed": 0, "conflicts": 0, "failed_ids": []}
+            state.update(self.data["segments"].get(str(segment), {}))
+            return state
+
+    def update(self, segment, state):
+        with self._lock:
+            # Rows that failed and have not succeeded on a retry since
+            state["failed"] = len(state["failed_ids"])
+            self.data["segments"][str(segment)] = state
+            self.data["updated_at"] = datetime.now(timezone.utc).isoformat()
+            if self.path:
+                _write_json_atomic(self.path, self.data)
+
+    def totals(self):
+        with self._lock:
+            segments = self.data["segments"].values()
+            return {key: sum(state.get(key, 0) for state in segments)
+                    for key in ("scanned", "changed", "failed", "conflicts")}
+
+
+def run_segment(segment, args, stage, executor, progress):
+    """
+    Scan one segment page by page, run the stage over each page and write the
+    changes back. Rows whose stage call failed are kept in the checkpoint and
+    retried first when the segment is run again.
+    """
+    state = progress.segment(segment)
+    if state["done"] and not state["failed_ids"]:
+        return state
+
+    table = _dynamodb_resource().Table(args.table)
+    if state["failed_ids"]:
+        retry = [table.get_item(Key={"id": item_id}, ConsistentRead=True).get("Item")
+                 for item_id in state["failed_ids"]]
+        state["failed_ids"] = _process_page(segment, args, stage, executor, table, [item for item in retry if item],
+                                            state)
+        print(f"[BACKFILL] Segment {segment}: retried {len(retry)} failed row(s), "
+              f"{len(state['failed_ids'])} still failing")
+        progress.update(segment, state)
+        if state["done"]:
+            return state
+
+    scan_kwargs = {"Segment": segment, "TotalSegments": args.segments, "Limit": args.page_size}
+    while True:
+        if state["last_key"]:
+            scan_kwargs["ExclusiveStartKey"] = state["last_key"]
+        response = table.scan(**scan_kwargs)
+        items = response.get("Items", [])
+
+        state["failed_ids"] += _process_page(segment, args, stage, executor, table, items, state)
+        state["scanned"] += len(items)
+        state["last_key"] = response.get("LastEvaluatedKey")
+        state["done"] = state["last_key"] is None
+        # A dry run has no checkpoint file, so the real run still covers every row
+        progress.update(segment, state)
+        if state["done"]:
+            return state
+
+
+def _process_page(segment, args, stage, executor, table, items, state):
+    """Run the stage over a page of rows and write the changes; returns the ids of rows it failed on"""
+    # Only one page per segment is held in memory; the executor bounds how many stage calls run at once
+    outcomes = list(executor.map(lambda item: _apply(stage, item), items))
+    changed = [(item, updates) for item, updates in zip(items, outcomes) if isinstance(updates, dict)]
+    failed_ids = [item["id"] for item, updates in zip(items, outcomes) if isinstance(updates, Exception)]
+
+    written = 0
+    if not args.dry_run:
+        for item, updates in changed:
+            if write_changes(table, item, updates):
+                written += 1
+            else:
+                state["conflicts"] += 1
+    for item, updates in changed[:3] if args.dry_run else ():
+        print(f"[BACKFILL] (dry run) segment {segment}: {item['id']} -> "
+              f"{updates.get('estimated_amount_required')}")
+
+    state["changed"] += len(changed) if args.dry_run else written
+    return failed_ids
+
+
+def _apply(stage, item):
+    try:
+        updates = stage(item)
+    except Exception as e:
+        print(f"[BACKFILL] Stage failed for {item.get('id')}: {e}")
+        return e
+    return updates or None
+
+
+def write_changes(table, item, updates):
+    """
+    Set only the attributes the stage changed, and only if they still hold
+    what the scan read. Other writers (the reconciler's disaster_hash and
+    chain_status, a live re-score) keep their values; a row that changed
+    under the backfill is left alone and reported as a conflict.
+    """
+    names, values, assignments, conditions = {}, {}, [], []
+    for index, (attribute, value) in enumerate(updates.items()):
+        names[f"#a{index}"] = attribute
+        values[f":new{index}"] = value
+        assignments.append(f"#a{index} = :new{index}")
+        if attribute in item:
+            values[f":old{index}"] = item[attribute]
+            conditions.append(f"#a{index} = :old{index}")
+        else:
+            conditions.append(f"attribute_not_exists(#a{index})")
+    try:
+        table.update_item(
+            Key={"id": item["id"]},
+            UpdateExpression="SET " + ", ".join(assignments),
+            ConditionExpression=" AND ".join(["attribute_exists(id)"] + conditions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        print(f"[BACKFILL] {item['id']} changed since it was read, skipping")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocess historical disaster events in gods-hand-events")
+    parser.add_argument("--stage", default="normalize-amount",
+                        help=f"Built-in stage ({', '.join(STAGES)}) or module:function")
+    parser.add_argument("--table", default=EVENTS_TABLE_NAME)
+    parser.add_argument("--segments", type=int, default=8, help="Parallel Scan segments (TotalSegments)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Stage calls in flight at once")
+    parser.add_argument("--page-size", type=int, default=100, help="Rows per Scan page")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Progress file; rerunning with the same file resumes where it stopped")
+    parser.add_argument("--dry-run", action="store_true", help="Run the stage but do not write anything")
+    args = parser.parse_args(argv)
+
+    stage = load_stage(args.stage)
+    checkpoint_path = None if args.dry_run else (
+        args.checkpoint or f".backfill-{args.table}-{args.stage.replace(':', '.')}.json"
+    )
+    progress = BackfillProgress(checkpoint_path, args.table, args.stage, args.segments)
+
+    print(f"[BACKFILL] Stage '{args.stage}' over {args.table}: {args.segments} segment(s), "
+          f"{args.concurrency} concurrent stage call(s){' (dry run)' if args.dry_run else ''}")
+    started = time.perf_counter()
+    failed_segments = 0
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="stage") as executor, \
+            ThreadPoolExecutor(max_workers=args.segments, thread_name_prefix="segment") as scanners:
+        futures = {
+            segment: scanners.submit(run_segment, segment, args, stage, executor, progress)
+            for segment in range(args.segments)
+        }
+        for segment, future in futures.items():
+            try:
+                state = future.result()
+                print(f"[BACKFILL] Segment {segment} done: {state['scanned']} scanned, {state['changed']} changed")
+            except Exception as e:
+                failed_segments += 1
+                print(f"[ERROR] Segment {segment} stopped: {e}")
+
+    elapsed = time.perf_counter() - started
+    totals = progress.totals()
+    print(f"[BACKFILL] {totals['scanned']} scanned, {totals['changed']} changed, {totals['failed']} failed, "
+          f"{totals['conflicts']} changed by someone else in {elapsed:.1f}s")
+    if failed_segments:
+        print(f"[BACKFILL] {failed_segments} segment(s) stopped early; rerun to resume from {checkpoint_path}")
+    if totals["failed"] and checkpoint_path:
+        print(f"[BACKFILL] Rerun with {checkpoint_path} to retry the {totals['failed']} failed row(s)")
+    return 1 if failed_segments or totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
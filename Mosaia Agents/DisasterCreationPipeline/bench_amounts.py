@@ -0,0 +1,56 @@
+"""
+Time parse_amounts over stored agent outputs against the inline regex main.py
+used before amounts.py, and check both read the same amounts.
+
+    python bench_amounts.py --rows 20000
+
+The gap that remains is building Decimals, which the old path skipped by
+returning unvalidated strings.
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from amounts import format_amount, parse_amounts
+
+LEGACY_RE = re.compile(r"AMOUNT:\s*[\$]?(?P<amount>[\d,]+)")
+
+
+def legacy(texts):
+    # What main.py did before amounts.py: unvalidated strings, no cents or suffixes
+    return [match.group("amount").replace(",", "") if (match := LEGACY_RE.search(text)) else "Unknown"
+            for text in texts]
+
+
+def best_of(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare parse_amounts with the old inline AMOUNT regex")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    texts = [f"Summary...\nAMOUNT: ${rng.randint(1, 10_000_000):,}\nREASONING: ..." for _ in range(args.rows)]
+
+    legacy_seconds, legacy_values = best_of(lambda: legacy(texts), args.repeat)
+    batch_seconds, values = best_of(lambda: parse_amounts(texts, label="AMOUNT"), args.repeat)
+    if [format_amount(value) for value in values] != legacy_values:
+        print("[BENCH] parse_amounts and the legacy regex disagree")
+        return 1
+    print(f"[BENCH] {len(texts)} outputs: legacy inline regex {legacy_seconds * 1000:.0f} ms, "
+          f"parse_amounts {batch_seconds * 1000:.0f} ms ({batch_seconds / legacy_seconds:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import os
+import json
+import uuid
+from datetime import datetime, timezone
+
+# Where per-run stage outputs are persisted between attempts
+CHECKPOINT_DIR = os.getenv("DISASTER_CHECKPOINT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".checkpoints"))
+# Give up on resuming a run after this many attempts or once it is this old
+CHECKPOINT_MAX_ATTEMPTS = int(os.getenv("DISASTER_CHECKPOINT_MAX_ATTEMPTS", "3"))
+CHECKPOINT_MAX_AGE_SECONDS = float(os.getenv("DISASTER_CHECKPOINT_MAX_AGE", str(6 * 3600)))
+# Completed runs kept on disk for inspection
+CHECKPOINT_KEEP_COMPLETED = int(os.getenv("DISASTER_CHECKPOINT_KEEP", "20"))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target so a crash never leaves half a file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RunCheckpoint:
+    """Stage outputs of a single disaster pipeline run"""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+
+    @property
+    def run_id(self):
+        return self.data["run_id"]
+
+    @property
+    def resumed(self):
+        return self.data["attempts"] > 1
+
+    def has(self, stage):
+        return stage in self.data["stages"]
+
+    def get(self, stage, default=None):
+        return self.data["stages"].get(stage, default)
+
+    def save(self, stage, value):
+        self.data["stages"][stage] = value
+        self.data["updated_at"] = _now().isoformat()
+        _write_json_atomic(self.path, self.data)
+        return value
+
+    def stage(self, name, fn):
+        """Return the saved output of a stage, or run it and save the result"""
+        if self.has(name):
+            print(f"[CHECKPOINT] Resuming run {self.run_id}: reusing '{name}' output")
+            return self.get(name)
+        return self.save(name, fn())
+
+    def complete(self):
+        self.data["completed"] = True
+        self.data["completed_at"] = _now().isoformat()
+        _write_json_atomic(self.path, self.data)
+
+
+class CheckpointStore:
+    """Directory of JSON files, one per pipeline run"""
+
+    def __init__(self, directory=CHECKPOINT_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _load_all(self):
+        runs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    runs.append((path, json.load(f)))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[WARN] Ignoring unreadable checkpoint {name}: {e}")
+        runs.sort(key=lambda run: run[1].get("created_at", ""))
+        return runs
+
+    def _is_resumable(self, data):
+        if data.get("completed") or data.get("abandoned"):
+            return False
+        if data.get("attempts", 0) >= CHECKPOINT_MAX_ATTEMPTS:
+            return False
+        try:
+            age = (_now() - datetime.fromisoformat(data["created_at"])).total_seconds()
+        except (KeyError, ValueError):
+            return False
+        return age <= CHECKPOINT_MAX_AGE_SECONDS
+
+    def resume_or_start(self):
+        """Return the latest unfinished run if it can still be resumed, otherwise a fresh one"""
+        for path, data in reversed(self._load_all()):
+            if data.get("completed") or data.get("abandoned"):
+                continue
+            if self._is_resumable(data):
+                data["attempts"] = data.get("attempts", 0) + 1
+                checkpoint = RunCheckpoint(path, data)
+                _write_json_atomic(path, data)
+                print(f"[CHECKPOINT] Resuming run {checkpoint.run_id} (attempt {data['attempts']}), "
+                      f"completed stages: {list(data['stages'])}")
+                return checkpoint
+            data["abandoned"] = True
+            _write_json_atomic(path, data)
+            print(f"[CHECKPOINT] Abandoning stale run {data.get('run_id')}")
+
+        run_id = str(uuid.uuid4())
+        data = {
+            "run_id": run_id,
+            "created_at": _now().isoformat(),
+            "attempts": 1,
+            "completed": False,
+            "stages": {},
+        }
+        checkpoint = RunCheckpoint(os.path.join(self.directory, f"{run_id}.json"), data)
+        _write_json_atomic(checkpoint.path, data)
+        print(f"[CHECKPOINT] Starting run {run_id}")
+        return checkpoint
+
+    def prune(self, keep=CHECKPOINT_KEEP_COMPLETED):
+        """Delete all but the newest finished runs"""
+        finished = [path for path, data in self._load_all() if data.get("completed") or data.get("abandoned")]
+        for path in finished[:-keep] if keep else finished:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[WARN] Failed to prune checkpoint {path}: {e}")
@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+from collections import namedtuple
+from checkpoints import _write_json_atomic
+
+# Grid cell size in degrees; bounding boxes are snapped outwards to this grid
+GEO_CACHE_CELL_DEGREES = float(os.getenv("GEO_CACHE_CELL_DEGREES", "0.5"))
+# Weather answers are grouped into time buckets and reused for at most this long
+GEO_CACHE_BUCKET_SECONDS = float(os.getenv("GEO_CACHE_BUCKET_SECONDS", str(3 * 3600)))
+# Intersection over union an older answer needs with the new area to be reused; symmetric, so weather
+# for a whole region is not reused for a city inside it, nor a city's for the region
+GEO_CACHE_MIN_OVERLAP = float(os.getenv("GEO_CACHE_MIN_OVERLAP", "0.5"))
+GEO_CACHE_MAX_ENTRIES = int(os.getenv("GEO_CACHE_MAX_ENTRIES", "500"))
+# Index cells per entry; larger boxes are indexed on a coarser grid (cell size doubled per level)
+GEO_CACHE_MAX_CELLS = int(os.getenv("GEO_CACHE_MAX_CELLS", "64"))
+GEO_CACHE_PATH = os.getenv("GEO_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".geo_cache.json"))
+
+BBox = namedtuple("BBox", "min_lon min_lat max_lon max_lat")
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_KEY_ALIASES = {
+    "min_lon": ("min_lon", "minlon", "min_lng", "minlng", "west", "lon_min", "lng_min", "xmin", "left"),
+    "min_lat": ("min_lat", "minlat", "south", "lat_min", "ymin", "bottom"),
+    "max_lon": ("max_lon", "maxlon", "max_lng", "maxlng", "east", "lon_max", "lng_max", "xmax", "right"),
+    "max_lat": ("max_lat", "maxlat", "north", "lat_max", "ymax", "top"),
+}
+
+
+def _valid(bbox):
+    return (-180 <= bbox.min_lon <= bbox.max_lon <= 180) and (-90 <= bbox.min_lat <= bbox.max_lat <= 90)
+
+
+def _from_values(values):
+    """GeoJSON order: [min_lon, min_lat, max_lon, max_lat]"""
+    if len(values) != 4:
+        return None
+    bbox = BBox(*(float(value) for value in values))
+    return bbox if _valid(bbox) else None
+
+
+def _from_mapping(data):
+    lowered = {str(key).lower().replace("-", "_"): value for key, value in data.items()}
+    for key in ("bbox", "bounding_box", "boundingbox"):
+        if key in lowered:
+            found = _from_any(lowered[key])
+            if found:
+                return found
+    coordinates = {}
+    for field, aliases in _KEY_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                coordinates[field] = float(lowered[alias])
+                break
+    if len(coordinates) == 4:
+        bbox = BBox(**coordinates)
+        return bbox if _valid(bbox) else None
+    return None
+
+
+def _from_any(data):
+    if isinstance(data, dict):
+        return _from_mapping(data)
+    if isinstance(data, (list, tuple)):
+        try:
+            return _from_values(data)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def parse_bbox(text):
+    """Numeric bounding box from the bbox agent output (JSON object, GeoJSON array or four numbers), or None"""
+    if not text:
+        return None
+    cleaned = text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        found = _from_any(json.loads(cleaned))
+        if found:
+            return found
+    except (json.JSONDecodeError, TypeError, ValueError):
+        pass
+    numbers = _NUMBER.findall(cleaned)
+    return _from_values(numbers) if len(numbers) == 4 else None
+
+
+def snap(bbox, cell=GEO_CACHE_CELL_DEGREES):
+    """Bounding box grown outwards to whole grid cells"""
+    return BBox(
+        math.floor(bbox.min_lon / cell) * cell,
+        math.floor(bbox.min_lat / cell) * cell,
+        math.ceil(bbox.max_lon / cell) * cell,
+        math.ceil(bbox.max_lat / cell) * cell,
+    )
+
+
+def _span(low, high, cell):
+    first = math.floor(low / cell)
+    return first, max(math.ceil(high / cell) - 1, first)
+
+
+def cell_count(bbox, cell=GEO_CACHE_CELL_DEGREES):
+    """Number of grid cells a bounding box covers, without listing them"""
+    first_column, last_column = _span(bbox.min_lon, bbox.max_lon, cell)
+    first_row, last_row = _span(bbox.min_lat, bbox.max_lat, cell)
+    return (last_column - first_column + 1) * (last_row - first_row + 1)
+
+
+def cells(bbox, cell=GEO_CACHE_CELL_DEGREES):
+    """Grid cells (column, row) covered by a bounding box"""
+    first_column, last_column = _span(bbox.min_lon, bbox.max_lon, cell)
+    first_row, last_row = _span(bbox.min_lat, bbox.max_lat, cell)
+    return [(column, row) for column in range(first_column, last_column + 1)
+            for row in range(first_row, last_row + 1)]
+
+
+def _area(bbox):
+    return max(bbox.max_lon - bbox.min_lon, 0) * max(bbox.max_lat - bbox.min_lat, 0)
+
+
+def overlap(query, other):
+    """Intersection over union of two boxes: 1.0 for the same area, small when either is much larger"""
+    intersection = _area(BBox(
+        max(query.min_lon, other.min_lon), max(query.min_lat, other.min_lat),
+        min(query.max_lon, other.max_lon), min(query.max_lat, other.max_lat),
+    ))
+    union = _area(query) + _area(other) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class GeoWeatherCache:
+    """
+    Weather agent answers keyed by grid-snapped bounding box and time bucket.
+    A grid index maps every cell to the entries covering it, so a lookup only
+    compares against answers for the same neighbourhood. Each entry is indexed
+    on the finest grid level where it covers at most max_cells cells, which
+    bounds the index to max_cells per entry however large the box. Entries
+    persist to a JSON file so consecutive runs of the loop share them.
+    """
+
+    def __init__(self, path=GEO_CACHE_PATH, cell=GEO_CACHE_CELL_DEGREES, bucket_seconds=GEO_CACHE_BUCKET_SECONDS,
+                 min_overlap=GEO_CACHE_MIN_OVERLAP, max_entries=GEO_CACHE_MAX_ENTRIES, max_cells=GEO_CACHE_MAX_CELLS,
+                 clock=time.time):
+        self.path = path
+        self.cell = cell
+        self.bucket_seconds = bucket_seconds
+        self.min_overlap = min_overlap
+        self.max_entries = max_entries
+        self.max_cells = max_cells
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        # (level, column, row) -> keys, and level -> keys indexed there
+        self._index = {}
+        self._levels = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    for key, entry in json.load(f).items():
+                        entry["bbox"] = BBox(*entry["bbox"])
+                        self._add(key, entry)
+            except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"[GEO] Ignoring unreadable weather cache {path}: {e}")
+
+    def _key(self, snapped, bucket):
+        return f"{snapped.min_lon:g},{snapped.min_lat:g},{snapped.max_lon:g},{snapped.max_lat:g}@{bucket}"
+
+    def _level(self, bbox):
+        level = 0
+        while cell_count(bbox, self.cell * 2 ** level) > self.max_cells:
+            level += 1
+        return level
+
+    def _index_cells(self, entry):
+        level = entry.setdefault("level", self._level(entry["bbox"]))
+        return level, [(level, *grid_cell) for grid_cell in cells(entry["bbox"], self.cell * 2 ** level)]
+
+    def _add(self, key, entry):
+        self._entries[key] = entry
+        level, grid_cells = self._index_cells(entry)
+        self._levels.setdefault(level, set()).add(key)
+        for grid_cell in grid_cells:
+            self._index.setdefault(grid_cell, set()).add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        level, grid_cells = self._index_cells(entry)
+        self._levels[level].discard(key)
+        if not self._levels[level]:
+            del self._levels[level]
+        for grid_cell in grid_cells:
+            keys = self._index.get(grid_cell)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._index[grid_cell]
+
+    def _candidates(self, query):
+        candidates = set()
+        for level, keys in self._levels.items():
+            size = self.cell * 2 ** level
+            if cell_count(query, size) > self.max_cells:
+                # A query this large on a fine level: scanning that level's entries is cheaper
+                candidates |= keys
+                continue
+            for column, row in cells(query, size):
+                candidates |= self._index.get((level, column, row), set())
+        return candidates
+
+    def get(self, bbox):
+        """Recent weather answer for this area, or None"""
+        query = snap(bbox, self.cell)
+        now = self.clock()
+        with self._lock:
+            candidates = self._candidates(query)
+            best = None
+            for key in candidates:
+                entry = self._entries[key]
+                if now - entry["fetched_at"] > self.bucket_seconds:
+                    continue
+                score = (overlap(query, entry["bbox"]), entry["fetched_at"])
+                if score[0] >= self.min_overlap and (best is None or score > best[0]):
+                    best = (score, entry)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        print(f"[GEO] Reusing weather from {best[1]['bbox']} ({best[0][0]:.0%} overlap, "
+              f"{(now - best[1]['fetched_at']) / 60:.0f} min old)")
+        return best[1]["weather"]
+
+    def put(self, bbox, weather):
+        snapped = snap(bbox, self.cell)
+        now = self.clock()
+        key = self._key(snapped, int(now // self.bucket_seconds))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._add(key, {"bbox": snapped, "fetched_at": now, "weather": weather})
+            # Expired answers go first, then the oldest ones beyond the size limit
+            for old_key in [k for k, e in self._entries.items() if now - e["fetched_at"] > self.bucket_seconds]:
+                self._remove(old_key)
+            while len(self._entries) > self.max_entries:
+                self._remove(min(self._entries, key=lambda k: self._entries[k]["fetched_at"]))
+            snapshot = {k: {**e, "bbox": list(e["bbox"])} for k, e in self._entries.items()}
+            for entry in snapshot.values():
+                # Recomputed on load, so a changed cell size or cap takes effect
+                entry.pop("level", None)
+        if self.path:
+            try:
+                _write_json_atomic(self.path, snapshot)
+            except OSError as e:
+                print(f"[GEO] Could not persist weather cache: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "cells": len(self._index), "hits": self.hits, "misses": self.misses}
+
+
+geo_weather_cache = GeoWeatherCache()
@@ -1,84 +1,29 @@
 import os
+import gc
+import sys
 import json
 import hashlib
 import uuid
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from openai import OpenAI
-import boto3
-import re
-import requests
-import time
+from scheduler import scheduler_from_env
+from outbox import OutboxReconciler, write_event_with_outbox
+from checkpoints import CheckpointStore
+from geo_cache import geo_weather_cache, parse_bbox
+from amounts import extract_labeled_amount, format_amount
+from llm_budget import LLM_USAGE, UsageLedger, build_prompt, tracked_completion
+from resources import pipeline_resources, rss_bytes
 
 # Load environment variables
 load_dotenv()
 
-# API Configuration
-DISASTER_API_URL = "https://disastercreationserver.onrender.com/disasters"
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3/simple/price?ids=vechain&vs_currencies=usd"
+# Stop the loop once RSS passes this many MB after a run, so the container restarts it; 0 disables
+DISASTER_MAX_RSS_MB = float(os.getenv("DISASTER_MAX_RSS_MB", "0"))
 
-def get_vet_price():
-    """Get current VET price in USD from CoinGecko API"""
-    try:
-        response = requests.get(COINGECKO_API_URL, timeout=1000)
-        response.raise_for_status()
-        data = response.json()
-        vet_price_usd = data["vechain"]["usd"]
-        print(f"[API] VET price: ${vet_price_usd}")
-        return vet_price_usd
-    except Exception as e:
-        print(f"[ERROR] Failed to get VET price: {e}")
-        return None
-
-def convert_usd_to_vet(usd_amount, vet_price_usd):
-    """Convert USD amount to VET amount"""
-    if vet_price_usd is None or vet_price_usd <= 0:
-        return None
-    vet_amount = float(usd_amount) / vet_price_usd
-    print(f"[CONVERSION] ${usd_amount} USD = {vet_amount:.2f} VET")
-    return vet_amount
-
-def create_disaster_via_api(title, description, target_amount_vet):
-    """Create disaster via API call to Express server"""
-    try:
-        payload = {
-            "title": title,
-            "metadata": {
-                "description": description
-            },
-            "targetAmountVET": target_amount_vet
-        }
-        
-        print(f"[API] Creating disaster via API: {payload}")
-        
-        response = requests.post(
-            DISASTER_API_URL,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=3000
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        if result.get("success"):
-            disaster_hash = result.get("disasterHash")
-            print(f"[API] Disaster created successfully! Hash: {disaster_hash}")
-            print(f"[API] Full API response: {result}")
-            print(f"[API] Hash type: {type(disaster_hash)}")
-            return disaster_hash
-        else:
-            print(f"[API] API returned error: {result.get('error')}")
-            return None
-            
-    except Exception as e:
-        print(f"[ERROR] Failed to create disaster via API: {e}")
-        return None
-
-def get_recent_disaster():
+def get_recent_disaster(ledger=LLM_USAGE, resources=pipeline_resources):
     """Fetch the most recent global disaster using GPT-4o with web search enabled"""
     try:
-        # Initialize OpenAI client
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = resources.client("search")
         
         # System prompt for structured JSON-style output
         system_prompt = (
@@ -97,8 +42,11 @@ def get_recent_disaster():
         )
 
         # Perform GPT web search
-        completion = client.chat.completions.create(
+        completion = tracked_completion(
+            client,
+            "search",
             model="gpt-4o-search-preview",
+            ledger=ledger,
             max_completion_tokens=500,
             web_search_options={},
             messages=[
@@ -117,14 +65,86 @@ def get_recent_disaster():
         print(f"[ERROR] Failed to fetch disaster: {e}")
         return None
 
-def run_disaster_flow():
+def fetch_bbox(title, description, read_more, ledger=LLM_USAGE, resources=pipeline_resources):
+    """Ask the bbox agent for the bounding box of the disaster area"""
+    bbox_client = resources.client("bbox")
+
+    bbox_input = build_prompt(
+        "🚨 **{title}** 🚨 {description} 🔗 [Read more]({read_more})",
+        {"title": title, "description": description, "read_more": read_more},
+        "bbox",
+        truncatable=("description",)
+    )
+    bbox_response = tracked_completion(
+        bbox_client,
+        "bbox",
+        model="6864d6cbca5744854d34c998",
+        messages=[{"role": "user", "content": bbox_input}],
+        ledger=ledger,
+    )
+    return bbox_response.choices[0].message.content.strip()
+
+def fetch_weather(bbox_output, ledger=LLM_USAGE, resources=pipeline_resources):
+    """Ask the weather agent for conditions inside the bounding box"""
+    weather_client = resources.client("weather")
+
+    weather_response = tracked_completion(
+        weather_client,
+        "weather",
+        model="6864dd95ade4d61675d45e4d",
+        messages=[{"role": "user", "content": f"```json\n{bbox_output}\n```"}],
+        ledger=ledger,
+    )
+    return weather_response.choices[0].message.content.strip()
+
+def fetch_weather_cached(bbox_output, ledger=LLM_USAGE, resources=pipeline_resources):
+    """Weather for the bbox, reusing a recent answer for an overlapping area when there is one"""
+    bbox = parse_bbox(bbox_output)
+    if bbox is None:
+        print("[GEO] Could not parse a bounding box, asking the weather agent directly")
+        return fetch_weather(bbox_output, ledger, resources)
+    weather_data = geo_weather_cache.get(bbox)
+    if weather_data is None:
+        weather_data = fetch_weather(bbox_output, ledger, resources)
+        geo_weather_cache.put(bbox, weather_data)
+    return weather_data
+
+def fetch_analysis(title, description, read_more, weather_data, ledger=LLM_USAGE, resources=pipeline_resources):
+    """Ask the analysis agent for the funding estimate; the output carries an AMOUNT: line"""
+    analysis_client = resources.client("analysis")
+
+    # The weather agent output is by far the largest field, so it is cut first
+    analysis_input = build_prompt(
+        "🌧️ **{title}**\n{description}\n\n[Read more]({read_more})\n\n{weather_data}",
+        {"title": title, "description": description, "read_more": read_more, "weather_data": weather_data},
+        "analysis",
+        truncatable=("weather_data", "description")
+    )
+    analysis_response = tracked_completion(
+        analysis_client,
+        "analysis",
+        model="6866162ee2d11c774d448a27",
+        messages=[{"role": "user", "content": analysis_input}],
+        ledger=ledger,
+    )
+    return analysis_response.choices[0].message.content.strip()
+
+def run_disaster_flow(checkpoint_store=None, resources=pipeline_resources):
+    checkpoint_store = checkpoint_store or CheckpointStore()
+    checkpoint = checkpoint_store.resume_or_start()
+    ledger = UsageLedger(f"run {checkpoint.run_id}", parent=LLM_USAGE)
+
     # Step 1: Get recent disaster using integrated search functionality
-    print("\n🔍 Fetching recent disaster...")
-    disaster_json = get_recent_disaster()
+    if checkpoint.has("disaster"):
+        disaster_json = checkpoint.get("disaster")
+    else:
+        print("\n🔍 Fetching recent disaster...")
+        disaster_json = get_recent_disaster(ledger, resources)
     
     if disaster_json is None:
         print("[ERROR] Could not fetch disaster data, exiting...")
         return
+    checkpoint.save("disaster", disaster_json)
 
     # Parse JSON disaster output
     try:
@@ -151,76 +171,27 @@ def run_disaster_flow():
         location = lines[3].replace("Disaster Location: ", "").strip() if len(lines) > 3 else "Unknown Location"
 
     # Step 2: Get bounding box using disaster description
-    bbox_client = OpenAI(
-        base_url="https://api.mosaia.ai/v1/agent",
-        api_key=os.getenv("bboxagent")
-    )
-
-    bbox_response = bbox_client.chat.completions.create(
-        model="6864d6cbca5744854d34c998",
-        messages=[{"role": "user", "content": f"🚨 **{title}** 🚨 {description} 🔗 [Read more]({read_more})"}],
-    )
-
-    bbox_output = bbox_response.choices[0].message.content.strip()
+    bbox_output = checkpoint.stage("bbox", lambda: fetch_bbox(title, description, read_more, ledger, resources))
     print("\nBBox:\n", bbox_output)
 
     # Step 3: Get weather data
-    weather_client = OpenAI(
-        base_url="https://api.mosaia.ai/v1/agent",
-        api_key=os.getenv("weatheragent")
-    )
-
-    weather_response = weather_client.chat.completions.create(
-        model="6864dd95ade4d61675d45e4d",
-        messages=[{"role": "user", "content": f"```json\n{bbox_output}\n```"}],
-    )
-
-    weather_data = weather_response.choices[0].message.content.strip()
+    weather_data = checkpoint.stage("weather", lambda: fetch_weather_cached(bbox_output, ledger, resources))
     print("\nWeather:\n", weather_data)
 
     # Step 4: Financial analysis
-    analysis_client = OpenAI(
-        base_url="https://api.mosaia.ai/v1/agent",
-        api_key=os.getenv("analysisagent")
+    analysis_output = checkpoint.stage(
+        "analysis", lambda: fetch_analysis(title, description, read_more, weather_data, ledger, resources)
     )
-
-    analysis_input = f"🌧️ **{title}**\n{description}\n\n[Read more]({read_more})\n\n{weather_data}"
-    analysis_response = analysis_client.chat.completions.create(
-        model="6866162ee2d11c774d448a27",
-        messages=[{"role": "user", "content": analysis_input}],
-    )
-
-    analysis_output = analysis_response.choices[0].message.content.strip()
     print("\nAnalysis:\n", analysis_output)
 
     # Step 5: Parse amount (keep USD amount as is)
-    amount_match = re.search(r"AMOUNT:\s*[\$]?(?P<amount>[\d,]+)", analysis_output)
-    amount_required = amount_match.group("amount").replace(",", "") if amount_match else "Unknown"
+    amount_usd = extract_labeled_amount(analysis_output)
+    amount_required = format_amount(amount_usd) if amount_usd is not None else "Unknown"
 
     print(f"\nAmount required in USD: ${amount_required}")
 
-    # Step 5.1: Create disaster via API and get disaster hash
-    contract_disaster_hash = None
-    if amount_required != "Unknown":
-        try:
-            # Get current VET price
-            vet_price_usd = get_vet_price()
-            if vet_price_usd is None:
-                print("[ERROR] Could not get VET price, skipping disaster creation")
-            else:
-                # Convert USD to VET
-                target_amount_vet = convert_usd_to_vet(amount_required, vet_price_usd)
-                if target_amount_vet is None:
-                    print("[ERROR] Could not convert USD to VET, skipping disaster creation")
-                else:
-                    # Create disaster via API
-                    contract_disaster_hash = create_disaster_via_api(title, description, target_amount_vet)
-                    if contract_disaster_hash:
-                        print(f"[API] Disaster hash from API: {contract_disaster_hash}")
-                    else:
-                        print("[API] Could not create disaster via API")
-        except Exception as e:
-            print(f"[ERROR] API interaction failed: {e}")
+    # Step 5.1: The on-chain create goes through the outbox, which converts the USD target to VET when it submits
+    target_amount_usd = amount_required if amount_required != "Unknown" else None
 
     # Step 6: Construct tweet
     tweet_text = (
@@ -233,38 +204,36 @@ def run_disaster_flow():
     print("\nTweet:\n", tweet_text)
 
     # Step 7: Post to Twitter
-    tweet_client = OpenAI(
-        base_url="https://api.mosaia.ai/v1/agent",
-        api_key=os.getenv("tweetagent")
-    )
-
-    tweet_response = tweet_client.chat.completions.create(
-        model="6864e70f77520411d032518a",
-        messages=[{"role": "user", "content": f'post this content on twitter "{tweet_text}"'}],
-    )
+    def post_tweet():
+        tweet_client = resources.client("tweet")
+
+        tweet_response = tracked_completion(
+            tweet_client,
+            "tweet",
+            model="6864e70f77520411d032518a",
+            messages=[{"role": "user", "content": f'post this content on twitter "{tweet_text}"'}],
+            ledger=ledger,
+        )
+        return tweet_response.choices[0].message.content
 
-    print("\nTwitter Response:\n", tweet_response.choices[0].message.content)
+    print("\nTwitter Response:\n", checkpoint.stage("tweet", post_tweet))
 
     # Step 8: Store in DynamoDB
-    aws_access_key = os.getenv("AWS_ACCESS_KEY_ID")
-    aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-    aws_region = os.getenv("AWS_REGION")
-
-    dynamodb = boto3.resource(
-        'dynamodb',
-        aws_access_key_id=aws_access_key,
-        aws_secret_access_key=aws_secret_key,
-        region_name=aws_region
-    )
+    dynamodb = resources.dynamodb()
 
-    table = dynamodb.Table("gods-hand-events")
+    # Key used by the scheduler to tell new disasters from repeats
+    disaster_key = hashlib.sha256((title + location).encode()).hexdigest()
 
-    # Use contract_disaster_hash if available
-    final_disaster_hash = contract_disaster_hash if contract_disaster_hash else hashlib.sha256((title + location).encode()).hexdigest()
+    # A run resumed from before the outbox may already have created the disaster itself
+    contract_disaster_hash = checkpoint.get("contract_create")
 
-    # Create a unique hash and timestamp
-    unique_id = str(uuid.uuid4())
-    created_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    # Create a unique hash and timestamp once per run so a retried write targets the same row
+    event_identity = checkpoint.stage("event_identity", lambda: {
+        "id": str(uuid.uuid4()),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    })
+    unique_id = event_identity["id"]
+    created_at = event_identity["created_at"]
 
     # Log values before insertion
     print("\nLogging values before DB insert:")
@@ -273,7 +242,7 @@ def run_disaster_flow():
     print("Read More:", read_more)
     print("Location:", location)
     print("Amount Required:", amount_required)
-    print("Hash:", final_disaster_hash)
+    print("Hash:", contract_disaster_hash or ("pending on-chain create" if target_amount_usd is not None else "none"))
     print("ID:", unique_id)
     print("Created At:", created_at)
 
@@ -285,19 +254,47 @@ def run_disaster_flow():
         "source": read_more,
         "disaster_location": location,
         "estimated_amount_required": amount_required,
-        "disaster_hash": final_disaster_hash,
         "created_at": created_at
     }
-
-    # Insert into DynamoDB
-    table.put_item(Item=dynamodb_item)
-    print("\n✅ DynamoDB entry added successfully.")
+    # disaster_hash is only written once the disaster exists on chain; the outbox reconciler fills it in
+    if contract_disaster_hash:
+        dynamodb_item["disaster_hash"] = contract_disaster_hash
+        dynamodb_item["chain_status"] = "confirmed"
+    elif target_amount_usd is not None:
+        dynamodb_item["chain_status"] = "pending"
+
+    # Insert the row and its outbox entry together, leaving rows written by an interrupted attempt untouched
+    outbox_target = target_amount_usd if not contract_disaster_hash else None
+    if write_event_with_outbox(dynamodb, dynamodb_item, outbox_target):
+        print("\n✅ DynamoDB entry added successfully.")
+    else:
+        print(f"\n✅ DynamoDB entry {unique_id} was already written by a previous attempt.")
+
+    checkpoint.save("llm_usage", ledger.report())
+    checkpoint.complete()
+    checkpoint_store.prune()
+
+    return disaster_key
+
+def run_and_check_memory(scheduler):
+    """One loop iteration followed by a collection and an RSS check; stops scheduler when over the limit"""
+    try:
+        return run_disaster_flow()
+    finally:
+        # Response objects from a run can sit in reference cycles; free them before the long sleep
+        gc.collect()
+        rss_mb = rss_bytes() / 2**20
+        print(f"[MEMORY] RSS {rss_mb:.1f} MB after run")
+        if DISASTER_MAX_RSS_MB and rss_mb > DISASTER_MAX_RSS_MB:
+            print(f"[MEMORY] Over the {DISASTER_MAX_RSS_MB:.0f} MB limit, stopping so the process is restarted")
+            scheduler.stop()
 
 if __name__ == "__main__":
-    while True:
-        try:
-            run_disaster_flow()
-        except Exception as e:
-            print(f"[ERROR] Exception in disaster flow: {e}")
-        print("\n[INFO] Sleeping for 1 hour before next run...\n")
-        time.sleep(3600)
+    # On-chain creates are retried and confirmed in the background, off the disaster loop
+    if os.getenv("DISASTER_OUTBOX_WORKER", "true").lower() not in ("0", "false", "no"):
+        OutboxReconciler().start()
+    scheduler = scheduler_from_env(lambda: run_and_check_memory(scheduler))
+    with pipeline_resources:
+        scheduler.run_forever()
+    if scheduler.stopped:
+        sys.exit(1)
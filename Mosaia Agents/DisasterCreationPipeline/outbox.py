@@ -0,0 +1,446 @@
+import os
+import sys
+import time
+import argparse
+import threading
+from decimal import Decimal
+from datetime import datetime, timezone
+import boto3
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from web3 import Web3
+from transport import http_transport
+
+# Load environment variables
+load_dotenv()
+
+DISASTER_API_URL = "https://disastercreationserver.onrender.com/disasters"
+COINGECKO_API_URL = "https://api.coingecko.com/api/v3/simple/price?ids=vechain&vs_currencies=usd"
+EVENTS_TABLE_NAME = "gods-hand-events"
+OUTBOX_TABLE_NAME = os.getenv("DISASTER_OUTBOX_TABLE", "gods-hand-disaster-outbox")
+
+# VeChain node whose /logs/event API is searched for DisasterCreated logs
+VECHAIN_NODE_URL = os.getenv("VECHAIN_NODE_URL", "https://testnet.vechain.org")
+GODSHAND_CONTRACT_ADDRESS = os.getenv("GODSHAND_CONTRACT_ADDRESS", "0x6b564f771732476c86edee283344f5678e314c3d")
+DISASTER_CREATED_TOPIC = "0x" + Web3.keccak(text="DisasterCreated(bytes32,string,address,uint256)").hex().removeprefix("0x")
+
+OUTBOX_INTERVAL = float(os.getenv("DISASTER_OUTBOX_INTERVAL", "60"))
+# Creates submitted per reconciliation pass
+OUTBOX_BATCH_SIZE = int(os.getenv("DISASTER_OUTBOX_BATCH_SIZE", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("DISASTER_OUTBOX_MAX_ATTEMPTS", "5"))
+# A submitted create with no DisasterCreated log after this long is retried
+OUTBOX_CONFIRM_TIMEOUT = float(os.getenv("DISASTER_OUTBOX_CONFIRM_TIMEOUT", "600"))
+OUTBOX_CREATE_TIMEOUT = float(os.getenv("DISASTER_OUTBOX_CREATE_TIMEOUT", "120"))
+
+_serializer = TypeSerializer()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _epoch(iso_timestamp):
+    return datetime.fromisoformat(iso_timestamp.replace("Z", "+00:00")).timestamp()
+
+
+def _dynamodb_resource():
+    return boto3.resource(
+        'dynamodb',
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION")
+    )
+
+
+def _put(table_name, item):
+    return {"Put": {
+        "TableName": table_name,
+        "Item": {key: _serializer.serialize(value) for key, value in item.items()},
+        "ConditionExpression": "attribute_not_exists(id)",
+    }}
+
+
+def get_vet_price():
+    """Get current VET price in USD from CoinGecko API"""
+    try:
+        response = http_transport.get(COINGECKO_API_URL, timeout=1000)
+        response.raise_for_status()
+        data = response.json()
+        vet_price_usd = data["vechain"]["usd"]
+        print(f"[API] VET price: ${vet_price_usd}")
+        return vet_price_usd
+    except Exception as e:
+        print(f"[ERROR] Failed to get VET price: {e}")
+        return None
+
+
+def convert_usd_to_vet(usd_amount, vet_price_usd):
+    """Convert USD amount to VET amount"""
+    if vet_price_usd is None or vet_price_usd <= 0:
+        return None
+    vet_amount = float(usd_amount) / vet_price_usd
+    print(f"[CONVERSION] ${usd_amount} USD = {vet_amount:.2f} VET")
+    return vet_amount
+
+
+def write_event_with_outbox(dynamodb, event_item, target_amount_usd=None):
+    """
+    Write the event row and, when the disaster still has to be created on chain,
+    its outbox entry in one transaction. Returns False if a previous attempt
+    already wrote them. The entry keeps the USD target; it is converted to VET
+    when first submitted, so a missing VET price only delays the create.
+
+    If the outbox table does not exist, the event row is still written on its
+    own, marked chain_status "unqueued", and the missing table is reported.
+    """
+    actions = [_put(EVENTS_TABLE_NAME, event_item)]
+    if target_amount_usd is not None:
+        actions.append(_put(OUTBOX_TABLE_NAME, {
+            "id": event_item["id"],
+            "title": event_item["title"],
+            "description": event_item["description"],
+            "target_amount_usd": str(target_amount_usd),
+            "status": "pending",
+            "attempts": 0,
+            "created_at": event_item["created_at"],
+            "next_attempt_at": event_item["created_at"],
+        }))
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=actions)
+        return True
+    except ClientError as e:
+        reasons = e.response.get("CancellationReasons") or []
+        if e.response["Error"]["Code"] == "TransactionCanceledException" and any(
+            reason.get("Code") == "ConditionalCheckFailed" for reason in reasons
+        ):
+            return False
+        if e.response["Error"]["Code"] != "ResourceNotFoundException" or len(actions) == 1:
+            raise
+
+    print(f"[OUTBOX] ERROR: table {OUTBOX_TABLE_NAME} does not exist, so event {event_item['id']} is saved "
+          f"WITHOUT an on-chain create. Run `python outbox.py --create-table` to fix this.")
+    try:
+        dynamodb.Table(EVENTS_TABLE_NAME).put_item(
+            Item={**event_item, "chain_status": "unqueued"},
+            ConditionExpression="attribute_not_exists(id)"
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+def create_disaster_via_api(title, description, target_amount_vet):
+    """Create disaster via API call to Express server"""
+    try:
+        payload = {
+            "title": title,
+            "metadata": {
+                "description": description
+            },
+            "targetAmountVET": target_amount_vet
+        }
+
+        print(f"[API] Creating disaster via API: {payload}")
+
+        response = http_transport.post(
+            DISASTER_API_URL,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=OUTBOX_CREATE_TIMEOUT
+        )
+        response.raise_for_status()
+
+        result = response.json()
+        if result.get("success"):
+            disaster_hash = result.get("disasterHash")
+            print(f"[API] Disaster created successfully! Hash: {disaster_hash}")
+            return disaster_hash
+        else:
+            print(f"[API] API returned error: {result.get('error')}")
+            return None
+
+    except Exception as e:
+        print(f"[ERROR] Failed to create disaster via API: {e}")
+        return None
+
+
+def _decode_created_log(log):
+    """DisasterCreated(bytes32 indexed disasterHash, string title, address indexed creator, uint256 targetAmount)"""
+    data = bytes.fromhex(log["data"][2:])
+    title_offset = int.from_bytes(data[0:32], "big")
+    target_amount = int.from_bytes(data[32:64], "big")
+    title_length = int.from_bytes(data[title_offset:title_offset + 32], "big")
+    title = data[title_offset + 32:title_offset + 32 + title_length].decode("utf-8", errors="replace")
+    return {
+        "disaster_hash": log["topics"][1],
+        "creator": "0x" + log["topics"][2][-40:],
+        "title": title,
+        "target_amount_wei": target_amount,
+        "timestamp": log["meta"]["blockTimestamp"],
+        "tx_id": log["meta"]["txID"],
+    }
+
+
+def fetch_created_events(since_epoch, page_size=256):
+    """All DisasterCreated logs of the contract from since_epoch onwards, oldest first"""
+    events = []
+    offset = 0
+    while True:
+        response = http_transport.post(
+            f"{VECHAIN_NODE_URL}/logs/event",
+            json={
+                "range": {"unit": "time", "from": int(since_epoch), "to": int(time.time()) + 60},
+                "options": {"offset": offset, "limit": page_size},
+                "criteriaSet": [{"address": GODSHAND_CONTRACT_ADDRESS, "topic0": DISASTER_CREATED_TOPIC}],
+                "order": "asc"
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        logs = response.json()
+        events.extend(_decode_created_log(log) for log in logs)
+        if len(logs) < page_size:
+            return events
+        offset += page_size
+
+
+def _same_hash(entry, event):
+    """The log carries the hash the creation API returned when the entry was submitted"""
+    submitted = entry.get("submitted_hash")
+    return bool(submitted) and submitted.lower() == event["disaster_hash"].lower()
+
+
+def _matches(entry, event):
+    # Never submitted, so no log can belong to it yet
+    if "target_amount_vet" not in entry or event["title"] != entry["title"]:
+        return False
+    # The creation server converts with ethers.parseEther, so compare in whole wei within rounding
+    target_wei = Decimal(entry["target_amount_vet"]) * Decimal(10 ** 18)
+    if abs(Decimal(event["target_amount_wei"]) - target_wei) > max(target_wei * Decimal("1e-9"), 1):
+        return False
+    # A log older than the outbox entry belongs to an earlier disaster with the same title
+    return event["timestamp"] >= _epoch(entry["created_at"]) - 60
+
+
+class OutboxReconciler:
+    """
+    Drives outbox entries to confirmed: submits pending creates in small
+    batches, confirms them by matching DisasterCreated logs (by the hash the
+    creation API returned, else by title, target and time), and writes the
+    real disaster_hash into gods-hand-events. Nothing is resubmitted while a
+    matching log might still appear, so retries do not create duplicates.
+    """
+
+    def __init__(self, dynamodb=None, interval=OUTBOX_INTERVAL, batch_size=OUTBOX_BATCH_SIZE, price_fn=get_vet_price):
+        dynamodb = dynamodb or _dynamodb_resource()
+        self.outbox = dynamodb.Table(OUTBOX_TABLE_NAME)
+        self.events = dynamodb.Table(EVENTS_TABLE_NAME)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.price_fn = price_fn
+        self._stop = threading.Event()
+        self._thread = None
+        self.confirmed = 0
+        self.submitted = 0
+        self.failed = 0
+
+    def open_entries(self):
+        entries = []
+        kwargs = {"FilterExpression": Attr("status").is_in(["pending", "submitted"])}
+        while True:
+            response = self.outbox.scan(**kwargs)
+            entries.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return entries
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def reconcile_once(self):
+        entries = self.open_entries()
+        if not entries:
+            return {"open": 0, "confirmed": 0, "submitted": 0}
+
+        since = min(_epoch(entry["created_at"]) for entry in entries) - 60
+        events = fetch_created_events(since)
+        claimed = set()
+        confirmed = 0
+        unmatched = sorted(entries, key=lambda entry: entry["created_at"])
+        # Logs carrying the hash the API returned settle their entries first; title, target and time
+        # only decide for entries whose submission returned no hash or whose hash has no log yet
+        for match in (_same_hash, _matches):
+            remaining = []
+            for entry in unmatched:
+                event = next((event for event in events
+                              if event["disaster_hash"] not in claimed and match(entry, event)), None)
+                if event:
+                    claimed.add(event["disaster_hash"])
+                    self._confirm(entry, event)
+                    confirmed += 1
+                else:
+                    remaining.append(entry)
+            unmatched = remaining
+
+        submitted = 0
+        now = _now()
+        for entry in unmatched:
+            if entry["status"] == "submitted":
+                if now.timestamp() - _epoch(entry["submitted_at"]) < OUTBOX_CONFIRM_TIMEOUT:
+                    continue
+                print(f"[OUTBOX] No DisasterCreated log for {entry['id']} after {OUTBOX_CONFIRM_TIMEOUT:.0f}s, retrying")
+            if submitted >= self.batch_size or _epoch(entry["next_attempt_at"]) > now.timestamp():
+                continue
+            self._submit(entry)
+            submitted += 1
+
+        print(f"[OUTBOX] {len(entries)} open, {confirmed} confirmed, {submitted} submitted")
+        return {"open": len(entries), "confirmed": confirmed, "submitted": submitted}
+
+    def _submit(self, entry):
+        attempts = int(entry["attempts"]) + 1
+        if attempts > OUTBOX_MAX_ATTEMPTS:
+            self._give_up(entry, attempts - 1)
+            return
+
+        # Convert once and keep it: retries must ask for the same target, or an earlier submission's
+        # log would no longer match the entry
+        target_amount_vet = entry.get("target_amount_vet")
+        if target_amount_vet is None:
+            target_amount_vet = convert_usd_to_vet(entry["target_amount_usd"], self.price_fn())
+            if target_amount_vet is None:
+                print(f"[OUTBOX] No VET price for {entry['id']}, leaving it pending")
+                return
+            # Stored as a string so the exact float sent to the creation API survives the round trip
+            target_amount_vet = repr(float(target_amount_vet))
+
+        submitted_at = _now()
+        # Mark before sending so a crash mid-request waits for the log instead of resubmitting at once
+        self.outbox.update_item(
+            Key={"id": entry["id"]},
+            UpdateExpression="SET #s = :s, attempts = :a, submitted_at = :t, next_attempt_at = :n, target_amount_vet = :v",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":s": "submitted",
+                ":a": attempts,
+                ":t": submitted_at.isoformat(),
+                ":n": datetime.fromtimestamp(
+                    submitted_at.timestamp() + OUTBOX_CONFIRM_TIMEOUT * 2 ** (attempts - 1), timezone.utc
+                ).isoformat(),
+                ":v": target_amount_vet
+            }
+        )
+        disaster_hash = create_disaster_via_api(entry["title"], entry["description"], float(target_amount_vet))
+        if disaster_hash:
+            self.outbox.update_item(
+                Key={"id": entry["id"]},
+                UpdateExpression="SET submitted_hash = :h",
+                ExpressionAttributeValues={":h": disaster_hash}
+            )
+            self.submitted += 1
+        else:
+            # The request failed outright, so it is safe to try again on the next pass
+            self.outbox.update_item(
+                Key={"id": entry["id"]},
+                UpdateExpression="SET #s = :s",
+                ExpressionAttributeNames={"#s": "status"},
+                ExpressionAttributeValues={":s": "pending"}
+            )
+
+    def _give_up(self, entry, attempts):
+        """Mark the entry and its event row failed, so the event is not left looking pending forever"""
+        self.outbox.update_item(
+            Key={"id": entry["id"]},
+            UpdateExpression="SET #s = :s",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": "failed"}
+        )
+        try:
+            self.events.update_item(
+                Key={"id": entry["id"]},
+                UpdateExpression="SET chain_status = :s",
+                # A row already confirmed on chain keeps its status
+                ConditionExpression="attribute_exists(id) AND attribute_not_exists(disaster_hash)",
+                ExpressionAttributeValues={":s": "failed"}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        self.failed += 1
+        print(f"[OUTBOX] Giving up on {entry['id']} after {attempts} attempts")
+
+    def _confirm(self, entry, event):
+        print(f"[OUTBOX] {entry['id']} confirmed on chain as {event['disaster_hash']} (tx {event['tx_id']})")
+        self.events.update_item(
+            Key={"id": entry["id"]},
+            UpdateExpression="SET disaster_hash = :h, chain_status = :s",
+            ExpressionAttributeValues={":h": event["disaster_hash"], ":s": "confirmed"}
+        )
+        self.outbox.update_item(
+            Key={"id": entry["id"]},
+            UpdateExpression="SET #s = :s, disaster_hash = :h, tx_id = :t, confirmed_at = :c",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":s": "confirmed",
+                ":h": event["disaster_hash"],
+                ":t": event["tx_id"],
+                ":c": _now().isoformat()
+            }
+        )
+        self.confirmed += 1
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.reconcile_once()
+            except Exception as e:
+                print(f"[OUTBOX] Reconciliation pass failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Reconcile in a background thread so the disaster loop never waits on the creation service"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name="outbox-reconciler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def create_outbox_table(dynamodb):
+    dynamodb.create_table(
+        TableName=OUTBOX_TABLE_NAME,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    ).wait_until_exists()
+    print(f"[OUTBOX] Created table {OUTBOX_TABLE_NAME}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile pending on-chain disaster creates")
+    parser.add_argument("--create-table", action="store_true", help=f"Create {OUTBOX_TABLE_NAME} and exit")
+    parser.add_argument("--loop", action="store_true", help="Keep reconciling every DISASTER_OUTBOX_INTERVAL seconds")
+    parser.add_argument("--status", action="store_true", help="List open outbox entries and exit")
+    args = parser.parse_args(argv)
+
+    dynamodb = _dynamodb_resource()
+    if args.create_table:
+        create_outbox_table(dynamodb)
+        return 0
+    reconciler = OutboxReconciler(dynamodb)
+    if args.status:
+        for entry in reconciler.open_entries():
+            print(f"{entry['id']}  {entry['status']:<9}  attempts={entry['attempts']}  {entry['title']}")
+        return 0
+    if args.loop:
+        reconciler.run_forever()
+        return 0
+    reconciler.reconcile_once()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import resource
+import threading
+from openai import OpenAI
+from outbox import _dynamodb_resource
+
+MOSAIA_AGENT_URL = "https://api.mosaia.ai/v1/agent"
+
+# Agent name -> environment variable holding its API key; "search" talks to OpenAI directly
+AGENT_KEYS = {
+    "search": "OPENAI_API_KEY",
+    "bbox": "bboxagent",
+    "weather": "weatheragent",
+    "analysis": "analysisagent",
+    "tweet": "tweetagent",
+}
+
+
+def _openai_client(agent):
+    if agent == "search":
+        return OpenAI(api_key=os.getenv(AGENT_KEYS[agent]))
+    return OpenAI(base_url=MOSAIA_AGENT_URL, api_key=os.getenv(AGENT_KEYS[agent]))
+
+
+def rss_bytes():
+    """Current resident set size; falls back to the peak where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PipelineResources:
+    """
+    Clients the disaster loop reuses across runs: one OpenAI client per agent
+    and one DynamoDB resource, each created on first use and closed together.
+    Creating them per call kept connection pools, SSL contexts and boto3
+    service models alive for every run of a process that never exits.
+    """
+
+    def __init__(self, openai_factory=_openai_client, dynamodb_factory=_dynamodb_resource):
+        self.openai_factory = openai_factory
+        self.dynamodb_factory = dynamodb_factory
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._dynamodb = None
+        self.created = 0
+
+    def client(self, agent):
+        """OpenAI client for one of AGENT_KEYS"""
+        with self._lock:
+            client = self._clients.get(agent)
+            if client is None:
+                client = self._clients[agent] = self.openai_factory(agent)
+                self.created += 1
+            return client
+
+    def dynamodb(self):
+        # boto3 resources are not thread-safe; this one belongs to the disaster loop only
+        with self._lock:
+            if self._dynamodb is None:
+                self._dynamodb = self.dynamodb_factory()
+                self.created += 1
+            return self._dynamodb
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            dynamodb, self._dynamodb = self._dynamodb, None
+        for agent, client in clients.items():
+            try:
+                client.close()
+            except Exception as e:
+                print(f"[RESOURCES] Could not close {agent} client: {e}")
+        if dynamodb is not None:
+            close = getattr(dynamodb.meta.client, "close", None)
+            if close:
+                close()
+
+    def stats(self):
+        with self._lock:
+            return {"clients": sorted(self._clients), "dynamodb": self._dynamodb is not None, "created": self.created}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+pipeline_resources = PipelineResources()
@@ -0,0 +1,193 @@
+import os
+import math
+import random
+import threading
+import time
+from collections import deque
+
+
+class SystemClock:
+    """Real wall clock used by the scheduler in production"""
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class ManualClock:
+    """Clock that only moves when told to, so scheduling can be simulated instantly"""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        seconds = max(0.0, float(seconds))
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += float(seconds)
+
+
+class AdaptiveScheduler:
+    """
+    Fixed-rate scheduler for the disaster polling loop.
+
+    Ticks are anchored to the previous scheduled tick rather than to the end of
+    the run, so a slow run does not push the cadence back. Missed ticks are
+    skipped instead of replayed, and a lock keeps two runs from overlapping.
+    The interval follows an exponentially weighted average of how often runs
+    found something new: geometrically between max_interval when nothing new
+    has turned up lately and min_interval when every run finds something.
+    smoothing is the weight of the latest run, so one lucky or empty run only
+    nudges the cadence.
+    """
+
+    def __init__(
+        self,
+        job,
+        base_interval=3600,
+        min_interval=900,
+        max_interval=4 * 3600,
+        smoothing=0.3,
+        jitter=0.1,
+        history=32,
+        clock=None,
+        rng=None,
+    ):
+        if not (0 < min_interval <= base_interval <= max_interval):
+            raise ValueError("Intervals must satisfy 0 < min <= base <= max")
+        if not 0 <= smoothing <= 1:
+            raise ValueError("smoothing must be between 0 and 1")
+        self.job = job
+        self.base_interval = float(base_interval)
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self.clock = clock or SystemClock()
+        self.rng = rng or random.Random()
+
+        self.interval = self.base_interval
+        # Share of recent runs that found something new, seeded so the first interval is base_interval
+        self.yield_rate = 0.0
+        if self.min_interval < self.max_interval:
+            self.yield_rate = (math.log(self.base_interval / self.max_interval)
+                               / math.log(self.min_interval / self.max_interval))
+        self.next_tick = None
+        self.runs = 0
+        self.skipped_ticks = 0
+        self.overlaps_prevented = 0
+        self._seen = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _is_new(self, result):
+        """A run is productive when it returns a key we have not seen recently"""
+        if result is None:
+            return False
+        if result in self._seen:
+            return False
+        self._seen.append(result)
+        return True
+
+    def _adapt(self, productive):
+        if not self.smoothing:
+            return
+        self.yield_rate += self.smoothing * ((1.0 if productive else 0.0) - self.yield_rate)
+        interval = self.max_interval * (self.min_interval / self.max_interval) ** self.yield_rate
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def _jittered(self, delay):
+        if not self.jitter or delay <= 0:
+            return delay
+        spread = self.interval * self.jitter
+        return max(0.0, delay + self.rng.uniform(-spread, spread))
+
+    def run_once(self):
+        """Run the job unless a previous run is still in progress"""
+        if not self._lock.acquire(blocking=False):
+            self.overlaps_prevented += 1
+            print("[SCHEDULER] Previous run still in progress, skipping this tick")
+            return None
+
+        try:
+            started = self.clock.monotonic()
+            result = None
+            try:
+                result = self.job()
+            except Exception as e:
+                print(f"[ERROR] Exception in scheduled run: {e}")
+            productive = self._is_new(result)
+            self._adapt(productive)
+            self.runs += 1
+            elapsed = self.clock.monotonic() - started
+            print(
+                f"[SCHEDULER] Run {self.runs} took {elapsed:.1f}s, "
+                f"{'new disaster found' if productive else 'nothing new'}; "
+                f"interval now {self.interval:.0f}s"
+            )
+            return result
+        finally:
+            self._lock.release()
+
+    def _schedule_next(self):
+        """Advance next_tick past now on the fixed-rate grid, counting skipped ticks"""
+        now = self.clock.monotonic()
+        if self.next_tick is None:
+            self.next_tick = now
+        self.next_tick += self.interval
+        if self.next_tick <= now:
+            missed = int((now - self.next_tick) // self.interval) + 1
+            self.skipped_ticks += missed
+            self.next_tick += missed * self.interval
+            print(f"[SCHEDULER] Run overran, skipped {missed} tick(s)")
+        return self.next_tick - now
+
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def run_forever(self, max_runs=None):
+        """Loop until stop() is called or max_runs runs have completed"""
+        self.next_tick = self.clock.monotonic()
+        while not self._stopped.is_set():
+            self.run_once()
+            # The job itself may have asked to stop; do not sleep a whole interval first
+            if self._stopped.is_set() or (max_runs is not None and self.runs >= max_runs):
+                break
+            delay = self._jittered(self._schedule_next())
+            print(f"\n[INFO] Sleeping for {delay:.0f}s before next run...\n")
+            self.clock.sleep(delay)
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "interval": self.interval,
+            "yield_rate": round(self.yield_rate, 3),
+            "skipped_ticks": self.skipped_ticks,
+            "overlaps_prevented": self.overlaps_prevented,
+        }
+
+
+def scheduler_from_env(job, clock=None):
+    """Build a scheduler configured from DISASTER_POLL_* environment variables"""
+    return AdaptiveScheduler(
+        job,
+        base_interval=float(os.getenv("DISASTER_POLL_INTERVAL", "3600")),
+        min_interval=float(os.getenv("DISASTER_POLL_MIN_INTERVAL", "900")),
+        max_interval=float(os.getenv("DISASTER_POLL_MAX_INTERVAL", str(4 * 3600))),
+        smoothing=float(os.getenv("DISASTER_POLL_SMOOTHING", "0.3")),
+        jitter=float(os.getenv("DISASTER_POLL_JITTER", "0.1")),
+        clock=clock,
+    )
@@ -0,0 +1,174 @@
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from types import SimpleNamespace
+from resources import PipelineResources, rss_bytes
+
+# Distinct places the stub search agent cycles through, so the weather cache sees hits and misses
+SOAK_LOCATIONS = 24
+
+
+class _StubCompletions:
+    def __init__(self, agent, iteration, weather_bytes):
+        self.agent = agent
+        self.iteration = iteration
+        self.weather_bytes = weather_bytes
+
+    def _content(self):
+        place = self.iteration[0] % SOAK_LOCATIONS
+        if self.agent == "search":
+            return json.dumps({
+                "title": f"Soak flood {place}",
+                "description": f"Simulated flooding in region {place}",
+                "readmore": f"https://example.com/disasters/{place}",
+                "location": f"Region {place}",
+            })
+        if self.agent == "bbox":
+            lon, lat = -170 + place * 13, -60 + place * 5
+            return json.dumps({"min_lon": lon, "min_lat": lat, "max_lon": lon + 1.5, "max_lat": lat + 1.5})
+        if self.agent == "weather":
+            # Weather answers are the largest payloads the loop handles
+            return "Heavy rain expected. " * (self.weather_bytes // 21)
+        if self.agent == "analysis":
+            return f"Relief estimate for region {place}.\nAMOUNT: ${10000 + place * 250:,}"
+        return "Tweet posted."
+
+    def create(self, model, messages, **kwargs):
+        content = self._content()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=len(content) // 4),
+        )
+
+
+class _StubOpenAI:
+    def __init__(self, agent, iteration, weather_bytes):
+        self.chat = SimpleNamespace(completions=_StubCompletions(agent, iteration, weather_bytes))
+
+    def close(self):
+        pass
+
+
+class _StubDynamoDB:
+    def __init__(self):
+        self.writes = 0
+        self.meta = SimpleNamespace(client=SimpleNamespace(transact_write_items=self._transact, close=lambda: None))
+
+    def _transact(self, TransactItems):
+        self.writes += 1
+
+
+def _slope(points):
+    """Least-squares growth per iteration of (iteration, value) points"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance if variance else 0.0
+
+
+def soak(workdir, iterations, warmup, sample_every, weather_bytes, inject_leak=0):
+    """
+    Run the disaster flow against in-process stubs and sample memory as it goes.
+    Samples before the warmup ends are ignored: caches (weather, checkpoints,
+    ledgers) fill up to their bounds there and are expected to grow.
+    """
+    import main
+    from checkpoints import CheckpointStore
+    from geo_cache import GeoWeatherCache
+
+    iteration = [0]
+    resources = PipelineResources(
+        openai_factory=lambda agent: _StubOpenAI(agent, iteration, weather_bytes),
+        dynamodb_factory=_StubDynamoDB,
+    )
+    store = CheckpointStore(os.path.join(workdir, "checkpoints"))
+    main.geo_weather_cache = GeoWeatherCache(path=os.path.join(workdir, "geo_cache.json"))
+    leaked = []
+
+    tracemalloc.start()
+    baseline = None
+    samples = []
+    started = time.perf_counter()
+    try:
+        for iteration[0] in range(1, iterations + 1):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                main.run_disaster_flow(store, resources)
+            if inject_leak:
+                leaked.append(bytearray(inject_leak))
+            if iteration[0] % sample_every == 0 or iteration[0] == iterations:
+                gc.collect()
+                traced, _ = tracemalloc.get_traced_memory()
+                samples.append((iteration[0], traced, rss_bytes()))
+                if iteration[0] >= warmup and baseline is None:
+                    baseline = tracemalloc.take_snapshot()
+                print(f"[SOAK] {iteration[0]:>6} runs  traced {traced / 2**20:7.2f} MB  "
+                      f"rss {samples[-1][2] / 2**20:7.1f} MB")
+        top = []
+        if baseline is not None:
+            top = tracemalloc.take_snapshot().compare_to(baseline, "lineno")[:5]
+    finally:
+        tracemalloc.stop()
+        resources.close()
+
+    steady = [sample for sample in samples if sample[0] >= warmup]
+    return {
+        "iterations": iterations,
+        "seconds": round(time.perf_counter() - started, 1),
+        "clients_created": resources.created,
+        "traced_growth_per_run": _slope([(x, traced) for x, traced, _ in steady]),
+        "rss_growth_mb": (steady[-1][2] - steady[0][2]) / 2**20 if steady else 0.0,
+        "top_growth": [str(stat) for stat in top],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the disaster loop against stubs and fail on memory growth")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200, help="Runs before growth is measured")
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--weather-bytes", type=int, default=64 * 1024, help="Size of each stub weather answer")
+    parser.add_argument("--max-growth-bytes", type=float, default=512,
+                        help="Allowed traced-memory growth per run after warmup")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=16,
+                        help="Allowed RSS growth between the end of warmup and the last run")
+    parser.add_argument("--inject-leak", type=int, default=0, metavar="BYTES",
+                        help="Deliberately keep this many bytes per run, to check the detector")
+    args = parser.parse_args(argv)
+    if args.warmup >= args.iterations:
+        parser.error("--warmup must be smaller than --iterations")
+
+    # Checkpoints and the weather cache go to a scratch directory, never the real ones
+    with tempfile.TemporaryDirectory(prefix="disaster-soak-") as workdir:
+        result = soak(workdir, args.iterations, args.warmup, args.sample_every, args.weather_bytes, args.inject_leak)
+    print(f"[SOAK] {result['iterations']} runs in {result['seconds']}s, "
+          f"{result['clients_created']} clients created")
+    print(f"[SOAK] traced growth {result['traced_growth_per_run']:.0f} B/run, "
+          f"RSS growth {result['rss_growth_mb']:.1f} MB after warmup")
+
+    leaks = []
+    if result["traced_growth_per_run"] > args.max_growth_bytes:
+        leaks.append(f"traced memory grows {result['traced_growth_per_run']:.0f} B/run "
+                     f"(limit {args.max_growth_bytes:.0f})")
+    if result["rss_growth_mb"] > args.max_rss_growth_mb:
+        leaks.append(f"RSS grew {result['rss_growth_mb']:.1f} MB (limit {args.max_rss_growth_mb:.0f})")
+    if leaks:
+        for leak in leaks:
+            print(f"[SOAK] LEAK: {leak}")
+        for stat in result["top_growth"]:
+            print(f"[SOAK]   {stat}")
+        return 1
+    print("[SOAK] Memory is flat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Pipeline modules are imported the way the container runs them, from the pipeline directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
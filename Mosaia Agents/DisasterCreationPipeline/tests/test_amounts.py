@@ -0,0 +1,86 @@
+import random
+from decimal import Decimal
+import pytest
+from amounts import extract_amount, extract_labeled_amount, format_amount, parse_amount, parse_amounts
+
+# amounts.py is shared with the voting pipeline (test_shared_copies keeps the copies identical),
+# so these cases cover both services
+
+
+def format_variants(value):
+    """Ways an agent might write the same amount, each paired with the value it should parse to"""
+    whole = int(value)
+    cents = value.quantize(Decimal("0.01"))
+    yield f"AMOUNT: ${whole:,}", Decimal(whole)
+    yield f"AMOUNT: {whole}", Decimal(whole)
+    yield f"AMOUNT: ${cents:,}", cents
+    yield f"AMOUNT: USD {cents}", cents
+    yield f"AMOUNT: {cents} USDC", cents
+    if whole >= 1000:
+        thousands = (Decimal(whole) / 1000).quantize(Decimal("0.1"))
+        yield f"AMOUNT: ${thousands}k", thousands * 1000
+    if whole >= 1_000_000:
+        millions = (Decimal(whole) / 1_000_000).quantize(Decimal("0.01"))
+        yield f"AMOUNT: {millions}M", millions * 1_000_000
+        yield f"AMOUNT: ${millions} million", millions * 1_000_000
+
+
+def test_generated_agent_outputs_round_trip():
+    # A fixed-seed sample of 2000 amounts up to 50M, each written in every format above;
+    # the seed keeps failures reproducible
+    rng = random.Random(7)
+    failures = []
+    for _ in range(2000):
+        value = Decimal(rng.randint(1, 50_000_000_00)) / 100
+        for text, expected in format_variants(value):
+            noisy = f"Analysis complete.\n{text}\nREASONING: flood damage across the region."
+            got = extract_labeled_amount(noisy)
+            if got != expected:
+                failures.append((text, expected, got))
+    assert failures == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,500.75", Decimal("1500.75")),
+    ("2.5k", Decimal(2500)),
+    ("$1.2M", Decimal(1_200_000)),
+    ("$1.2 million", Decimal(1_200_000)),
+    ("US$ 3bn", Decimal(3_000_000_000)),
+    ("costs 2.5k.", Decimal(2500)),
+    # Letter suffixes only count when they touch the number
+    ("1500 b/c of the flooding", Decimal(1500)),
+    ("1500b/c of the flooding", Decimal(1500)),
+    ("built in 300 B.C.", Decimal(300)),
+    ("5 k", Decimal(5)),
+    ("2.5kg of rice", Decimal("2.5")),
+    # Units that share a suffix letter are not multipliers
+    ("rainfall 50mm", Decimal(50)),
+    ("50MM of rain", Decimal(50)),
+    ("no amount here", None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("AMOUNT: 800 USDC", Decimal(800)),
+    ("Raise it.\namount: $1.5k", Decimal(1500)),
+    ("We need 2 boats and 1500 USDC", Decimal(1500)),
+    ("Lower it to $800.", Decimal(800)),
+    ("about 20 dollars", Decimal(20)),
+    ("We need 2 boats", None),
+    ("1500", None),
+])
+def test_extract_amount_needs_a_label_or_currency(text, expected):
+    assert extract_amount(text) == expected
+
+
+def test_format_amount_is_plain_decimal():
+    assert format_amount(Decimal("1.2E+6")) == "1200000"
+    assert format_amount(Decimal("12.50")) == "12.5"
+
+
+def test_batch_parsing_matches_single_parsing():
+    texts = ["AMOUNT: $1,500", "AMOUNT: 2.5k", None, "no amount", "AMOUNT: $1.2 million"]
+    assert parse_amounts(texts, label="AMOUNT") == [extract_labeled_amount(text) for text in texts]
+    assert parse_amounts(texts) == [parse_amount(text) for text in texts]
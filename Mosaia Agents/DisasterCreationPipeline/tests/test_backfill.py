@@ -0,0 +1,131 @@
+import argparse
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import backfill
+
+
+class FakeEventsTable:
+    """gods-hand-events in memory; scan can be made to race a concurrent writer"""
+
+    def __init__(self, items, on_scan=None):
+        self.items = items
+        self.on_scan = on_scan
+        self.updates = []
+
+    def scan(self, **kwargs):
+        page = [dict(item) for item in self.items.values()]
+        if self.on_scan:
+            self.on_scan(self.items)
+        return {"Items": page}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression, ExpressionAttributeNames,
+                    ExpressionAttributeValues):
+        item = self.items.get(Key["id"])
+        for clause in ConditionExpression.split(" AND "):
+            if clause == "attribute_exists(id)":
+                holds = item is not None
+            elif clause.startswith("attribute_not_exists("):
+                holds = ExpressionAttributeNames[clause[len("attribute_not_exists("):-1]] not in item
+            else:
+                name, _, value = clause.split()
+                holds = item.get(ExpressionAttributeNames[name]) == ExpressionAttributeValues[value]
+            if not holds:
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}},
+                                  "UpdateItem")
+        for assignment in UpdateExpression.removeprefix("SET ").split(", "):
+            name, value = assignment.split(" = ")
+            item[ExpressionAttributeNames[name]] = ExpressionAttributeValues[value]
+        self.updates.append(Key["id"])
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get(Key["id"])
+        return {"Item": dict(item)} if item else {}
+
+
+def run(table, monkeypatch, dry_run=False, stage=backfill._normalize_amount, checkpoint=None):
+    monkeypatch.setattr(backfill, "_dynamodb_resource", lambda: SimpleNamespace(Table=lambda name: table))
+    args = argparse.Namespace(table="events", segments=1, page_size=100, dry_run=dry_run)
+    progress = backfill.BackfillProgress(checkpoint, "events", "normalize-amount", 1)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return backfill.run_segment(0, args, stage, executor, progress)
+
+
+def test_only_the_changed_attribute_is_written(monkeypatch):
+    def reconciler_writes(items):
+        # The reconciler confirms the event on chain while the backfill page is being processed
+        items["e1"].update(disaster_hash="0xabc", chain_status="confirmed")
+
+    table = FakeEventsTable(
+        {"e1": {"id": "e1", "estimated_amount_required": "$1,500", "chain_status": "pending"}},
+        on_scan=reconciler_writes
+    )
+    state = run(table, monkeypatch)
+
+    assert table.items["e1"] == {"id": "e1", "estimated_amount_required": "1500",
+                                 "disaster_hash": "0xabc", "chain_status": "confirmed"}
+    assert state["changed"] == 1
+
+
+def test_row_changed_after_the_read_is_left_alone(monkeypatch):
+    def live_rescore(items):
+        items["e1"]["estimated_amount_required"] = "2000"
+
+    table = FakeEventsTable({"e1": {"id": "e1", "estimated_amount_required": "$1,500"}}, on_scan=live_rescore)
+    state = run(table, monkeypatch)
+
+    assert table.items["e1"]["estimated_amount_required"] == "2000"
+    assert state["changed"] == 0
+    assert state["conflicts"] == 1
+
+
+def test_deleted_row_is_not_recreated(monkeypatch):
+    table = FakeEventsTable({"e1": {"id": "e1", "estimated_amount_required": "$1,500"}},
+                            on_scan=lambda items: items.clear())
+    state = run(table, monkeypatch)
+
+    assert table.items == {}
+    assert state["conflicts"] == 1
+
+
+def test_dry_run_writes_nothing(monkeypatch):
+    table = FakeEventsTable({"e1": {"id": "e1", "estimated_amount_required": "$1,500"}})
+    state = run(table, monkeypatch, dry_run=True)
+
+    assert table.updates == []
+    assert state["changed"] == 1
+
+
+def test_failed_rows_are_retried_when_the_backfill_is_rerun(monkeypatch, tmp_path):
+    checkpoint = str(tmp_path / "progress.json")
+    table = FakeEventsTable({"e1": {"id": "e1", "estimated_amount_required": "$1,500"},
+                             "e2": {"id": "e2", "estimated_amount_required": "$2,000"}})
+
+    def flaky(item):
+        if item["id"] == "e2":
+            raise RuntimeError("agent timed out")
+        return backfill._normalize_amount(item)
+
+    first = run(table, monkeypatch, stage=flaky, checkpoint=checkpoint)
+    assert first["done"] and first["failed_ids"] == ["e2"] and first["failed"] == 1
+    assert table.items["e2"]["estimated_amount_required"] == "$2,000"
+
+    # The scan has finished, so only the failed row is read again
+    table.scan = None
+    second = run(table, monkeypatch, checkpoint=checkpoint)
+    assert second["failed_ids"] == [] and second["failed"] == 0
+    assert table.items["e2"]["estimated_amount_required"] == "2000"
+    assert table.updates == ["e1", "e2"]
+
+
+def test_row_still_failing_stays_in_the_checkpoint(monkeypatch, tmp_path):
+    checkpoint = str(tmp_path / "progress.json")
+    table = FakeEventsTable({"e1": {"id": "e1", "estimated_amount_required": "$1,500"}})
+
+    def broken(item):
+        raise RuntimeError("agent timed out")
+
+    run(table, monkeypatch, stage=broken, checkpoint=checkpoint)
+    state = run(table, monkeypatch, stage=broken, checkpoint=checkpoint)
+    assert state["failed_ids"] == ["e1"]
+    assert backfill.BackfillProgress(checkpoint, "events", "normalize-amount", 1).totals()["failed"] == 1
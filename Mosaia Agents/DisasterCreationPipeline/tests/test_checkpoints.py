@@ -0,0 +1,111 @@
+import json
+import os
+from datetime import timedelta
+import pytest
+import checkpoints
+from checkpoints import CheckpointStore, _write_json_atomic
+
+
+def crash_in(stage_name):
+    def fn():
+        raise RuntimeError(f"worker killed during {stage_name}")
+    return fn
+
+
+def test_stage_runs_once_and_is_reused_after_a_crash(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    calls = []
+
+    first = store.resume_or_start()
+    assert first.stage("bbox", lambda: calls.append("bbox") or {"bbox": [1, 2, 3, 4]}) == {"bbox": [1, 2, 3, 4]}
+    with pytest.raises(RuntimeError):
+        first.stage("weather", crash_in("weather"))
+
+    # The next scheduler tick picks the same run up
+    second = store.resume_or_start()
+    assert second.run_id == first.run_id
+    assert second.resumed
+    assert second.stage("bbox", lambda: calls.append("bbox again")) == {"bbox": [1, 2, 3, 4]}
+    assert second.stage("weather", lambda: "sunny") == "sunny"
+    assert calls == ["bbox"]
+    assert not second.has("analysis")
+
+
+def test_completed_run_is_not_resumed(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    run = store.resume_or_start()
+    run.save("disaster", {"title": "Flood"})
+    run.complete()
+
+    assert store.resume_or_start().run_id != run.run_id
+
+
+def test_run_is_abandoned_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_MAX_ATTEMPTS", 2)
+    store = CheckpointStore(str(tmp_path))
+    run = store.resume_or_start()
+    assert store.resume_or_start().run_id == run.run_id
+
+    fresh = store.resume_or_start()
+    assert fresh.run_id != run.run_id
+    with open(run.path) as f:
+        assert json.load(f)["abandoned"]
+
+
+@pytest.mark.parametrize("age_hours, resumed", [(5.9, True), (6.1, False)])
+def test_runs_are_reused_within_the_max_age(tmp_path, monkeypatch, age_hours, resumed):
+    store = CheckpointStore(str(tmp_path))
+    run = store.resume_or_start()
+    started = checkpoints._now()
+    monkeypatch.setattr(checkpoints, "_now", lambda: started + timedelta(hours=age_hours))
+
+    assert (store.resume_or_start().run_id == run.run_id) is resumed
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    (tmp_path / "broken.json").write_text("{\"run_id\": ")
+    run = CheckpointStore(str(tmp_path)).resume_or_start()
+    assert run.run_id and not run.resumed
+
+
+def test_prune_keeps_the_newest_finished_runs(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    finished = []
+    for _ in range(4):
+        run = store.resume_or_start()
+        run.complete()
+        finished.append(run.path)
+    unfinished = store.resume_or_start()
+
+    store.prune(keep=2)
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in
+                                                  finished[2:] + [unfinished.path])
+
+
+def test_atomic_write_keeps_the_old_file_when_interrupted(tmp_path, monkeypatch):
+    path = str(tmp_path / "run.json")
+    _write_json_atomic(path, {"stages": {"bbox": 1}})
+
+    def killed(src, dst):
+        raise OSError("killed before rename")
+
+    monkeypatch.setattr(checkpoints.os, "replace", killed)
+    with pytest.raises(OSError):
+        _write_json_atomic(path, {"stages": {"bbox": 1, "weather": 2}})
+
+    with open(path) as f:
+        assert json.load(f) == {"stages": {"bbox": 1}}
+
+
+def test_half_written_temp_file_does_not_block_resume(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    run = store.resume_or_start()
+    run.save("bbox", [1, 2, 3, 4])
+    # A crash mid-write leaves only the temp file truncated
+    with open(f"{run.path}.tmp", "w") as f:
+        f.write("{\"stages\": {\"bb")
+
+    resumed = store.resume_or_start()
+    assert resumed.run_id == run.run_id
+    assert resumed.get("bbox") == [1, 2, 3, 4]
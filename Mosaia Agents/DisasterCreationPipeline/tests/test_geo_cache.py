@@ -0,0 +1,89 @@
+from geo_cache import BBox, GeoWeatherCache, overlap, parse_bbox
+
+CITY = BBox(13.3, 52.4, 13.6, 52.6)
+NEAR_CITY = BBox(13.35, 52.42, 13.62, 52.58)
+ELSEWHERE = BBox(-74.1, 40.6, -73.8, 40.9)
+CONTINENT = BBox(-10.0, 35.0, 40.0, 70.0)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(clock=None, **kwargs):
+    return GeoWeatherCache(path=None, clock=clock or Clock(), **kwargs)
+
+
+def test_overlapping_area_reuses_the_answer():
+    cache = make_cache()
+    cache.put(CITY, "rain")
+    assert cache.get(NEAR_CITY) == "rain"
+    assert cache.stats()["hits"] == 1
+
+
+def test_distant_area_misses():
+    cache = make_cache()
+    cache.put(CITY, "rain")
+    assert cache.get(ELSEWHERE) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_region_weather_is_not_reused_for_a_city_inside_it_or_the_other_way_round():
+    cache = make_cache()
+    cache.put(CONTINENT, "mild across Europe")
+    assert cache.get(CITY) is None
+
+    cache = make_cache()
+    cache.put(CITY, "flooding in Berlin")
+    assert cache.get(CONTINENT) is None
+    assert overlap(CITY, CONTINENT) == overlap(CONTINENT, CITY) < 0.01
+
+
+def test_answers_expire_after_the_bucket():
+    clock = Clock()
+    cache = make_cache(clock, bucket_seconds=3600)
+    cache.put(CITY, "rain")
+    clock.now += 3601
+    assert cache.get(CITY) is None
+
+
+def test_oldest_entries_are_evicted_beyond_the_limit():
+    clock = Clock()
+    cache = make_cache(clock, max_entries=2)
+    for i, box in enumerate([CITY, ELSEWHERE, CONTINENT]):
+        clock.now += 1
+        cache.put(box, f"weather {i}")
+
+    assert cache.get(CITY) is None
+    assert cache.get(ELSEWHERE) == "weather 1"
+    assert cache.get(CONTINENT) == "weather 2"
+    assert cache.stats()["entries"] == 2
+
+
+def test_large_boxes_are_indexed_on_a_bounded_number_of_cells():
+    clock = Clock()
+    cache = make_cache(clock, max_cells=64)
+    for i in range(20):
+        clock.now += 1
+        cache.put(BBox(-170.0 + i, -80.0, 170.0 - i, 80.0), f"weather {i}")
+    # 20 boxes this size covered millions of 0.5 degree cells when every cell was indexed
+    assert cache.stats()["cells"] <= 20 * 64
+    assert cache.get(BBox(-169.0, -80.0, 169.0, 80.0)) == "weather 1"
+
+
+def test_entries_survive_a_reload(tmp_path):
+    path = str(tmp_path / "geo.json")
+    clock = Clock()
+    GeoWeatherCache(path=path, clock=clock).put(CITY, "rain")
+    assert GeoWeatherCache(path=path, clock=clock).get(NEAR_CITY) == "rain"
+
+
+def test_parse_bbox_formats():
+    assert parse_bbox('{"bbox": [13.3, 52.4, 13.6, 52.6]}') == CITY
+    assert parse_bbox('{"west": 13.3, "south": 52.4, "east": 13.6, "north": 52.6}') == CITY
+    assert parse_bbox("13.3, 52.4, 13.6, 52.6") == CITY
+    assert parse_bbox("somewhere in Germany") is None
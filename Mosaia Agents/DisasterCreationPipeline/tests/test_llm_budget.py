@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import llm_budget
+from llm_budget import PromptOverBudget, UsageLedger, build_prompt, tracked_completion, tracked_completion_async
+
+# llm_budget.py is shared with the voting pipeline (test_shared_copies keeps the copies identical),
+# so these cases cover both services
+
+
+@pytest.fixture
+def caps(monkeypatch):
+    monkeypatch.setattr(llm_budget, "STAGE_PROMPT_CAPS", {"analysis": 1000})
+    monkeypatch.setattr(llm_budget, "LLM_PRICING", {"m": {"prompt": 1.0, "completion": 2.0}})
+
+
+def completion(content, usage=None):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+class FakeClient:
+    """chat.completions.create returning a canned completion; counts calls"""
+
+    def __init__(self, reply, is_async=False):
+        self.calls = 0
+
+        def create(**kwargs):
+            self.calls += 1
+            return reply
+
+        async def create_async(**kwargs):
+            return create(**kwargs)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create_async if is_async else create))
+
+
+def test_prompt_under_the_cap_is_untouched(caps):
+    assert build_prompt("Title: {title}", {"title": "Flood"}, "analysis") == "Title: Flood"
+
+
+def test_truncation_cuts_the_longest_field_and_keeps_instructions(caps):
+    weather = "rain " * 1000
+    prompt = build_prompt("Estimate the AMOUNT.\n{title}\n{weather}", {"title": "Flood", "weather": weather},
+                          "analysis", truncatable=("weather",))
+
+    assert len(prompt) <= 1000
+    assert prompt.startswith("Estimate the AMOUNT.\nFlood\nrain rain")
+    assert "[truncated" in prompt
+
+
+def test_fields_are_not_cut_below_the_minimum(caps):
+    prompt = build_prompt("{instructions}{notes}", {"instructions": "x" * 2000, "notes": "y" * 500}, "analysis",
+                          truncatable=("notes",))
+    assert prompt.startswith("x" * 2000)
+    assert prompt.count("y") >= llm_budget.MIN_FIELD_CHARS
+
+
+def test_child_ledger_rolls_up_into_its_parent(caps):
+    process = UsageLedger("process")
+    run = UsageLedger("run", parent=process)
+    run.record("bbox", "m", 1000, 500, 1.5)
+    run.record("analysis", "m", 2000, 0, 0.5)
+
+    for snapshot in (run.snapshot(), process.snapshot()):
+        assert snapshot["total"]["calls"] == 2
+        assert snapshot["total"]["prompt_tokens"] == 3000
+        assert snapshot["total"]["cost_usd"] == pytest.approx(1 + 1 + 2)
+        assert snapshot["by_model"]["m"]["max_latency_seconds"] == 1.5
+    run.reset()
+    assert run.snapshot()["total"]["calls"] == 0
+    assert process.snapshot()["total"]["calls"] == 2
+
+
+def test_tracked_completion_records_reported_usage(caps):
+    ledger = UsageLedger("test")
+    reply = completion("ok", SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+    assert tracked_completion(FakeClient(reply), "analysis", "m", [{"role": "user", "content": "hi"}],
+                              ledger=ledger) is reply
+
+    stage = ledger.snapshot()["by_stage"]["analysis"]
+    assert (stage["calls"], stage["prompt_tokens"], stage["completion_tokens"]) == (1, 12, 3)
+
+
+def test_tracked_completion_estimates_missing_usage(caps):
+    ledger = UsageLedger("test")
+    tracked_completion(FakeClient(completion("a" * 40)), "analysis", "m",
+                       [{"role": "user", "content": "b" * 400}], ledger=ledger)
+
+    stage = ledger.snapshot()["by_stage"]["analysis"]
+    assert (stage["prompt_tokens"], stage["completion_tokens"]) == (100, 10)
+
+
+def test_async_completion_is_recorded(caps):
+    ledger = UsageLedger("test")
+    reply = completion("ok", SimpleNamespace(prompt_tokens=7, completion_tokens=2))
+    asyncio.run(tracked_completion_async(FakeClient(reply, is_async=True), "fact-check", "m",
+                                         [{"role": "user", "content": "hi"}], ledger=ledger))
+
+    assert ledger.snapshot()["by_model"]["m"]["prompt_tokens"] == 7
+
+
+def test_prompt_over_the_cap_is_not_sent(caps):
+    ledger = UsageLedger("test")
+    client = FakeClient(completion("ok"))
+    with pytest.raises(PromptOverBudget):
+        tracked_completion(client, "analysis", "m", [{"role": "user", "content": "x" * 1001}], ledger=ledger)
+
+    assert client.calls == 0
+    assert ledger.snapshot()["total"]["calls"] == 0
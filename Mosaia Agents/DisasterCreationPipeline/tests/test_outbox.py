@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+import outbox
+
+CREATED_AT = "2026-01-01T00:00:00.000Z"
+
+
+class FakeTable:
+    """A DynamoDB table in memory, honouring the SET and condition expressions the outbox uses"""
+
+    def __init__(self, items=None):
+        self.items = items or {}
+
+    def put_item(self, Item, ConditionExpression=None):
+        if ConditionExpression and Item["id"] in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}}, "PutItem")
+        self.items[Item["id"]] = dict(Item)
+
+    def scan(self, **kwargs):
+        # Every test entry is open, so the status filter is not evaluated
+        return {"Items": [dict(item) for item in self.items.values()]}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None,
+                    ExpressionAttributeNames=None):
+        names = ExpressionAttributeNames or {}
+        item = self.items.get(Key["id"])
+        for clause in (ConditionExpression or "").split(" AND ") if ConditionExpression else []:
+            name = clause[clause.index("(") + 1:-1]
+            present = item is not None and names.get(name, name) in item
+            if present != clause.startswith("attribute_exists("):
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}},
+                                  "UpdateItem")
+        for assignment in UpdateExpression.removeprefix("SET ").split(", "):
+            name, value = assignment.split(" = ")
+            item[names.get(name, name)] = ExpressionAttributeValues[value]
+
+
+class FakeClient:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def transact_write_items(self, TransactItems):
+        if any(action["Put"]["TableName"] not in self.tables for action in TransactItems):
+            raise ClientError({"Error": {"Code": "ResourceNotFoundException", "Message": "Requested resource not found"}},
+                              "TransactWriteItems")
+        for action in TransactItems:
+            put = action["Put"]
+            item = {key: TypeDeserializer().deserialize(value) for key, value in put["Item"].items()}
+            self.tables[put["TableName"]].items[item["id"]] = item
+
+
+def make_dynamodb():
+    tables = {outbox.EVENTS_TABLE_NAME: FakeTable(), outbox.OUTBOX_TABLE_NAME: FakeTable()}
+    return SimpleNamespace(Table=tables.__getitem__, meta=SimpleNamespace(client=FakeClient(tables)), tables=tables)
+
+
+def write_event(dynamodb, target_amount_usd="1500"):
+    event = {"id": "e1", "title": "Flood", "description": "River flood", "created_at": CREATED_AT,
+             "chain_status": "pending"}
+    outbox.write_event_with_outbox(dynamodb, event, target_amount_usd)
+    return dynamodb.tables[outbox.EVENTS_TABLE_NAME].items["e1"], dynamodb.tables[outbox.OUTBOX_TABLE_NAME].items
+
+
+def reconcile(dynamodb, monkeypatch, price=None, create_result="0xhash", events=()):
+    created = []
+    monkeypatch.setattr(outbox, "fetch_created_events", lambda since: list(events))
+    monkeypatch.setattr(outbox, "create_disaster_via_api",
+                        lambda title, description, target: created.append(target) or create_result)
+    reconciler = outbox.OutboxReconciler(dynamodb, price_fn=lambda: price)
+    reconciler.reconcile_once()
+    return reconciler, created
+
+
+def test_entry_is_written_with_the_usd_target(monkeypatch):
+    _, entries = write_event(make_dynamodb())
+    assert entries["e1"]["target_amount_usd"] == "1500"
+    assert "target_amount_vet" not in entries["e1"]
+
+
+def test_missing_vet_price_leaves_the_entry_pending(monkeypatch):
+    dynamodb = make_dynamodb()
+    _, entries = write_event(dynamodb)
+    _, created = reconcile(dynamodb, monkeypatch, price=None)
+
+    assert created == []
+    assert entries["e1"]["status"] == "pending"
+    assert entries["e1"]["attempts"] == 0
+
+
+def test_vet_target_is_converted_at_submit_and_reused_by_retries(monkeypatch):
+    dynamodb = make_dynamodb()
+    _, entries = write_event(dynamodb)
+    _, created = reconcile(dynamodb, monkeypatch, price=0.025, create_result=None)
+    assert created == [60000.0]
+    assert entries["e1"]["target_amount_vet"] == "60000.0"
+
+    # The price moved, but the retry asks for the target the first submission used
+    entries["e1"]["next_attempt_at"] = CREATED_AT
+    _, created = reconcile(dynamodb, monkeypatch, price=0.05)
+    assert created == [60000.0]
+
+
+def test_giving_up_marks_the_event_failed(monkeypatch):
+    dynamodb = make_dynamodb()
+    event, entries = write_event(dynamodb)
+    entries["e1"]["attempts"] = outbox.OUTBOX_MAX_ATTEMPTS
+    reconciler, created = reconcile(dynamodb, monkeypatch, price=0.025)
+
+    assert created == []
+    assert entries["e1"]["status"] == "failed"
+    assert event["chain_status"] == "failed"
+    assert reconciler.failed == 1
+
+
+def test_giving_up_leaves_a_confirmed_event_alone(monkeypatch):
+    dynamodb = make_dynamodb()
+    event, entries = write_event(dynamodb)
+    event.update(disaster_hash="0xabc", chain_status="confirmed")
+    entries["e1"]["attempts"] = outbox.OUTBOX_MAX_ATTEMPTS
+    reconcile(dynamodb, monkeypatch, price=0.025)
+
+    assert entries["e1"]["status"] == "failed"
+    assert event["chain_status"] == "confirmed"
+
+
+def test_event_row_is_still_written_without_the_outbox_table(capsys):
+    dynamodb = make_dynamodb()
+    del dynamodb.tables[outbox.OUTBOX_TABLE_NAME]
+    event = {"id": "e1", "title": "Flood", "description": "River flood", "created_at": CREATED_AT,
+             "chain_status": "pending"}
+
+    assert outbox.write_event_with_outbox(dynamodb, event, "1500")
+    assert dynamodb.tables[outbox.EVENTS_TABLE_NAME].items["e1"]["chain_status"] == "unqueued"
+    assert "--create-table" in capsys.readouterr().out
+    # A retried write of the same row is still recognised
+    assert not outbox.write_event_with_outbox(dynamodb, event, "1500")
+
+
+def created_log(disaster_hash, title="Flood", target_vet="60000.0"):
+    return {"disaster_hash": disaster_hash, "title": title, "creator": "0x" + "00" * 20,
+            "target_amount_wei": int(float(target_vet) * 10**18), "timestamp": outbox._epoch(CREATED_AT) + 5,
+            "tx_id": "0xtx" + disaster_hash[-2:]}
+
+
+def test_entries_are_confirmed_by_the_hash_the_api_returned(monkeypatch):
+    dynamodb = make_dynamodb()
+    entries = dynamodb.tables[outbox.OUTBOX_TABLE_NAME].items
+    events_table = dynamodb.tables[outbox.EVENTS_TABLE_NAME].items
+    # Two creates with the same title and target, submitted in order
+    for event_id, submitted_hash in (("e1", "0xAA"), ("e2", "0xbb")):
+        event = {"id": event_id, "title": "Flood", "description": "River flood", "created_at": CREATED_AT}
+        outbox.write_event_with_outbox(dynamodb, event, "1500")
+        entries[event_id].update(status="submitted", attempts=1, submitted_at=CREATED_AT,
+                                 target_amount_vet="60000.0", submitted_hash=submitted_hash)
+
+    # The second create was mined first
+    reconcile(dynamodb, monkeypatch, events=[created_log("0xbb"), created_log("0xaa")])
+
+    assert events_table["e1"]["disaster_hash"] == "0xaa"
+    assert events_table["e2"]["disaster_hash"] == "0xbb"
+
+
+def test_submit_stores_the_returned_hash(monkeypatch):
+    dynamodb = make_dynamodb()
+    _, entries = write_event(dynamodb)
+    reconcile(dynamodb, monkeypatch, price=0.025, create_result="0xcafe")
+    assert entries["e1"]["submitted_hash"] == "0xcafe"
@@ -0,0 +1,136 @@
+import random
+import pytest
+from scheduler import AdaptiveScheduler, ManualClock
+
+
+def make_scheduler(job, clock, **kwargs):
+    settings = {"base_interval": 100, "min_interval": 50, "max_interval": 400, "jitter": 0}
+    settings.update(kwargs)
+    return AdaptiveScheduler(job, clock=clock, **settings)
+
+
+def test_ticks_stay_on_fixed_rate_grid_when_runs_take_time():
+    clock = ManualClock()
+    starts = []
+
+    def job():
+        starts.append(clock.monotonic())
+        clock.advance(30)  # every run takes 30s of the 100s interval
+
+    scheduler = make_scheduler(job, clock, smoothing=0)
+    scheduler.run_forever(max_runs=5)
+
+    assert starts == [0, 100, 200, 300, 400]
+    # Sleeps cover only what is left of each interval, so run time does not push the cadence back
+    assert clock.sleeps == [70, 70, 70, 70]
+
+
+def test_overrun_skips_missed_ticks_and_resumes_on_the_grid():
+    clock = ManualClock()
+    starts = []
+    durations = iter([10, 250, 10, 10])
+
+    def job():
+        starts.append(clock.monotonic())
+        clock.advance(next(durations))
+
+    scheduler = make_scheduler(job, clock, smoothing=0)
+    scheduler.run_forever(max_runs=4)
+
+    # The 250s run misses the ticks at 200 and 300; the loop picks up at 400 instead of replaying them
+    assert starts == [0, 100, 400, 500]
+    assert scheduler.skipped_ticks == 2
+
+
+def run_results(scheduler, results):
+    intervals = []
+    for result in results:
+        scheduler.job = lambda: result
+        scheduler.run_once()
+        intervals.append(scheduler.interval)
+    return intervals
+
+
+def test_interval_tracks_a_smoothed_rate_of_new_results():
+    scheduler = make_scheduler(None, ManualClock(), smoothing=0.3)
+
+    busy = run_results(scheduler, [f"d{i}" for i in range(30)])
+    assert busy == sorted(busy, reverse=True)
+    assert busy[0] > 50 and busy[-1] == pytest.approx(50, rel=0.01)
+
+    quiet = run_results(scheduler, [None] * 40)
+    assert quiet == sorted(quiet)
+    assert quiet[-1] == pytest.approx(400, rel=0.01)
+
+
+def test_one_run_only_nudges_the_interval():
+    scheduler = make_scheduler(None, ManualClock(), smoothing=0.3)
+    run_results(scheduler, [None] * 40)
+
+    # A single find after a long drought does not halve the interval, and a repeat is not new
+    found, repeat = run_results(scheduler, ["d1", "d1"])
+    assert 200 < found < 400
+    assert found < repeat < 400
+
+
+def test_failing_run_counts_as_unproductive_and_loop_continues():
+    clock = ManualClock()
+
+    def job():
+        raise RuntimeError("agent down")
+
+    scheduler = make_scheduler(job, clock)
+    scheduler.run_forever(max_runs=2)
+
+    assert scheduler.runs == 2
+    assert scheduler.interval > 100
+
+
+def test_first_interval_is_the_base_interval():
+    scheduler = make_scheduler(None, ManualClock(), smoothing=0.3)
+    assert scheduler.interval == 100
+    assert scheduler.max_interval * (scheduler.min_interval / scheduler.max_interval) ** scheduler.yield_rate \
+        == pytest.approx(100)
+
+
+def test_stop_from_inside_the_job_ends_the_loop_without_sleeping():
+    clock = ManualClock()
+    scheduler = make_scheduler(lambda: scheduler.stop(), clock)
+
+    scheduler.run_forever()
+
+    assert scheduler.runs == 1
+    assert scheduler.stopped
+    assert clock.sleeps == []
+
+
+def test_jitter_moves_runs_around_the_grid_without_drifting_off_it():
+    clock = ManualClock()
+    starts = []
+
+    def job():
+        starts.append(clock.monotonic())
+
+    scheduler = make_scheduler(job, clock, jitter=0.1, smoothing=0, rng=random.Random(7))
+    scheduler.run_forever(max_runs=50)
+
+    assert len(set(clock.sleeps)) > 1
+    # Jitter is applied to each sleep, not accumulated into the grid
+    assert all(abs(start - index * 100) <= 10 for index, start in enumerate(starts))
+
+
+def test_overlapping_run_is_skipped():
+    clock = ManualClock()
+    nested = []
+
+    def job():
+        # A second tick firing while this run is still going must not start another run
+        nested.append(scheduler.run_once())
+        return "disaster"
+
+    scheduler = make_scheduler(job, clock)
+    assert scheduler.run_once() == "disaster"
+
+    assert nested == [None]
+    assert scheduler.overlaps_prevented == 1
+    assert scheduler.runs == 1
@@ -0,0 +1,22 @@
+import os
+import pytest
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOTING_DIR = os.path.join(os.path.dirname(PIPELINE_DIR), "VotingVerificationPipeline")
+
+# Each pipeline directory is its own Docker build context, so these modules are copied into both
+# rather than imported from a common package. A fix made to one copy must be made to the other.
+SHARED_MODULES = ["amounts.py", "llm_budget.py", "transport.py"]
+
+
+@pytest.mark.skipif(not os.path.isdir(VOTING_DIR), reason="voting pipeline not checked out next to this one")
+@pytest.mark.parametrize("module", SHARED_MODULES)
+def test_shared_module_copies_are_identical(module):
+    with open(os.path.join(PIPELINE_DIR, module), "rb") as f:
+        creation = f.read()
+    with open(os.path.join(VOTING_DIR, module), "rb") as f:
+        voting = f.read()
+    assert creation == voting, (
+        f"{module} differs between DisasterCreationPipeline and VotingVerificationPipeline; "
+        f"apply the change to both copies"
+    )
@@ -0,0 +1,109 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from transport import DnsCache, HttpTransport
+
+# transport.py is shared with the voting pipeline (test_shared_copies keeps the copies identical),
+# so these cases cover both services
+
+
+class FlakyUpstream(BaseHTTPRequestHandler):
+    """Answers 503 to the first request of each method, then 200"""
+
+    seen = {}
+
+    def _answer(self):
+        self.seen[self.command] = self.seen.get(self.command, 0) + 1
+        status = 503 if self.seen[self.command] == 1 else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = do_HEAD = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    FlakyUpstream.seen = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyUpstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class FakeResolver:
+    def __init__(self):
+        self.lookups = []
+
+    def __call__(self, host, port, *args, **kwargs):
+        self.lookups.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (f"10.0.0.{len(self.lookups)}", port))]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+def test_idempotent_requests_are_retried(upstream, method):
+    transport = HttpTransport(dns_ttl=0)
+    response = transport.request(method, upstream, timeout=5)
+    transport.close()
+
+    assert response.status_code == 200
+    assert FlakyUpstream.seen[method] == 2
+
+
+def test_posts_are_never_retried(upstream):
+    transport = HttpTransport(dns_ttl=0)
+    response = transport.post(upstream, json={"release": 1}, timeout=5)
+    transport.close()
+
+    assert response.status_code == 503
+    assert FlakyUpstream.seen["POST"] == 1
+
+
+def test_dns_answers_expire_after_the_ttl():
+    clock, resolver = FakeClock(), FakeResolver()
+    cache = DnsCache(ttl=30, clock=clock)
+    cache._resolve = resolver
+    cache.watch("api.example")
+
+    first = cache.getaddrinfo("api.example", 443)
+    clock.now += 29
+    assert cache.getaddrinfo("api.example", 443) == first
+    clock.now += 2
+    assert cache.getaddrinfo("api.example", 443) != first
+    assert resolver.lookups == ["api.example", "api.example"]
+
+
+def test_dns_cache_is_bounded_and_skips_other_hosts():
+    resolver = FakeResolver()
+    cache = DnsCache(ttl=30, max_entries=2)
+    cache._resolve = resolver
+    for host in ("a.example", "b.example", "c.example"):
+        cache.watch(host)
+        cache.getaddrinfo(host, 443)
+    cache.getaddrinfo("rpc.example", 443)
+    cache.getaddrinfo("rpc.example", 443)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["hosts"] == 2
+    assert resolver.lookups.count("rpc.example") == 2
+
+
+def test_closing_the_transport_restores_the_system_resolver():
+    original = socket.getaddrinfo
+    transport = HttpTransport(dns_ttl=30)
+    assert socket.getaddrinfo != original
+    transport.close()
+    assert socket.getaddrinfo == original
@@ -0,0 +1,196 @@
+import os
+import time
+import socket
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Connections kept alive per host, and how many distinct hosts keep a pool
+TRANSPORT_POOL_SIZE = int(os.getenv("TRANSPORT_POOL_SIZE", "10"))
+TRANSPORT_POOL_HOSTS = int(os.getenv("TRANSPORT_POOL_HOSTS", "10"))
+# Retries for idempotent requests on connection errors and 502/503/504
+TRANSPORT_RETRIES = int(os.getenv("TRANSPORT_RETRIES", "2"))
+# HTTP/2 needs httpx[http2]; without it requests over HTTP/1.1 keep-alive is used
+TRANSPORT_HTTP2 = os.getenv("TRANSPORT_HTTP2", "false").lower() in ("1", "true", "yes")
+# Seconds to reuse a resolved address; 0 leaves DNS to the system resolver
+TRANSPORT_DNS_TTL = float(os.getenv("TRANSPORT_DNS_TTL", "0"))
+# Resolved addresses kept at most, least recently used dropped first
+TRANSPORT_DNS_CACHE_SIZE = int(os.getenv("TRANSPORT_DNS_CACHE_SIZE", "64"))
+
+
+class DnsCache:
+    """
+    TTL cache in front of socket.getaddrinfo for the hosts an HttpTransport
+    talks to. Lookups for any other host (RPC nodes, AWS) go straight to the
+    system resolver, and at most max_entries answers are kept.
+    """
+
+    def __init__(self, ttl, max_entries=TRANSPORT_DNS_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hosts = OrderedDict()
+        self._resolve = socket.getaddrinfo
+        self.hits = 0
+        self.misses = 0
+
+    def watch(self, host):
+        """Cache lookups for host from now on"""
+        with self._lock:
+            self._hosts[host] = True
+            self._hosts.move_to_end(host)
+            while len(self._hosts) > self.max_entries:
+                self._hosts.popitem(last=False)
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        if host not in self._hosts:
+            return self._resolve(host, port, *args, **kwargs)
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        result = self._resolve(host, port, *args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def install(self):
+        """Route lookups through this cache, reusing one that is already installed"""
+        installed = getattr(socket.getaddrinfo, "__self__", None)
+        if isinstance(installed, DnsCache):
+            return installed
+        socket.getaddrinfo = self.getaddrinfo
+        return self
+
+    def uninstall(self):
+        if getattr(socket.getaddrinfo, "__self__", None) is self:
+            socket.getaddrinfo = self._resolve
+
+    def stats(self):
+        with self._lock:
+            return {"ttl_seconds": self.ttl, "entries": len(self._entries), "hosts": len(self._hosts),
+                    "hits": self.hits, "misses": self.misses}
+
+
+class HttpTransport:
+    """
+    Shared HTTP client for the Render services, CoinGecko and the unlock API.
+    Connections are kept alive per host so repeated calls skip the TCP and
+    TLS handshakes. Responses expose status_code, text, json() and
+    raise_for_status() on either backend.
+    """
+
+    def __init__(self, pool_size=TRANSPORT_POOL_SIZE, pool_hosts=TRANSPORT_POOL_HOSTS,
+                 retries=TRANSPORT_RETRIES, http2=TRANSPORT_HTTP2, dns_ttl=TRANSPORT_DNS_TTL):
+        self.session = requests.Session()
+        # POSTs here create disasters and release funds, so only idempotent methods are retried
+        retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+        self.client = None
+        if http2:
+            if httpx is None:
+                print("[TRANSPORT] TRANSPORT_HTTP2 is set but httpx is not installed, using HTTP/1.1")
+            else:
+                try:
+                    limits = httpx.Limits(max_connections=pool_size * pool_hosts,
+                                          max_keepalive_connections=pool_size * pool_hosts)
+                    self.client = httpx.Client(
+                        transport=httpx.HTTPTransport(http2=True, limits=limits, retries=retries),
+                        headers={"Accept-Encoding": "gzip, deflate"}
+                    )
+                except ImportError:
+                    # httpx is present but the h2 extra is not
+                    print("[TRANSPORT] httpx[http2] is not installed, using HTTP/1.1")
+
+        self.dns_cache = None
+        self._owns_dns_cache = False
+        if dns_ttl > 0:
+            cache = DnsCache(dns_ttl)
+            self.dns_cache = cache.install()
+            self._owns_dns_cache = self.dns_cache is cache
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    @property
+    def backend(self):
+        return "httpx-http2" if self.client is not None else "requests"
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        if self.dns_cache:
+            self.dns_cache.watch(urlsplit(url).hostname)
+        started = time.perf_counter()
+        try:
+            if self.client is not None:
+                response = self.client.request(method, url, **kwargs)
+            else:
+                response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self._record(host, time.perf_counter() - started, error=True)
+            raise
+        self._record(host, time.perf_counter() - started, error=False)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host, latency, error):
+        with self._lock:
+            stats = self._hosts.setdefault(host, {"calls": 0, "errors": 0, "total_latency": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["total_latency"] += latency
+
+    def stats(self):
+        with self._lock:
+            hosts = {
+                host: {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "avg_latency_ms": round(stats["total_latency"] / stats["calls"] * 1000, 1),
+                }
+                for host, stats in self._hosts.items()
+            }
+        return {
+            "backend": self.backend,
+            "hosts": hosts,
+            "dns_cache": self.dns_cache.stats() if self.dns_cache else None,
+        }
+
+    def close(self):
+        self.session.close()
+        if self._owns_dns_cache:
+            self.dns_cache.uninstall()
+        if self.client is not None:
+            self.client.close()
+
+
+http_transport = HttpTransport()
+
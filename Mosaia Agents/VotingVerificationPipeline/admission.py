@@ -0,0 +1,286 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, Request
+
+# Per-client and per-disaster request budgets (requests per minute, burst size)
+CLIENT_RATE_PER_MINUTE = float(os.getenv("RATE_LIMIT_CLIENT_PER_MINUTE", "20"))
+CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "5"))
+DISASTER_RATE_PER_MINUTE = float(os.getenv("RATE_LIMIT_DISASTER_PER_MINUTE", "60"))
+DISASTER_BURST = float(os.getenv("RATE_LIMIT_DISASTER_BURST", "10"))
+# Concurrent calls allowed against each upstream, and how many may wait behind them
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "4"))
+UPSTREAM_QUEUE_SIZE = int(os.getenv("UPSTREAM_QUEUE_SIZE", "16"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "30"))
+# Buckets are dropped once this many keys are tracked (least recently used first)
+MAX_TRACKED_KEYS = 10_000
+# Proxies in front of the service that append to X-Forwarded-For; 0 ignores the header, since without a
+# proxy it is whatever the client sent. Set to 1 when serving through ngrok (the Docker image does).
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+class UpstreamOverloaded(HTTPException):
+    """503 raised when an upstream gate sheds load; handlers let it through unchanged"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate tokens per second"""
+
+    def __init__(self, rate_per_second, capacity, clock=time.monotonic):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def wait_for(self, amount=1.0):
+        """Seconds until amount tokens are available, 0 if they are now"""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def try_take(self, amount=1.0):
+        """Take tokens if available; otherwise return how many seconds until they will be"""
+        wait = self.wait_for(amount)
+        if not wait:
+            self.tokens -= amount
+        return wait
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary string (client address, disaster hash, ...)"""
+
+    def __init__(self, name, per_minute, burst, clock=time.monotonic):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, self.clock)
+            self._buckets[key] = bucket
+            if len(self._buckets) > MAX_TRACKED_KEYS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check(self, key, amount=1.0):
+        """Return 0 if the request is admitted, otherwise the suggested retry delay in seconds"""
+        with self._lock:
+            return self._bucket(key).try_take(amount)
+
+    def refund(self, key, amount=1.0):
+        """Give back tokens taken for a request that was rejected later on"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(bucket.capacity, bucket.tokens + amount)
+
+    def check_all(self, costs):
+        """Take costs[key] tokens from every key's bucket, or from none of them if any falls short"""
+        with self._lock:
+            buckets = {key: self._bucket(key) for key in costs}
+            wait, short_key = 0.0, None
+            for key, bucket in buckets.items():
+                key_wait = bucket.wait_for(costs[key])
+                if key_wait > wait:
+                    wait, short_key = key_wait, key
+            if wait > 0:
+                return wait, short_key
+            for key, bucket in buckets.items():
+                bucket.tokens -= costs[key]
+            return 0.0, None
+
+
+class UpstreamGate:
+    """
+    Concurrency cap for one upstream with a bounded wait queue.
+    Callers beyond the queue are shed immediately instead of piling up.
+    """
+
+    def __init__(self, name, concurrency, queue_size, queue_timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.Semaphore(concurrency)
+        # Coroutines wait for a slot on these threads, so the event loop never blocks on the semaphore
+        self._waiters = ThreadPoolExecutor(max_workers=concurrency + queue_size, thread_name_prefix=f"gate-{name}")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _join_queue(self):
+        with self._lock:
+            if self.in_flight >= self.concurrency and self.waiting >= self.queue_size:
+                METRICS.record(self.name, "shed")
+                raise overloaded(f"{self.name} is at capacity", retry_after=self.queue_timeout)
+            self.waiting += 1
+
+    def _leave_queue(self, acquired):
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.in_flight += 1
+
+    def _admitted(self, acquired):
+        if not acquired:
+            METRICS.record(self.name, "timed_out")
+            raise overloaded(f"Timed out waiting for {self.name}", retry_after=self.queue_timeout)
+        METRICS.record(self.name, "admitted")
+
+    def acquire(self):
+        self._join_queue()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        self._leave_queue(acquired)
+        self._admitted(acquired)
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits without blocking the event loop, and a cancelled waiter holds no slot"""
+        self._join_queue()
+        waiter = self._waiters.submit(self._slots.acquire, True, self.queue_timeout)
+        acquired = False
+        try:
+            acquired = await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            # The waiting thread may still get a slot after the caller has gone; hand it straight back
+            waiter.add_done_callback(lambda done: not done.cancelled() and done.result() and self._slots.release())
+            raise
+        finally:
+            self._leave_queue(acquired)
+        self._admitted(acquired)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "queue_size": self.queue_size,
+            }
+
+
+class AdmissionMetrics:
+    """Counters of admitted and rejected requests per endpoint or upstream"""
+
+    def __init__(self):
+        self._counts = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, name, outcome):
+        with self._lock:
+            self._counts[name][outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+METRICS = AdmissionMetrics()
+
+client_limiter = RateLimiter("client", CLIENT_RATE_PER_MINUTE, CLIENT_BURST)
+disaster_limiter = RateLimiter("disaster", DISASTER_RATE_PER_MINUTE, DISASTER_BURST)
+
+# One gate per upstream; every paid Mosaia call and disaster fetch goes through these
+mosaia_gate = UpstreamGate("mosaia", UPSTREAM_CONCURRENCY, UPSTREAM_QUEUE_SIZE, UPSTREAM_QUEUE_TIMEOUT)
+# Re-vote amount suggestions get their own Mosaia slots, so a fact-check surge cannot time them out
+mosaia_revote_gate = UpstreamGate("mosaia-revote", UPSTREAM_CONCURRENCY, UPSTREAM_QUEUE_SIZE, UPSTREAM_QUEUE_TIMEOUT)
+disaster_api_gate = UpstreamGate("disaster-api", UPSTREAM_CONCURRENCY, UPSTREAM_QUEUE_SIZE, UPSTREAM_QUEUE_TIMEOUT)
+unlock_api_gate = UpstreamGate("unlock-api", UPSTREAM_CONCURRENCY, UPSTREAM_QUEUE_SIZE, UPSTREAM_QUEUE_TIMEOUT)
+
+
+def overloaded(detail, retry_after):
+    return UpstreamOverloaded(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def client_key(request: Request, trusted_hops=TRUSTED_PROXY_HOPS):
+    """
+    Caller's address as seen by the outermost trusted proxy. Each proxy appends
+    the address it received the request from, so only the last trusted_hops
+    entries of X-Forwarded-For are real; anything before them is whatever the
+    client chose to send.
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and trusted_hops > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(endpoint, limiter, key, retry_after):
+    METRICS.record(endpoint, f"rejected_{limiter.name}")
+    print(f"[ADMISSION] Rejected {endpoint} for {limiter.name} {key}, retry in {retry_after:.1f}s")
+    raise HTTPException(
+        status_code=429,
+        detail=f"Rate limit exceeded for this {limiter.name}. Please retry later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def admit(endpoint, request: Request, disaster_hash=None, disaster_hashes=()):
+    """
+    Apply the per-client and per-disaster rate limits, raising 429 when either
+    is exhausted. A batch passes every disaster it touches in disaster_hashes
+    and is charged one request for each, however many votes it groups, since
+    grouping votes per disaster is what the batch endpoint is for; its size is
+    bounded by BATCH_VOTE_MAX instead.
+    """
+    costs = {key.lower().removeprefix("0x"): 1 for key in [disaster_hash, *disaster_hashes] if key}
+
+    client = client_key(request)
+    retry_after = client_limiter.check(client)
+    if retry_after > 0:
+        _reject(endpoint, client_limiter, client, retry_after)
+    if costs:
+        retry_after, key = disaster_limiter.check_all(costs)
+        if retry_after > 0:
+            # The request is not served, so it should not count against the client either
+            client_limiter.refund(client)
+            _reject(endpoint, disaster_limiter, key, retry_after)
+    METRICS.record(endpoint, "admitted")
+
+
+def admission_snapshot():
+    return {
+        "requests": METRICS.snapshot(),
+        "upstreams": {gate.name: gate.snapshot() for gate in (mosaia_gate, mosaia_revote_gate, disaster_api_gate,
+                                                                 unlock_api_gate)},
+    }
@@ -0,0 +1,107 @@
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+# Multipliers for shorthand suffixes
+_SUFFIXES = {
+    "thousand": Decimal(1_000), "k": Decimal(1_000),
+    "million": Decimal(1_000_000), "mn": Decimal(1_000_000), "m": Decimal(1_000_000),
+    "billion": Decimal(1_000_000_000), "bn": Decimal(1_000_000_000), "b": Decimal(1_000_000_000),
+}
+
+# Currency markers and suffixes are case-insensitive even when the label is not
+_CURRENCY = r"(?:[$€£₹]|(?i:US\$|USDC?))"
+_NUMBER = r"(?P<number>\d+(?:,\d{3})*(?:\.\d+)?|\.\d+)"
+# Letter suffixes must touch the number ("2.5k", "$1.2M") so "1500 b/c" and "300 B.C." stay plain
+# numbers; the spelled-out words may follow a space on the same line. There is no "mm" (the
+# bankers' million) because rainfall and river levels are written "50mm". Cases are spelled out
+# rather than (?i:)-scoped, which keeps the hot path of parse_amounts cheaper.
+_SUFFIX = (
+    r"(?P<suffix>(?:[bBmM][nN]|[kKmMbB])(?![\w/]|\.\w)"
+    r"|[ \t]*(?i:thousand|million|billion)\b)?"
+)
+_AMOUNT = _CURRENCY + r"?\s*" + _NUMBER + _SUFFIX
+
+AMOUNT_RE = re.compile(_AMOUNT)
+# Same, also noting a currency written after the number ("1500 USDC", "20 dollars")
+MONEY_RE = re.compile(
+    r"(?P<prefix>" + _CURRENCY + r")?\s*" + _NUMBER + _SUFFIX + r"(?P<postfix>\s*(?i:USDC?|dollars?)\b)?"
+)
+
+
+@lru_cache(maxsize=16)
+def _labeled_re(label, ignore_case):
+    return re.compile(re.escape(label) + r"\s*[:=]\s*" + _AMOUNT, re.IGNORECASE if ignore_case else 0)
+
+
+def _to_decimal(match):
+    if match is None:
+        return None
+    number, suffix = match.group("number", "suffix")
+    try:
+        value = Decimal(number.replace(",", ""))
+    except InvalidOperation:
+        return None
+    if suffix:
+        value *= _SUFFIXES[suffix.lstrip().lower()]
+    return value
+
+
+def parse_amount(text):
+    """First money amount in text as a Decimal ("$1,500.75" -> 1500.75, "2.5k" -> 2500), or None"""
+    if text is None:
+        return None
+    return _to_decimal(AMOUNT_RE.search(str(text)))
+
+
+def extract_labeled_amount(text, label="AMOUNT", ignore_case=False):
+    """Amount following "LABEL:" in an agent output, e.g. "AMOUNT: $1.2M" -> 1200000"""
+    if text is None:
+        return None
+    return _to_decimal(_labeled_re(label, ignore_case).search(str(text)))
+
+
+def extract_amount(text, label="AMOUNT"):
+    """
+    Amount after "LABEL:" (any case), otherwise the first amount written with a
+    currency marker. A reply with neither gives None rather than whatever number
+    comes first: "We need 2 boats and 1500 USDC" -> 1500, "2 boats" -> None.
+    """
+    if text is None:
+        return None
+    text = str(text)
+    labeled = extract_labeled_amount(text, label, ignore_case=True)
+    if labeled is not None:
+        return labeled
+    for match in MONEY_RE.finditer(text):
+        if match.group("prefix") or match.group("postfix"):
+            return _to_decimal(match)
+    return None
+
+
+def parse_amounts(texts, label=None):
+    """Batch form of parse_amount / extract_labeled_amount for reprocessing many stored outputs"""
+    search = (_labeled_re(label, False) if label else AMOUNT_RE).search
+    amounts = []
+    append = amounts.append
+    # _to_decimal inlined; the per-row call was a visible share of batch time
+    for text in texts:
+        match = search(text) if text is not None else None
+        if match is None:
+            append(None)
+            continue
+        number, suffix = match.group("number", "suffix")
+        try:
+            value = Decimal(number.replace(",", ""))
+        except InvalidOperation:
+            append(None)
+            continue
+        if suffix:
+            value *= _SUFFIXES[suffix.lstrip().lower()]
+        append(value)
+    return amounts
+
+
+def format_amount(value):
+    """Plain decimal string without exponent or trailing zeros, as stored in DynamoDB"""
+    return format(value.normalize(), "f")
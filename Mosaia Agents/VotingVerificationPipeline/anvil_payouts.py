@@ -0,0 +1,184 @@
+"""
+End-to-end check of the approve → payout batcher → USDC transfer path on a
+local anvil chain forked from Sepolia, so the real USDC contract is used.
+
+    ANVIL_FORK_URL=https://sepolia.example/rpc python anvil_payouts.py
+
+Starts anvil, gives the service wallet (anvil's first development account)
+USDC by writing the token's balance slot, approves several claims through
+/process-vote/ with APPROVE_PAYOUT_MODE=usdc against an in-memory claims
+table, and checks on chain that:
+  - claims for the same NGO were coalesced into one transfer,
+  - every NGO received exactly the sum of its claimed amounts,
+  - approving an already paid claim again moves no money.
+Exits non-zero on the first failed check.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from web3 import Web3
+
+# Anvil's first well-known development key; never holds real funds
+ANVIL_PRIVATE_KEY = "ac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+ANVIL_CHAIN_ID = 31337
+SEPOLIA_USDC = "0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238"
+BALANCE_OF_ABI = [{
+    "inputs": [{"name": "account", "type": "address"}], "name": "balanceOf",
+    "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"
+}]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_anvil(fork_url, port):
+    process = subprocess.Popen(
+        ["anvil", "--fork-url", fork_url, "--chain-id", str(ANVIL_CHAIN_ID), "--port", str(port), "--silent"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    w3 = Web3(Web3.HTTPProvider(f"http://127.0.0.1:{port}"))
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"anvil exited: {process.stderr.read().decode(errors='replace')}")
+        try:
+            if w3.is_connected():
+                return process, w3
+        except Exception:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("anvil did not start within 60s")
+
+
+def fund_with_token(w3, token, holder, amount_units, max_slot=30):
+    """
+    Set holder's token balance by writing the balances mapping entry directly.
+    The mapping's slot differs per token, so each candidate is tried and kept
+    only if balanceOf reflects it.
+    """
+    contract = w3.eth.contract(address=token, abi=BALANCE_OF_ABI)
+    for slot in range(max_slot):
+        key = Web3.keccak(bytes.fromhex(holder[2:].lower().rjust(64, "0") + f"{slot:064x}"))
+        original = w3.eth.get_storage_at(token, key)
+        w3.provider.make_request("anvil_setStorageAt", [token, Web3.to_hex(key), f"0x{amount_units:064x}"])
+        if contract.functions.balanceOf(holder).call() == amount_units:
+            return slot
+        w3.provider.make_request("anvil_setStorageAt", [token, Web3.to_hex(key), Web3.to_hex(original.rjust(32, b"\0"))])
+    raise RuntimeError(f"Could not find the balance slot of {token}")
+
+
+class InMemoryClaims:
+    """Just enough of the gods-hand-claims table for the approve path"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key["id"])
+        return {"Item": dict(item)} if item else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        item = self.items[Key["id"]]
+        item["claim_state"] = ExpressionAttributeValues.get(":s", item["claim_state"])
+        if ":h" in ExpressionAttributeValues:
+            item["claims_hash"] = ExpressionAttributeValues[":h"]
+        return {}
+
+
+def check(condition, message):
+    print(f"[ANVIL] {'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+async def approve_claims(main, claims):
+    from fastapi import Request
+    main.app_loop = asyncio.get_running_loop()
+    await main.rpc_pool.start()
+    try:
+        request = Request({"type": "http", "headers": [], "client": ("anvil", 0)})
+        votes = [main.VoteInput(voteResult="approve", uuid=claim_id, disasterHash="0x" + "11" * 32)
+                 for claim_id in claims]
+        return await asyncio.gather(*(main.process_vote(vote, request) for vote in votes))
+    finally:
+        await main.rpc_pool.close()
+
+
+def run(fork_url):
+    port = free_port()
+    anvil, w3 = start_anvil(fork_url, port)
+    workdir = tempfile.mkdtemp(prefix="anvil-payouts-")
+    try:
+        wallet = w3.eth.account.from_key(ANVIL_PRIVATE_KEY).address
+        usdc = Web3.to_checksum_address(SEPOLIA_USDC)
+        slot = fund_with_token(w3, usdc, wallet, 1_000 * 10**6)
+        print(f"[ANVIL] Funded {wallet} with 1000 USDC (balance slot {slot})")
+
+        os.environ.update({
+            "SEPOLIA_RPC_URL": f"http://127.0.0.1:{port}",
+            "CHAIN_ID": str(ANVIL_CHAIN_ID),
+            "private_key": ANVIL_PRIVATE_KEY,
+            "USDC_CONTRACT_ADDRESS": usdc,
+            "APPROVE_PAYOUT_MODE": "usdc",
+            "PAYOUT_WINDOW_SECONDS": "2",
+            "PAYOUT_AUDIT_PATH": os.path.join(workdir, "payout_audit.jsonl"),
+            "NGROK_ENABLED": "false",
+            "verifyagent": os.environ.get("verifyagent", "anvil"),
+        })
+        import main
+
+        ngo_a, ngo_b = (w3.eth.account.create().address for _ in range(2))
+        items = {
+            "claim-a1": {"id": "claim-a1", "claim_state": "voting", "claimed_amount": 12, "organization_aztec_address": ngo_a},
+            "claim-a2": {"id": "claim-a2", "claim_state": "voting", "claimed_amount": 3, "organization_aztec_address": ngo_a},
+            "claim-b1": {"id": "claim-b1", "claimed_amount": 7, "claim_state": "voting", "organization_aztec_address": ngo_b},
+        }
+        main.voting_table = InMemoryClaims(items)
+        token = w3.eth.contract(address=usdc, abi=BALANCE_OF_ABI)
+        start_block = w3.eth.block_number
+
+        results = asyncio.run(approve_claims(main, list(items)))
+        payouts = {result["payout"]["claim_uuid"]: result["payout"] for result in results}
+
+        check(token.functions.balanceOf(ngo_a).call() == 15 * 10**6, "NGO A received 12 + 3 USDC")
+        check(token.functions.balanceOf(ngo_b).call() == 7 * 10**6, "NGO B received 7 USDC")
+        check(payouts["claim-a1"]["tx_hash"] == payouts["claim-a2"]["tx_hash"],
+              "both of NGO A's claims were paid by one transfer")
+        check(all(item["claim_state"] == "approved" for item in items.values()), "all claims marked approved")
+        check(all(items[claim]["claims_hash"] == payouts[claim]["tx_hash"] for claim in items),
+              "claims_hash records the paying transaction")
+        transfers = w3.eth.block_number - start_block
+        check(transfers == 2, f"two transfer transactions mined ({transfers})")
+
+        # Approving a paid claim again must not move money
+        items["claim-a1"]["claim_state"] = "voting"
+        again = asyncio.run(approve_claims(main, ["claim-a1"]))[0]
+        check(again["payout"]["tx_hash"] == payouts["claim-a1"]["tx_hash"], "repeat approval returns the recorded payout")
+        check(token.functions.balanceOf(ngo_a).call() == 15 * 10**6, "repeat approval paid nothing")
+        print("[ANVIL] All payout checks passed")
+        return 0
+    finally:
+        anvil.terminate()
+        anvil.wait(timeout=10)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Check USDC payouts end to end on a local anvil fork of Sepolia")
+    parser.add_argument("--fork-url", default=os.getenv("ANVIL_FORK_URL"), help="Sepolia RPC to fork (ANVIL_FORK_URL)")
+    args = parser.parse_args(argv)
+    if not args.fork_url:
+        parser.error("--fork-url or ANVIL_FORK_URL is required")
+    return run(args.fork_url)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
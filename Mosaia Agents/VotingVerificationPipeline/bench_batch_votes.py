@@ -0,0 +1,159 @@
+"""
+Throughput of /process-vote/ one claim at a time (what the frontend does)
+against /process-votes/batch, with DynamoDB and the unlock API replaced by
+in-memory fakes that sleep for a configurable round trip.
+
+    python bench_batch_votes.py --claims 200 --disasters 20
+
+Numbers depend only on the simulated latencies, so they show how much of the
+per-claim round-trip cost the batch endpoint removes, not production speed.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import contextlib
+from types import SimpleNamespace
+
+# The app reads its configuration at import time; point it at nothing real
+os.environ.setdefault("SEPOLIA_RPC_URL", "http://127.0.0.1:8545")
+os.environ.setdefault("verifyagent", "benchmark")
+# Anvil's first well-known development key; never holds real funds
+os.environ.setdefault("private_key", "ac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+os.environ.setdefault("NGROK_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_CLIENT_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_CLIENT_BURST", "1000000")
+os.environ.setdefault("RATE_LIMIT_DISASTER_PER_MINUTE", "1000000")
+os.environ.setdefault("PAYOUT_AUDIT_PATH", os.devnull)
+
+import main
+from fastapi import Request
+
+
+class FakeClaimsTable:
+    """gods-hand-claims in memory; every call costs one simulated round trip"""
+
+    def __init__(self, items, latency):
+        self.items = items
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def get_item(self, Key, **kwargs):
+        self._round_trip()
+        item = self.items.get(Key["id"])
+        return {"Item": dict(item)} if item else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        self._round_trip()
+        item = self.items[Key["id"]]
+        item["claim_state"] = ExpressionAttributeValues.get(":s", item["claim_state"])
+        return {}
+
+
+class FakeDynamoDB:
+    def __init__(self, table):
+        self.table = table
+
+    def batch_get_item(self, RequestItems):
+        self.table._round_trip()
+        keys = RequestItems[main.CLAIMS_TABLE_NAME]["Keys"]
+        found = [dict(self.table.items[key["id"]]) for key in keys if key["id"] in self.table.items]
+        return {"Responses": {main.CLAIMS_TABLE_NAME: found}}
+
+
+class FakeUnlockApi:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return SimpleNamespace(
+            status_code=200,
+            text="",
+            json=lambda: {"success": True, "data": {"transactionHash": f"0x{self.calls:064x}"}}
+        )
+
+
+def make_claims(count, disasters):
+    items, votes = {}, []
+    for index in range(count):
+        claim_id = f"claim-{index}"
+        disaster = f"0x{index % disasters:064x}"
+        items[claim_id] = {
+            "id": claim_id,
+            "claim_state": "voting",
+            "claimed_amount": 10 + index,
+            "organization_aztec_address": f"0x{index + 1:040x}",
+        }
+        votes.append(main.VoteInput(voteResult="approve", uuid=claim_id, disasterHash=disaster))
+    return items, votes
+
+
+def request_for(client="bench"):
+    return Request({"type": "http", "headers": [], "client": (client, 0)})
+
+
+async def one_by_one(votes):
+    for vote in votes:
+        await main.process_vote(vote, request_for())
+
+
+async def batched(votes, batch_size, concurrency):
+    for start in range(0, len(votes), batch_size):
+        batch = main.BatchVoteInput(votes=votes[start:start + batch_size], maxConcurrency=concurrency)
+        response = await main.process_votes_batch(batch, request_for())
+        failed = response["summary"]["failed"]
+        if failed:
+            raise RuntimeError(f"{failed} votes failed: {response['results'][:3]}")
+
+
+def measure(label, claims, disasters, db_latency, unlock_latency, run):
+    items, votes = make_claims(claims, disasters)
+    table = FakeClaimsTable(items, db_latency)
+    unlock = FakeUnlockApi(unlock_latency)
+    main.voting_table = table
+    main.dynamodb = FakeDynamoDB(table)
+    main.http_transport = unlock
+
+    started = time.perf_counter()
+    # The handlers log every vote; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(run(votes))
+    elapsed = time.perf_counter() - started
+    approved = sum(1 for item in items.values() if item["claim_state"] == "approved")
+    print(f"{label:<12} {claims:>6} claims  {elapsed:7.2f}s  {claims / elapsed:8.1f} claims/s  "
+          f"{table.calls:>5} DynamoDB calls  {unlock.calls:>5} unlock calls  {approved} approved")
+    return claims / elapsed
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-claim and batch vote processing throughput")
+    parser.add_argument("--claims", type=int, default=200)
+    parser.add_argument("--disasters", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=main.BATCH_VOTE_MAX)
+    parser.add_argument("--concurrency", type=int, default=main.BATCH_VOTE_MAX_CONCURRENCY)
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Seconds per simulated DynamoDB call")
+    parser.add_argument("--unlock-latency", type=float, default=0.05, help="Seconds per simulated unlock call")
+    args = parser.parse_args(argv)
+
+    print(f"DynamoDB {args.db_latency * 1000:.0f} ms/call, unlock API {args.unlock_latency * 1000:.0f} ms/call, "
+          f"{args.disasters} disasters, batch concurrency {args.concurrency}")
+    single = measure("one-by-one", args.claims, args.disasters, args.db_latency, args.unlock_latency, one_by_one)
+    batch = measure("batch", args.claims, args.disasters, args.db_latency, args.unlock_latency,
+                    lambda votes: batched(votes, args.batch_size, args.concurrency))
+    print(f"batch speedup: {batch / single:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
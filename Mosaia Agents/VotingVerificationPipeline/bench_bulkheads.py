@@ -0,0 +1,85 @@
+"""
+Approval latency while fact-checks flood the service, on one shared thread
+pool against the bulkheads main.py uses. The work is time.sleep, so the
+numbers show queueing, not real upstream cost.
+
+    python bench_bulkheads.py --fact-checks 400 --approvals 40
+"""
+import sys
+import time
+import asyncio
+import argparse
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+from bulkhead import BulkheadRegistry
+
+
+async def saturation_demo(fact_checks=400, approvals=40, fact_check_seconds=0.2, approval_seconds=0.02):
+    """Approval latency while fact-checks flood the service: one shared pool against bulkheads"""
+    def fact_check():
+        time.sleep(fact_check_seconds)
+
+    def approve():
+        time.sleep(approval_seconds)
+
+    async def approval_latencies(run_fact_check, run_approval):
+        async def flood():
+            async def one():
+                try:
+                    await run_fact_check(fact_check)
+                except Exception:
+                    pass  # shed fact-checks are the point of the bulkhead
+            await asyncio.gather(*(one() for _ in range(fact_checks)))
+
+        async def timed_approval(delay):
+            await asyncio.sleep(delay)
+            started = time.perf_counter()
+            await run_approval(approve)
+            return (time.perf_counter() - started) * 1000
+
+        # Approvals arrive steadily while the fact-check backlog is still draining
+        flood_task = asyncio.create_task(flood())
+        latencies = await asyncio.gather(*(timed_approval(0.05 + i * 0.025) for i in range(approvals)))
+        await flood_task
+        return sorted(latencies)
+
+    # Before: everything on one pool the size of the Starlette default threadpool
+    shared = ThreadPoolExecutor(max_workers=40)
+    loop = asyncio.get_running_loop()
+    run_shared = lambda fn: loop.run_in_executor(shared, fn)
+    before = await approval_latencies(run_shared, run_shared)
+    shared.shutdown()
+
+    registry = BulkheadRegistry()
+    payouts = registry.add("demo-payouts", workers=8, queue_size=32, priority=2)
+    checks = registry.add("demo-fact-check", workers=8, queue_size=32, priority=0)
+    after = await approval_latencies(checks.run, payouts.run)
+    shed = checks.snapshot()["shed"]
+    registry.shutdown()
+
+    def describe(latencies):
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        return f"p50 {median(latencies):.0f} ms, p95 {p95:.0f} ms, max {latencies[-1]:.0f} ms"
+
+    print(f"[BULKHEAD] {fact_checks} fact-checks of {fact_check_seconds * 1000:.0f} ms flooding, "
+          f"{approvals} approvals of {approval_seconds * 1000:.0f} ms")
+    print(f"[BULKHEAD] shared pool: approvals {describe(before)}")
+    print(f"[BULKHEAD] bulkheads:   approvals {describe(after)} ({shed} fact-checks shed with 503)")
+    # Isolated approvals should stay within a small multiple of their own duration
+    return after[-1] < approval_seconds * 1000 * 5
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approval latency under a fact-check flood, shared pool vs bulkheads")
+    parser.add_argument("--fact-checks", type=int, default=400)
+    parser.add_argument("--approvals", type=int, default=40)
+    parser.add_argument("--fact-check-seconds", type=float, default=0.2)
+    parser.add_argument("--approval-seconds", type=float, default=0.02)
+    args = parser.parse_args(argv)
+    isolated = asyncio.run(saturation_demo(args.fact_checks, args.approvals, args.fact_check_seconds,
+                                           args.approval_seconds))
+    return 0 if isolated else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
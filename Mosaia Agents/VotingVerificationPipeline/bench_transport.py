@@ -0,0 +1,46 @@
+"""
+Per-call latency of a new connection per request (module-level requests.get)
+against the shared keep-alive transport.
+
+    python bench_transport.py https://api.coingecko.com/api/v3/ping --calls 20
+
+Makes real requests, so the numbers include the network to the target.
+"""
+import sys
+import time
+import argparse
+from statistics import median
+import requests
+from transport import HttpTransport
+
+
+def timed(fn, url, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn(url, timeout=30).raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fresh connections with the pooled HTTP transport")
+    parser.add_argument("url", nargs="?", default="https://api.coingecko.com/api/v3/ping")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    fresh = timed(requests.get, args.url, args.calls)
+    transport = HttpTransport()
+    transport.get(args.url, timeout=30)  # first call opens the pooled connection
+    pooled = timed(transport.get, args.url, args.calls)
+    transport.close()
+
+    print(f"[BENCH] {args.calls} GET {args.url} via {transport.backend}")
+    print(f"[BENCH] new connection per call: median {median(fresh):.1f} ms, mean {sum(fresh) / args.calls:.1f} ms")
+    print(f"[BENCH] pooled keep-alive:       median {median(pooled):.1f} ms, mean {sum(pooled) / args.calls:.1f} ms")
+    print(f"[BENCH] saved per call:          {median(fresh) - median(pooled):.1f} ms (median)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
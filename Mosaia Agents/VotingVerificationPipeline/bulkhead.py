@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from admission import overloaded
+
+
+def _setting(name, key, default):
+    return int(os.getenv(f"BULKHEAD_{name.upper().replace('-', '_')}_{key}", str(default)))
+
+
+class Bulkhead:
+    """
+    Bounded worker pool for one class of endpoint, so a surge in one class
+    cannot take threads from another. Work beyond workers + queue is shed
+    with a 503. While a higher-priority bulkhead has work waiting, lower
+    ones stop queueing and only accept work they can start at once.
+    """
+
+    def __init__(self, name, workers, queue_size, priority=0, registry=None):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.priority = priority
+        self.registry = registry
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.shed = 0
+        self.max_queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _admit(self):
+        limit = self.queue_size
+        if self.registry is not None and self.registry.higher_priority_waiting(self.priority):
+            limit = 0
+        with self._lock:
+            if self.running + self.queued >= self.workers + limit:
+                self.shed += 1
+                raise overloaded(f"{self.name} is at capacity", retry_after=1)
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def _call(self, submitted, fn):
+        waited = time.monotonic() - submitted
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking function on this bulkhead's workers"""
+        self._admit()
+        call = functools.partial(self._call, time.monotonic(), functools.partial(fn, *args, **kwargs))
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def waiting(self):
+        with self._lock:
+            return self.queued > 0
+
+    def snapshot(self):
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "priority": self.priority,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self.running,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "shed": self.shed,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 1) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 1),
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BulkheadRegistry:
+    def __init__(self):
+        self._bulkheads = {}
+
+    def add(self, name, workers, queue_size, priority=0):
+        """Create a bulkhead; BULKHEAD_<NAME>_WORKERS and BULKHEAD_<NAME>_QUEUE override the sizes"""
+        bulkhead = Bulkhead(
+            name, _setting(name, "WORKERS", workers), _setting(name, "QUEUE", queue_size), priority, self
+        )
+        self._bulkheads[name] = bulkhead
+        return bulkhead
+
+    def higher_priority_waiting(self, priority):
+        return any(bulkhead.priority > priority and bulkhead.waiting() for bulkhead in self._bulkheads.values())
+
+    def snapshot(self):
+        return {name: bulkhead.snapshot() for name, bulkhead in self._bulkheads.items()}
+
+    def shutdown(self):
+        for bulkhead in self._bulkheads.values():
+            bulkhead.shutdown()
+
+
+bulkheads = BulkheadRegistry()
+# Approve/reject votes and payouts move money, so they have their own workers and the highest priority
+payout_bulkhead = bulkheads.add("payouts", workers=8, queue_size=32, priority=2)
+revote_bulkhead = bulkheads.add("revote", workers=4, queue_size=16, priority=1)
+fact_check_bulkhead = bulkheads.add("fact-check", workers=8, queue_size=32, priority=0)
+diagnostics_bulkhead = bulkheads.add("diagnostics", workers=1, queue_size=2, priority=0)
+
@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+from statistics import median
+from admission import UpstreamOverloaded
+
+# Consensus members as agent_id or agent_id@temperature. By default the one fact-check agent is
+# sampled at spread temperatures: repeating a call with identical settings mostly repeats the same
+# answer (and the same mistake), so the quorum would add cost without adding independent evidence.
+# List distinct agent ids here once more than one fact-check agent is deployed.
+FACT_CHECK_CONSENSUS_MODELS = [
+    model.strip() for model in os.getenv(
+        "FACT_CHECK_CONSENSUS_MODELS",
+        "686656aaf14ab5c885e431ce@0.2,686656aaf14ab5c885e431ce@0.7,686656aaf14ab5c885e431ce@1.0"
+    ).split(",") if model.strip()
+]
+# Agreeing amounts needed before answering; defaults to a simple majority
+FACT_CHECK_CONSENSUS_QUORUM = int(os.getenv("FACT_CHECK_CONSENSUS_QUORUM", "0")) or None
+# Amounts within this fraction of the median count as agreeing; the rest are outliers
+FACT_CHECK_CONSENSUS_TOLERANCE = float(os.getenv("FACT_CHECK_CONSENSUS_TOLERANCE", "0.2"))
+FACT_CHECK_CONSENSUS_TIMEOUT = float(os.getenv("FACT_CHECK_CONSENSUS_TIMEOUT", "120"))
+
+
+def parse_member(member):
+    """"agent@0.7" -> ("agent", {"temperature": 0.7}); a bare id keeps the agent's own settings"""
+    model, _, temperature = member.partition("@")
+    return model, ({"temperature": float(temperature)} if temperature else {})
+
+
+def agreeing(amounts, tolerance=FACT_CHECK_CONSENSUS_TOLERANCE):
+    """Split amounts into those near the median and the outliers"""
+    if not amounts:
+        return [], []
+    center = median(amounts)
+    band = tolerance * max(abs(center), 1.0)
+    inliers = [amount for amount in amounts if abs(amount - center) <= band]
+    outliers = [amount for amount in amounts if abs(amount - center) > band]
+    return inliers, outliers
+
+
+async def run_consensus(ask, models=None, quorum=None, tolerance=FACT_CHECK_CONSENSUS_TOLERANCE,
+                        timeout=FACT_CHECK_CONSENSUS_TIMEOUT):
+    """
+    Ask every member concurrently with await ask(model, **settings). ask
+    returns (amount, payload) with amount None when the reply could not be
+    parsed. Returns as soon as a quorum of parsable amounts agree, or once
+    everyone has answered or the timeout passes; members still running are
+    cancelled, which closes their requests and frees their upstream slots.
+    An UpstreamOverloaded from any member cancels the rest and is re-raised,
+    since the upstream shedding load is not a disagreeing member.
+
+    The result holds the consensus amount (median of the agreeing amounts),
+    the payload whose amount is closest to it, and agreement stats.
+    """
+    models = models or FACT_CHECK_CONSENSUS_MODELS
+    quorum = quorum or FACT_CHECK_CONSENSUS_QUORUM or len(models) // 2 + 1
+    started = time.monotonic()
+    answers = []
+    failures = 0
+
+    tasks = {}
+    for member in models:
+        model, settings = parse_member(member)
+        tasks[asyncio.ensure_future(ask(model, **settings))] = member
+    pending = set(tasks)
+    reached = False
+    try:
+        while pending and not reached:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    amount, payload = task.result()
+                except UpstreamOverloaded:
+                    raise
+                except Exception as e:
+                    failures += 1
+                    print(f"[CONSENSUS] {tasks[task]} failed: {e}")
+                    continue
+                answers.append((tasks[task], amount, payload, time.monotonic() - started))
+            parsed = [amount for _, amount, _, _ in answers if amount is not None]
+            reached = len(agreeing(parsed, tolerance)[0]) >= quorum
+    finally:
+        abandoned = len(pending)
+        for task in pending:
+            task.cancel()
+        # Wait for the cancellations so no member outlives the request still holding a gate slot
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    parsed = [amount for _, amount, _, _ in answers if amount is not None]
+    inliers, outliers = agreeing(parsed, tolerance)
+    amount = median(inliers) if inliers else None
+    chosen = None
+    if amount is not None:
+        chosen = min((answer for answer in answers if answer[1] is not None),
+                     key=lambda answer: abs(answer[1] - amount))
+    elif answers:
+        chosen = answers[0]
+
+    stats = {
+        "reached": reached,
+        "quorum": quorum,
+        "members": len(models),
+        "responded": len(answers),
+        "parsable": len(parsed),
+        "agreeing": len(inliers),
+        "outliers": outliers,
+        "failed": failures,
+        "cancelled": abandoned,
+        "spread": (max(inliers) - min(inliers)) if inliers else None,
+        "agreement": round(len(inliers) / len(parsed), 3) if parsed else 0.0,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "answer_seconds": [round(answer[3], 3) for answer in answers],
+        "chosen_model": chosen[0] if chosen else None,
+    }
+    print(f"[CONSENSUS] {'Reached' if reached else 'No'} quorum: {len(inliers)}/{len(parsed)} agreeing "
+          f"({len(answers)}/{len(models)} answered) in {stats['elapsed_seconds']}s")
+    return {"amount": amount, "payload": chosen[2] if chosen else None, "stats": stats}
@@ -0,0 +1,217 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation, ROUND_DOWN
+
+# Amounts are held as integers in USDC base units (6 decimals) rather than floats
+AMOUNT_DECIMALS = 6
+AMOUNT_SCALE = 10 ** AMOUNT_DECIMALS
+# Records older than this are treated as missing by lookups that ask for fresh data
+DISASTER_REGISTRY_TTL = float(os.getenv("DISASTER_REGISTRY_TTL", "30"))
+# Most disasters kept; the least recently used are dropped first
+DISASTER_REGISTRY_SIZE = int(os.getenv("DISASTER_REGISTRY_SIZE", "2000"))
+
+
+def hash_bytes(disaster_hash):
+    """Canonical 32-byte key for a disaster hash given as bytes or hex, with or without 0x"""
+    if isinstance(disaster_hash, (bytes, bytearray)):
+        raw = bytes(disaster_hash)
+    else:
+        text = (disaster_hash or "").strip().lower().removeprefix("0x")
+        if len(text) != 64:
+            raise ValueError("Invalid disaster_hash length")
+        try:
+            raw = bytes.fromhex(text)
+        except ValueError:
+            raise ValueError("disaster_hash is not valid hex") from None
+    if len(raw) != 32:
+        raise ValueError("Invalid disaster_hash length")
+    return raw
+
+
+def hash_hex(raw):
+    return "0x" + raw.hex()
+
+
+def to_units(value):
+    """Decimal string, int or float amount -> integer base units, truncating extra precision"""
+    try:
+        amount = Decimal(str(value or "0"))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}") from None
+    return int((amount * AMOUNT_SCALE).to_integral_value(rounding=ROUND_DOWN))
+
+
+def from_units(units):
+    return Decimal(units) / AMOUNT_SCALE
+
+
+class DisasterRecord:
+    """One disaster with a bytes32 key and fixed-point amounts, built from the API or the contract"""
+
+    __slots__ = (
+        "key", "title", "metadata", "target_units", "donated_units", "progress_bp",
+        "creator", "timestamp", "donation_count", "is_active", "source", "fetched_at",
+    )
+
+    def __init__(self, key, title, metadata="", target_units=0, donated_units=0, progress_bp=None,
+                 creator="", timestamp="", donation_count=0, is_active=False, source="", fetched_at=None):
+        self.key = key
+        self.title = title
+        self.metadata = metadata
+        self.target_units = target_units
+        self.donated_units = donated_units
+        # Funding progress in basis points when the source reports it, otherwise derived from the amounts
+        self.progress_bp = progress_bp
+        self.creator = creator
+        self.timestamp = timestamp
+        self.donation_count = donation_count
+        self.is_active = is_active
+        self.source = source
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+
+    @classmethod
+    def from_api(cls, disaster_hash, disaster):
+        """From the "disaster" object of the disasterfetch API"""
+        progress = disaster.get("fundingProgressPercentage")
+        return cls(
+            key=hash_bytes(disaster_hash),
+            title=disaster.get("title", ""),
+            metadata=disaster.get("metadata", ""),
+            target_units=to_units(disaster.get("targetAmount", "0")),
+            donated_units=to_units(disaster.get("totalDonated", "0")),
+            progress_bp=int(Decimal(str(progress)) * 100) if progress not in (None, "") else None,
+            creator=disaster.get("creator", ""),
+            timestamp=disaster.get("timestamp", ""),
+            donation_count=int(disaster.get("donationCount") or 0),
+            is_active=bool(disaster.get("isActive", False)),
+            source="api",
+        )
+
+    @classmethod
+    def from_contract(cls, disaster_hash, details):
+        """From the getDisasterDetails tuple; the contract already stores USDC base units"""
+        title, metadata, target_amount, total_donated, creator, timestamp, is_active = details
+        return cls(
+            key=hash_bytes(disaster_hash),
+            title=title,
+            metadata=metadata,
+            target_units=int(target_amount),
+            donated_units=int(total_donated),
+            creator=creator,
+            timestamp=str(timestamp),
+            is_active=bool(is_active),
+            source="contract",
+        )
+
+    @property
+    def hash_hex(self):
+        return hash_hex(self.key)
+
+    @property
+    def target_amount(self):
+        return from_units(self.target_units)
+
+    @property
+    def total_donated(self):
+        return from_units(self.donated_units)
+
+    @property
+    def funding_progress(self):
+        """Percent funded"""
+        if self.progress_bp is not None:
+            return self.progress_bp / 100
+        if self.target_units <= 0:
+            return 0
+        return self.donated_units * 100 / self.target_units
+
+    @property
+    def remaining_units(self):
+        return max(self.target_units - self.donated_units, 0)
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.fetched_at
+
+    def as_api_info(self):
+        """Dict shape returned by get_disaster_info"""
+        return {
+            "title": self.title,
+            "target_amount_vet": float(self.target_amount),
+            "total_donated_vet": float(self.total_donated),
+            "funding_progress": float(self.funding_progress),
+            "metadata": self.metadata,
+            "creator": self.creator,
+            "timestamp": self.timestamp,
+            "donation_count": str(self.donation_count)
+        }
+
+    def as_contract_info(self):
+        """Dict shape returned by get_disaster_info_from_contract"""
+        return {
+            "title": self.title,
+            "target_amount_usdc": float(self.target_amount),
+            "total_donated_usdc": float(self.total_donated),
+            "funding_progress": float(self.funding_progress)
+        }
+
+    def __repr__(self):
+        return (f"DisasterRecord({self.hash_hex}, {self.title!r}, "
+                f"{self.total_donated}/{self.target_amount}, source={self.source})")
+
+
+class DisasterRegistry:
+    """Latest known record per disaster, indexed by the raw 32-byte hash and capped at max_size"""
+
+    def __init__(self, ttl=DISASTER_REGISTRY_TTL, max_size=DISASTER_REGISTRY_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._records = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, record):
+        with self._lock:
+            self._records[record.key] = record
+            self._records.move_to_end(record.key)
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+                self.evictions += 1
+        return record
+
+    def get(self, disaster_hash, max_age=None):
+        """Record for this hash, or None if unknown or older than max_age seconds"""
+        key = hash_bytes(disaster_hash)
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and (max_age is None or record.age() <= max_age):
+                self._records.move_to_end(key)
+                self.hits += 1
+                return record
+            self.misses += 1
+            return None
+
+    def get_fresh(self, disaster_hash):
+        return self.get(disaster_hash, max_age=self.ttl)
+
+    def discard(self, disaster_hash):
+        with self._lock:
+            self._records.pop(hash_bytes(disaster_hash), None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def __contains__(self, disaster_hash):
+        with self._lock:
+            return hash_bytes(disaster_hash) in self._records
+
+    def stats(self):
+        with self._lock:
+            return {"records": len(self._records), "max_size": self.max_size, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "ttl_seconds": self.ttl}
+
+
+disaster_registry = DisasterRegistry()
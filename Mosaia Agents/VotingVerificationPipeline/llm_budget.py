@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import threading
+
+# Rough characters-per-token ratio used when a response carries no usage block
+CHARS_PER_TOKEN = 4
+
+# Default prompt size cap in characters, overridable per stage with LLM_PROMPT_CAPS='{"analysis": 4000}'
+DEFAULT_PROMPT_CAP_CHARS = int(os.getenv("LLM_PROMPT_CAP_CHARS", "8000"))
+# Shortest a truncated field is allowed to become
+MIN_FIELD_CHARS = 200
+
+
+class PromptOverBudget(ValueError):
+    """A prompt is larger than its stage's cap even after build_prompt truncated what it could"""
+
+
+def _load_json_env(name):
+    raw = os.getenv(name)
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        print(f"[WARN] Ignoring invalid {name}: {e}")
+        return {}
+
+
+# USD per 1K tokens, e.g. LLM_PRICING='{"default": {"prompt": 0.0025, "completion": 0.01}}'
+LLM_PRICING = _load_json_env("LLM_PRICING")
+STAGE_PROMPT_CAPS = _load_json_env("LLM_PROMPT_CAPS")
+
+
+def estimate_tokens(text):
+    return max(1, len(text or "") // CHARS_PER_TOKEN)
+
+
+def prompt_cap_for(stage):
+    return int(STAGE_PROMPT_CAPS.get(stage, DEFAULT_PROMPT_CAP_CHARS))
+
+
+def cost_for(model, prompt_tokens, completion_tokens):
+    pricing = LLM_PRICING.get(model) or LLM_PRICING.get("default")
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing.get("prompt", 0) + completion_tokens * pricing.get("completion", 0)) / 1000
+
+
+def _truncate_text(text, limit):
+    """Cut text to roughly limit chars on a line or word boundary and say how much was dropped"""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > limit // 2:
+        cut = cut[:boundary]
+    return f"{cut.rstrip()} …[truncated {len(text) - len(cut)} chars]"
+
+
+def build_prompt(template, fields, stage, truncatable=()):
+    """
+    Fill template with fields, shrinking the truncatable fields (longest first)
+    until the prompt fits the stage's cap. Fixed instructions are never cut.
+    """
+    cap = prompt_cap_for(stage)
+    fields = {key: str(value) for key, value in fields.items()}
+    prompt = template.format(**fields)
+    if len(prompt) <= cap:
+        return prompt
+
+    original_length = len(prompt)
+    originals = dict(fields)
+    exhausted = set()
+    while len(prompt) > cap:
+        candidates = [key for key in truncatable if key not in exhausted and len(originals[key]) > MIN_FIELD_CHARS]
+        if not candidates:
+            break
+        key = max(candidates, key=lambda k: len(fields[k]))
+        # Leave room for the truncation marker appended to the field
+        limit = len(fields[key]) - (len(prompt) - cap) - 40
+        if limit <= MIN_FIELD_CHARS:
+            limit = MIN_FIELD_CHARS
+            exhausted.add(key)
+        fields[key] = _truncate_text(originals[key], limit)
+        prompt = template.format(**fields)
+
+    print(f"[BUDGET] {stage} prompt truncated from {original_length} to {len(prompt)} chars (cap {cap})")
+    return prompt
+
+
+class UsageLedger:
+    """Token, latency and cost totals per model and per stage, optionally rolled up into a parent"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.by_model = {}
+            self.by_stage = {}
+
+    @staticmethod
+    def _add(bucket, key, prompt_tokens, completion_tokens, latency, cost):
+        entry = bucket.setdefault(key, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency_seconds": 0.0, "max_latency_seconds": 0.0, "cost_usd": 0.0
+        })
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+        entry["latency_seconds"] += latency
+        entry["max_latency_seconds"] = max(entry["max_latency_seconds"], latency)
+        entry["cost_usd"] += cost
+
+    def record(self, stage, model, prompt_tokens, completion_tokens, latency):
+        cost = cost_for(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._add(self.by_model, model, prompt_tokens, completion_tokens, latency, cost)
+            self._add(self.by_stage, stage, prompt_tokens, completion_tokens, latency, cost)
+        if self.parent:
+            self.parent.record(stage, model, prompt_tokens, completion_tokens, latency)
+
+    def snapshot(self):
+        with self._lock:
+            by_model = {key: dict(value) for key, value in self.by_model.items()}
+            by_stage = {key: dict(value) for key, value in self.by_stage.items()}
+        total = {
+            key: sum(entry[key] for entry in by_stage.values())
+            for key in ("calls", "prompt_tokens", "completion_tokens", "latency_seconds", "cost_usd")
+        }
+        return {"name": self.name, "total": total, "by_model": by_model, "by_stage": by_stage}
+
+    def report(self):
+        snapshot = self.snapshot()
+        total = snapshot["total"]
+        print(f"[BUDGET] {self.name}: {total['calls']} LLM calls, "
+              f"{total['prompt_tokens']} prompt + {total['completion_tokens']} completion tokens, "
+              f"{total['latency_seconds']:.1f}s, ${total['cost_usd']:.4f}")
+        for stage, entry in snapshot["by_stage"].items():
+            print(f"[BUDGET]   {stage}: {entry['prompt_tokens']}+{entry['completion_tokens']} tokens, "
+                  f"{entry['latency_seconds']:.1f}s, ${entry['cost_usd']:.4f}")
+        return snapshot
+
+
+# Process-wide totals; per-run or per-endpoint ledgers roll up into this one
+LLM_USAGE = UsageLedger("process")
+
+
+def _check_prompt(stage, messages):
+    """
+    Refuse a call whose prompt is over the stage's cap before any tokens are
+    spent. build_prompt only gets there when the fixed instructions alone
+    outgrow the cap, so this is a configuration error, not bad input to retry.
+    """
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    cap = prompt_cap_for(stage)
+    if prompt_chars > cap:
+        print(f"[BUDGET] {stage} prompt is {prompt_chars} chars, over its {cap} char cap; not sending it")
+        raise PromptOverBudget(f"{stage} prompt is {prompt_chars} chars, over its {cap} char cap")
+
+
+def _record_completion(ledger, stage, model, messages, completion, latency):
+    usage = getattr(completion, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens("".join(message.get("content") or "" for message in messages))
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion.choices[0].message.content if completion.choices else "")
+
+    ledger.record(stage, model, prompt_tokens, completion_tokens, latency)
+    print(f"[BUDGET] {stage} ({model}): {prompt_tokens}+{completion_tokens} tokens in {latency:.2f}s")
+
+
+def tracked_completion(client, stage, model, messages, ledger=LLM_USAGE, **kwargs):
+    """
+    Call chat.completions.create and record tokens, latency and cost for the
+    call. Raises PromptOverBudget, without calling, when the prompt is over
+    the stage's cap.
+    """
+    _check_prompt(stage, messages)
+    started = time.perf_counter()
+    completion = client.chat.completions.create(model=model, messages=messages, **kwargs)
+    _record_completion(ledger, stage, model, messages, completion, time.perf_counter() - started)
+    return completion
+
+
+async def tracked_completion_async(client, stage, model, messages, ledger=LLM_USAGE, **kwargs):
+    """tracked_completion for an AsyncOpenAI client; a cancelled call is not recorded"""
+    _check_prompt(stage, messages)
+    started = time.perf_counter()
+    completion = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+    _record_completion(ledger, stage, model, messages, completion, time.perf_counter() - started)
+    return completion
@@ -1,22 +1,38 @@
 import os
-import requests
 import traceback
 import re
 import asyncio
 import threading
 import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from web3 import Web3
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from decimal import Decimal
+from typing import List
 from botocore.exceptions import ClientError
 import json
 import yaml
 import boto3
 from pyngrok import ngrok
+from transport import http_transport
+from amounts import extract_amount, extract_labeled_amount, parse_amount
+from llm_budget import LLM_USAGE, build_prompt, tracked_completion, tracked_completion_async
+from admission import (
+    UpstreamOverloaded, admit, admission_snapshot,
+    mosaia_gate, mosaia_revote_gate, disaster_api_gate, unlock_api_gate
+)
+from verdict_cache import verdict_cache, funding_fingerprint
+from payouts import PayoutBatcher, PayoutError, PayoutPending, to_units
+from rpc_pool import RpcPool, TransactionPending
+from consensus import run_consensus
+import profiling
+from bulkhead import bulkheads, payout_bulkhead, revote_bulkhead, fact_check_bulkhead, diagnostics_bulkhead
+from disaster_registry import DisasterRecord, disaster_registry, hash_bytes, hash_hex
 
 # Load env
 load_dotenv()
@@ -28,10 +44,42 @@ RPC_URL = os.getenv("SEPOLIA_RPC_URL")
 if not RPC_URL:
     raise Exception("SEPOLIA_RPC_URL environment variable is required")
 CONTRACT_ADDRESS = os.getenv("ETH_CONTRACT_ADDRESS")  # You'll need to set this environment variable
+# Overridable so the payout path can be exercised against a local anvil chain (chain id 31337)
+CHAIN_ID = int(os.getenv("CHAIN_ID", "11155111"))  # Sepolia chain ID
+GODSLITE_CONTRACT_ADDRESS = os.getenv("GODSLITE_CONTRACT_ADDRESS", "0x07f9BFEb19F1ac572f6D69271261dDA1fD378D9A")
+USDC_CONTRACT_ADDRESS = os.getenv("USDC_CONTRACT_ADDRESS", "0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238")
+# Optional Disperse-style contract used to pay several recipients in one transaction
+MULTI_TRANSFER_ADDRESS = os.getenv("MULTI_TRANSFER_ADDRESS")
+USDC_UNIT = 1_000_000  # USDC has 6 decimals
+# How approvals release money: "unlock" calls the unlock-funds service, "usdc" pays from the
+# service wallet through the payout batcher
+APPROVE_PAYOUT_MODE = os.getenv("APPROVE_PAYOUT_MODE", "unlock").lower()
+RECEIPT_TIMEOUT = float(os.getenv("RECEIPT_TIMEOUT", "180"))
 
 # Init
 app = FastAPI()
 client = OpenAI(base_url="https://api.mosaia.ai/v1/agent", api_key=AGENT_API_KEY)
+# Consensus fans out on the event loop so members still running after quorum can be cancelled
+async_client = AsyncOpenAI(base_url="https://api.mosaia.ai/v1/agent", api_key=AGENT_API_KEY)
+
+# Event loop the app runs on; handlers running in worker threads hand coroutines to it
+app_loop = None
+
+@app.on_event("startup")
+async def capture_app_loop():
+    global app_loop
+    app_loop = asyncio.get_running_loop()
+
+@app.on_event("shutdown")
+async def close_async_client():
+    await async_client.close()
+
+# Helper: Run a coroutine on the app's event loop from a worker thread and wait for its result
+def run_on_app_loop(coroutine):
+    if app_loop is None:
+        coroutine.close()
+        raise RuntimeError("Event loop is not running")
+    return asyncio.run_coroutine_threadsafe(coroutine, app_loop).result()
 
 # Start ngrok tunnel on port 8000 when app starts
 def start_ngrok():
@@ -42,10 +90,12 @@ def start_ngrok():
     return public_url.public_url
 
 ngrok_url = None
-try:
-    ngrok_url = start_ngrok()
-except Exception as e:
-    print(f"[NGROK] Failed to start ngrok tunnel: {e}")
+# Benchmarks and tests import the app without opening a tunnel
+if os.getenv("NGROK_ENABLED", "true").lower() not in ("0", "false", "no"):
+    try:
+        ngrok_url = start_ngrok()
+    except Exception as e:
+        print(f"[NGROK] Failed to start ngrok tunnel: {e}")
 
 # ABI for the new godslite contract
 CONTRACT_ABI = [
@@ -77,6 +127,7 @@ CONTRACT_ABI = [
 class FactCheckInput(BaseModel):
     statement: str
     disaster_hash: str
+    consensus: bool = False  # ask several agents and answer with the agreeing amount
 
 # === Utility: Parse agent response ===
 def parse_agent_response(response_text):
@@ -162,9 +213,9 @@ def parse_agent_response(response_text):
         result = {}
         
         # Extract amount
-        amount_match = re.search(r'amount:\s*(\d+(?:\.\d+)?)', response_text, re.IGNORECASE)
-        if amount_match:
-            result['amount'] = float(amount_match.group(1))
+        amount_value = extract_labeled_amount(response_text, label="amount", ignore_case=True)
+        if amount_value is not None:
+            result['amount'] = float(amount_value)
         
         # Extract reasoning/comment
         reasoning_match = re.search(r'reasoning:\s*(.+?)(?=\n\w+:|$)', response_text, re.IGNORECASE | re.DOTALL)
@@ -204,15 +255,15 @@ def get_disaster_info(disaster_hash: str):
     try:
         print(f"[INFO] Fetching disaster details from external API for hash: {disaster_hash}")
         
-        # Ensure disaster hash has 0x prefix
-        if not disaster_hash.startswith("0x"):
-            disaster_hash = "0x" + disaster_hash
+        # Canonical 0x-prefixed lowercase form of the hash
+        disaster_hash = hash_hex(hash_bytes(disaster_hash))
         
         # Make GET request to external API
         api_url = f"https://disasterfetch.onrender.com/api/disasters/{disaster_hash}"
         print(f"[INFO] API URL: {api_url}")
         
-        response = requests.get(api_url, timeout=3000)
+        with disaster_api_gate:
+            response = http_transport.get(api_url, timeout=3000)
         
         if response.status_code != 200:
             raise Exception(f"API request failed with status {response.status_code}: {response.text}")
@@ -227,105 +278,165 @@ def get_disaster_info(disaster_hash: str):
             raise Exception("No disaster data found in API response")
         
         # Extract disaster information
-        title = disaster.get("title", "")
-        target_amount = float(disaster.get("targetAmount", "0"))
-        total_donated = float(disaster.get("totalDonated", "0"))
-        funding_progress = float(disaster.get("fundingProgressPercentage", "0"))
-        is_active = disaster.get("isActive", False)
+        record = disaster_registry.put(DisasterRecord.from_api(disaster_hash, disaster))
         
-        if not title:
+        if not record.title:
             raise Exception("Disaster not found")
         
-        if not is_active:
+        if not record.is_active:
             raise Exception("Disaster is not active")
         
-        print(f"[INFO] Disaster: {title}")
-        print(f"[INFO] Target Amount: ${target_amount:.2f}")
-        print(f"[INFO] Total Donated: ${total_donated:.2f}")
-        print(f"[INFO] Funding Progress: {funding_progress:.1f}%")
-
-        return {
-            "title": title,
-            "target_amount_vet": target_amount,
-            "total_donated_vet": total_donated,
-            "funding_progress": funding_progress,
-            "metadata": disaster.get("metadata", ""),
-            "creator": disaster.get("creator", ""),
-            "timestamp": disaster.get("timestamp", ""),
-            "donation_count": disaster.get("donationCount", "0")
-        }
+        print(f"[INFO] Disaster: {record.title}")
+        print(f"[INFO] Target Amount: ${record.target_amount:.2f}")
+        print(f"[INFO] Total Donated: ${record.total_donated:.2f}")
+        print(f"[INFO] Funding Progress: {record.funding_progress:.1f}%")
+
+        return record.as_api_info()
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"[ERROR] get_disaster_info: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Helper: Disaster info from the registry when it was fetched recently, otherwise from the API
+def get_disaster_info_cached(disaster_hash: str):
+    try:
+        record = disaster_registry.get_fresh(disaster_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if record is not None and record.source == "api" and record.title and record.is_active:
+        return record.as_api_info()
+    return get_disaster_info(disaster_hash)
+
+FACT_CHECK_MODEL = "686656aaf14ab5c885e431ce"
+
+# Helper: Ask one fact-check agent and parse its reply into (amount, answer)
+def ask_fact_check_agent(model: str, ai_message: str):
+    with mosaia_gate:
+        completion = tracked_completion(
+            client,
+            "fact-check",
+            model=model,
+            messages=[{"role": "user", "content": ai_message}],
+        )
+    return parse_fact_check_reply(model, completion.choices[0].message.content.strip())
+
+# Helper: ask_fact_check_agent for consensus members, cancellable while queued or in flight
+async def ask_fact_check_agent_async(model: str, ai_message: str, **settings):
+    async with mosaia_gate:
+        completion = await tracked_completion_async(
+            async_client,
+            "fact-check",
+            model=model,
+            messages=[{"role": "user", "content": ai_message}],
+            **settings
+        )
+    return parse_fact_check_reply(model, completion.choices[0].message.content.strip())
+
+def parse_fact_check_reply(model: str, response_text: str):
+    print(f"[INFO] Raw Agent Response ({model}):")
+    print(response_text)
+
+    # Parse the response using the robust parser
+    result = parse_agent_response(response_text)
+
+    # Extract values with fallbacks
+    amount = result.get("amount")
+    comment = (result.get("comment") or 
+              result.get("reasoning") or 
+              result.get("response") or 
+              "No comment available")
+    sources = result.get("sources", [])
+    
+    # Ensure sources is a list
+    if isinstance(sources, str):
+        sources = [sources]
+    elif not isinstance(sources, list):
+        sources = []
+
+    # Clean up amount: "$1,500", "1.5k USD" and similar all become a number
+    if isinstance(amount, str):
+        parsed_amount = parse_amount(amount)
+        amount = float(parsed_amount) if parsed_amount is not None else None
+    elif not isinstance(amount, (int, float)) or isinstance(amount, bool):
+        amount = None
+
+    return amount, {"response_text": response_text, "comment": comment, "sources": sources}
+
 
 # === Endpoint: /fact-check ===
 @app.post("/fact-check")
-def fact_check(data: FactCheckInput):
+async def fact_check(data: FactCheckInput, request: Request):
+    admit("fact-check", request, data.disaster_hash)
+    # Fact-checks get their own workers so a surge cannot starve votes
+    return await fact_check_bulkhead.run(run_fact_check, data)
+
+def run_fact_check(data: FactCheckInput):
     try:
         print(f"[INFO] Statement: {data.statement}")
         print(f"[INFO] Disaster Hash: {data.disaster_hash}")
 
         # === Get Disaster Information from Ethereum Contract ===
-        disaster_info = get_disaster_info(data.disaster_hash)
+        disaster_info = get_disaster_info_cached(data.disaster_hash)
         total_donated = disaster_info["total_donated_vet"]
         target_amount = disaster_info["target_amount_vet"]
         funding_progress = disaster_info["funding_progress"]
 
+        # === Reuse a verdict for the same petition against the same funding state ===
+        fingerprint = funding_fingerprint(total_donated, target_amount)
+        verdict_cache.observe_funding(data.disaster_hash, fingerprint)
+        # Consensus verdicts are cached apart from single-agent ones
+        cache_statement = f"[consensus] {data.statement}" if data.consensus else data.statement
+        cached_verdict = verdict_cache.get(cache_statement, data.disaster_hash, fingerprint)
+        if cached_verdict is not None:
+            print("[INFO] Returning cached verdict")
+            return {**cached_verdict, "cached": True}
+
         # === Call Mosaia Agent with statement and disaster information ===
-        ai_message = (
-            f"Petition: {data.statement}\n"
-            f"Disaster: {disaster_info['title']}\n"
-            f"Disaster Description: {disaster_info.get('metadata', 'No description available')}\n"
+        # Description and petition are the unbounded fields, so they absorb any truncation
+        ai_message = build_prompt(
+            "Petition: {statement}\n"
+            "Disaster: {title}\n"
+            "Disaster Description: {metadata}\n"
             f"Target Amount: ${target_amount:.2f}\n"
             f"Total Donated: ${total_donated:.2f}\n"
             f"Funding Progress: {funding_progress:.1f}%\n"
-            f"Donation Count: {disaster_info.get('donation_count', '0')}\n"
-            f"Creator: {disaster_info.get('creator', 'Unknown')}\n"
-            f"Created: {disaster_info.get('timestamp', 'Unknown')}\n"
+            "Donation Count: {donation_count}\n"
+            "Creator: {creator}\n"
+            "Created: {timestamp}\n"
             "Based on the petition and the current disaster funding status, decide how much should be allocated from the donated funds. "
             "Consider the disaster details, funding progress, and the petition request. "
-            "Respond with the amount to allocate, a brief reasoning, and a single source which shows that the NGO performed the work."
+            "Respond with the amount to allocate, a brief reasoning, and a single source which shows that the NGO performed the work.",
+            {
+                "statement": data.statement,
+                "title": disaster_info["title"],
+                "metadata": disaster_info.get("metadata", "No description available"),
+                "donation_count": disaster_info.get("donation_count", "0"),
+                "creator": disaster_info.get("creator", "Unknown"),
+                "timestamp": disaster_info.get("timestamp", "Unknown"),
+            },
+            "fact-check",
+            truncatable=("metadata", "statement")
         )
         print("[INFO] Sending to AI:")
         print(ai_message)
-        completion = client.chat.completions.create(
-            model="686656aaf14ab5c885e431ce",
-            messages=[{"role": "user", "content": ai_message}],
-        )
-        response_text = completion.choices[0].message.content.strip()
-        print("[INFO] Raw Agent Response:")
-        print(response_text)
-
-        # Parse the response using the robust parser
-        result = parse_agent_response(response_text)
-
-        # Extract values with fallbacks
-        amount = result.get("amount")
-        comment = (result.get("comment") or 
-                  result.get("reasoning") or 
-                  result.get("response") or 
-                  "No comment available")
-        sources = result.get("sources", [])
-        
-        # Ensure sources is a list
-        if isinstance(sources, str):
-            sources = [sources]
-        elif not isinstance(sources, list):
-            sources = []
-
-        # Clean up amount: remove $ and USD and keep only the number
-        if isinstance(amount, str):
-            cleaned = amount.replace("$", "").replace(",", "").replace("USD", "").strip()
-            try:
-                amount = float(re.findall(r"[\d.]+", cleaned)[0])
-            except Exception:
-                amount = None
+        consensus = None
+        if data.consensus:
+            consensus = run_on_app_loop(run_consensus(
+                lambda model, **settings: ask_fact_check_agent_async(model, ai_message, **settings)
+            ))
+            answer = consensus["payload"] or {"response_text": "", "comment": "No agent produced a usable answer", "sources": []}
+            amount = consensus["amount"]
+        else:
+            amount, answer = ask_fact_check_agent(FACT_CHECK_MODEL, ai_message)
+        response_text = answer["response_text"]
+        comment = answer["comment"]
+        sources = answer["sources"]
 
         # === Final Response ===
-        return {
+        verdict = {
             "amount": amount,
             "comment": comment,
             "sources": sources,
@@ -339,7 +450,17 @@ def fact_check(data: FactCheckInput):
             "created_timestamp": disaster_info.get("timestamp", ""),
             "raw_agent_response": response_text  # Include raw response for debugging
         }
+        if consensus is not None:
+            verdict["consensus"] = consensus["stats"]
+
+        # Only cache verdicts the agent actually produced an amount for
+        if amount is not None:
+            verdict_cache.put(cache_statement, data.disaster_hash, fingerprint, verdict)
 
+        return {**verdict, "cached": False}
+
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"[ERROR] Main exception: {e}")
         traceback.print_exc()
@@ -352,8 +473,11 @@ def health_check():
 
 # === Test endpoint ===
 @app.get("/test-parser")
-def test_parser():
+async def test_parser():
     """Test endpoint to verify the parser works with different formats"""
+    return await diagnostics_bulkhead.run(run_parser_tests)
+
+def run_parser_tests():
     test_responses = [
         '{"amount": 1000, "comment": "Test JSON", "sources": ["http://example.com"]}',
         'amount: 2000\ncomment: Test YAML\nsources: http://example.com',
@@ -441,10 +565,50 @@ USDC_ABI = [
         ],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [
+            { "internalType": "address", "name": "owner", "type": "address" },
+            { "internalType": "address", "name": "spender", "type": "address" }
+        ],
+        "name": "allowance",
+        "outputs": [
+            { "internalType": "uint256", "name": "", "type": "uint256" }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            { "internalType": "address", "name": "spender", "type": "address" },
+            { "internalType": "uint256", "name": "amount", "type": "uint256" }
+        ],
+        "name": "approve",
+        "outputs": [
+            { "internalType": "bool", "name": "", "type": "bool" }
+        ],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    }
+]
+
+# Disperse-style multi-transfer ABI (pulls tokens with transferFrom, so it needs an allowance)
+MULTI_TRANSFER_ABI = [
+    {
+        "inputs": [
+            { "internalType": "address", "name": "token", "type": "address" },
+            { "internalType": "address[]", "name": "recipients", "type": "address[]" },
+            { "internalType": "uint256[]", "name": "values", "type": "uint256[]" }
+        ],
+        "name": "disperseToken",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
     }
 ]
 
 # DynamoDB Tables - Only initialize if required environment variables are present
+CLAIMS_TABLE_NAME = "gods-hand-claims"
 dynamodb = None
 voting_table = None
 
@@ -457,7 +621,7 @@ if os.getenv("AWS_REGION") and os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
         )
-        voting_table = dynamodb.Table("gods-hand-claims")
+        voting_table = dynamodb.Table(CLAIMS_TABLE_NAME)
         print("[INFO] DynamoDB components initialized successfully")
     except Exception as e:
         print(f"[WARN] Failed to initialize DynamoDB components: {e}")
@@ -470,8 +634,29 @@ w3 = None
 account = None
 godslite_contract = None
 usdc_contract = None
+multi_transfer_contract = None
+
+# Pooled async endpoints (SEPOLIA_RPC_URLS, falling back to SEPOLIA_RPC_URL) used for all network calls
+rpc_pool = RpcPool()
+
+@app.on_event("startup")
+async def start_rpc_pool():
+    await rpc_pool.start()
+
+@app.on_event("shutdown")
+async def close_rpc_pool():
+    await rpc_pool.close()
+
+@app.on_event("shutdown")
+def close_http_transport():
+    http_transport.close()
 
-# Initialize Web3 components for Ethereum Sepolia
+@app.on_event("shutdown")
+def shutdown_bulkheads():
+    bulkheads.shutdown()
+
+# Initialize Web3 components for Ethereum Sepolia; the sync instance is only used for
+# offline work (key handling, ABI objects, signing), never for network calls
 try:
     w3 = Web3(Web3.HTTPProvider(RPC_URL))
     
@@ -489,20 +674,28 @@ try:
     
     # Initialize godslite contract
     godslite_contract = w3.eth.contract(
-        address=Web3.to_checksum_address("0x07f9BFEb19F1ac572f6D69271261dDA1fD378D9A"), 
+        address=Web3.to_checksum_address(GODSLITE_CONTRACT_ADDRESS), 
         abi=GODSLITE_ABI
     )
     
     # Initialize USDC contract
     usdc_contract = w3.eth.contract(
-        address=Web3.to_checksum_address("0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238"), 
+        address=Web3.to_checksum_address(USDC_CONTRACT_ADDRESS), 
         abi=USDC_ABI
     )
     
+    # Initialize optional multi-transfer contract
+    if MULTI_TRANSFER_ADDRESS:
+        multi_transfer_contract = w3.eth.contract(
+            address=Web3.to_checksum_address(MULTI_TRANSFER_ADDRESS),
+            abi=MULTI_TRANSFER_ABI
+        )
+    
     print("[INFO] Web3 components initialized successfully for Ethereum Sepolia")
     print(f"[INFO] Using account: {account.address}")
-    print(f"[INFO] Godslite contract: 0x07f9BFEb19F1ac572f6D69271261dDA1fD378D9A")
-    print(f"[INFO] USDC contract: 0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238")
+    print(f"[INFO] Chain ID: {CHAIN_ID}")
+    print(f"[INFO] Godslite contract: {GODSLITE_CONTRACT_ADDRESS}")
+    print(f"[INFO] USDC contract: {USDC_CONTRACT_ADDRESS}")
     
 except Exception as e:
     print(f"[WARN] Failed to initialize Web3 components: {e}")
@@ -514,8 +707,16 @@ class VoteInput(BaseModel):
     uuid: str
     disasterHash: str
 
+# Batch voting limits
+BATCH_VOTE_MAX = int(os.getenv("BATCH_VOTE_MAX", "200"))
+BATCH_VOTE_MAX_CONCURRENCY = int(os.getenv("BATCH_VOTE_MAX_CONCURRENCY", "8"))
+
+class BatchVoteInput(BaseModel):
+    votes: List[VoteInput]
+    maxConcurrency: int = 4
+
 # Helper: Get disaster information from godslite contract
-def get_disaster_info_from_contract(disaster_hash: str):
+async def get_disaster_info_from_contract(disaster_hash: str):
     """Get disaster information from the godslite contract"""
     try:
         if not godslite_contract:
@@ -524,48 +725,134 @@ def get_disaster_info_from_contract(disaster_hash: str):
         print(f"[INFO] Fetching disaster info from contract for hash: {disaster_hash}")
         
         # Convert disaster hash to bytes32
-        if disaster_hash.startswith("0x"):
-            disaster_hash = disaster_hash[2:]
-        if len(disaster_hash) != 64:
-            raise Exception("Invalid disaster_hash length")
-        
-        disaster_bytes = bytes.fromhex(disaster_hash)
+        disaster_bytes = hash_bytes(disaster_hash)
         
         # Get disaster details from contract
-        details = godslite_contract.functions.getDisasterDetails(disaster_bytes).call()
+        details = await contract_read(godslite_contract, "getDisasterDetails", disaster_bytes)
+        record = DisasterRecord.from_contract(disaster_bytes, details)
         
         # Check if disaster exists and is active
-        if not details[0]:  # title is empty
+        if not record.title:
             raise Exception("Disaster not found in contract")
         
-        if not details[6]:  # isActive is False
+        if not record.is_active:
             raise Exception("Disaster is not active in contract")
 
-        title = details[0]
-        target_amount_usdc = details[2]  # targetAmount in USDC (6 decimals)
-        total_donated_usdc = details[3]  # totalDonated in USDC (6 decimals)
-        
-        # Convert from USDC decimals (6) to actual USDC amount
-        target_amount = float(target_amount_usdc) / 1_000_000
-        total_donated = float(total_donated_usdc) / 1_000_000
+        disaster_registry.put(record)
         
-        print(f"[INFO] Disaster: {title}")
-        print(f"[INFO] Target Amount: ${target_amount:.2f} USDC")
-        print(f"[INFO] Total Donated: ${total_donated:.2f} USDC")
+        print(f"[INFO] Disaster: {record.title}")
+        print(f"[INFO] Target Amount: ${record.target_amount:.2f} USDC")
+        print(f"[INFO] Total Donated: ${record.total_donated:.2f} USDC")
 
-        return {
-            "title": title,
-            "target_amount_usdc": target_amount,
-            "total_donated_usdc": total_donated,
-            "funding_progress": (total_donated / target_amount * 100) if target_amount > 0 else 0
-        }
+        return record.as_contract_info()
     except Exception as e:
         print(f"[ERROR] get_disaster_info_from_contract: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
+# Helper: Call a view function through the RPC pool, failing over between endpoints
+async def contract_read(contract, function_name, *args):
+    return await rpc_pool.call(
+        lambda endpoint_w3: getattr(
+            rpc_pool.contract(endpoint_w3, contract.address, contract.abi).functions, function_name
+        )(*args).call()
+    )
+
+# Serializes sends from the controlled wallet so concurrent payouts never reuse a nonce
+transaction_lock = asyncio.Lock()
+# Nonce after our last broadcast; an endpoint that has not seen that transaction yet reports a lower pending count
+next_nonce = None
+
+# Helper: Sign, send and wait for a contract transaction from the controlled wallet
+async def send_contract_transaction(contract, function_name, args, gas):
+    global next_nonce
+    # Only choosing the nonce and broadcasting need the lock; the next payout does not wait for this one to be mined
+    async with transaction_lock:
+        tx_hash = await _broadcast_contract_transaction(contract, function_name, args, gas)
+    try:
+        receipt = await rpc_pool.wait_for_receipt(tx_hash, RECEIPT_TIMEOUT)
+    except TransactionPending:
+        # The transaction may have been dropped; take the nonce from the chain again rather than leave a gap
+        next_nonce = None
+        raise
+    if receipt.status != 1:
+        raise Exception(f"Transaction {tx_hash.hex()} reverted")
+    return tx_hash.hex(), receipt.blockNumber
+
+async def _broadcast_contract_transaction(contract, function_name, args, gas):
+    global next_nonce
+    nonce = await rpc_pool.call(lambda endpoint_w3: endpoint_w3.eth.get_transaction_count(account.address, "pending"))
+    if next_nonce is not None:
+        nonce = max(nonce, next_nonce)
+    tx = await rpc_pool.call(
+        lambda endpoint_w3: getattr(
+            rpc_pool.contract(endpoint_w3, contract.address, contract.abi).functions, function_name
+        )(*args).build_transaction({
+            'from': account.address,
+            'chainId': CHAIN_ID,
+            'nonce': nonce,
+            'gas': gas,
+            'gasPrice': Web3.to_wei('20', 'gwei')  # Higher gas price for Sepolia
+        })
+    )
+    
+    # Sign locally, then broadcast through the pool
+    signed_tx = w3.eth.account.sign_transaction(tx, private_key)
+    tx_hash = await rpc_pool.send_raw_transaction(signed_tx.raw_transaction, sender=account.address, nonce=nonce)
+    next_nonce = nonce + 1
+    return tx_hash
+
+# Helper: USDC balance of the controlled wallet in base units (6 decimals)
+async def get_usdc_balance_units():
+    if not usdc_contract or not account:
+        raise Exception("USDC contract or account not initialized")
+    return await contract_read(usdc_contract, "balanceOf", account.address)
+
+# Helper: One ERC20 transfer of amount_units base units, without a balance check
+async def transfer_usdc_units(recipient_address: str, amount_units: int):
+    if not usdc_contract or not account:
+        raise Exception("USDC contract or account not initialized")
+    tx_hash, block_number = await send_contract_transaction(
+        usdc_contract,
+        "transfer",
+        [Web3.to_checksum_address(recipient_address), amount_units],
+        gas=100000  # Standard gas for ERC20 transfer
+    )
+    print(f"[INFO] ✅ USDC transfer successful!")
+    print(f"[INFO] Transaction Hash: {tx_hash}")
+    print(f"[INFO] Block Number: {block_number}")
+    return tx_hash, block_number
+
+# Helper: Pay several recipients in one transaction through the multi-transfer contract
+async def multi_transfer_usdc_units(recipients, amounts_units):
+    if not multi_transfer_contract:
+        raise Exception("Multi-transfer contract not configured")
+    total = sum(amounts_units)
+    allowance = await contract_read(usdc_contract, "allowance", account.address, multi_transfer_contract.address)
+    if allowance < total:
+        print(f"[INFO] Approving multi-transfer contract for {total} USDC units")
+        try:
+            await send_contract_transaction(
+                usdc_contract, "approve", [multi_transfer_contract.address, total], gas=100000
+            )
+        except TransactionPending as e:
+            # Only the allowance is in doubt; no USDC has moved, so the payouts can be retried
+            raise Exception(f"Approval not confirmed: {e}")
+    tx_hash, block_number = await send_contract_transaction(
+        multi_transfer_contract,
+        "disperseToken",
+        [
+            usdc_contract.address,
+            [Web3.to_checksum_address(recipient) for recipient in recipients],
+            amounts_units
+        ],
+        gas=60000 + 40000 * len(recipients)
+    )
+    print(f"[INFO] ✅ Multi-transfer of {total} USDC units to {len(recipients)} recipients: {tx_hash}")
+    return tx_hash, block_number
+
 # Helper: Send USDC from controlled wallet to recipient
-def send_usdc_to_recipient(recipient_address: str, amount_usdc: float):
+async def send_usdc_to_recipient(recipient_address: str, amount_usdc: float):
     """Send USDC from the controlled wallet to the recipient"""
     try:
         if not usdc_contract or not account:
@@ -577,7 +864,7 @@ def send_usdc_to_recipient(recipient_address: str, amount_usdc: float):
         amount_wei = int(amount_usdc * 1_000_000)
         
         # Check wallet balance
-        wallet_balance = usdc_contract.functions.balanceOf(account.address).call()
+        wallet_balance = await get_usdc_balance_units()
         wallet_balance_usdc = float(wallet_balance) / 1_000_000
         
         print(f"[INFO] Wallet balance: {wallet_balance_usdc:.2f} USDC")
@@ -585,37 +872,67 @@ def send_usdc_to_recipient(recipient_address: str, amount_usdc: float):
         if amount_wei > wallet_balance:
             raise Exception(f"Insufficient USDC balance. Required: {amount_usdc}, Available: {wallet_balance_usdc}")
         
-        # Build USDC transfer transaction
-        nonce = w3.eth.get_transaction_count(account.address)
-        tx = usdc_contract.functions.transfer(
-            Web3.to_checksum_address(recipient_address), 
-            amount_wei
-        ).build_transaction({
-            'from': account.address,
-            'chainId': 11155111,  # Sepolia chain ID
-        'nonce': nonce,
-            'gas': 100000,  # Standard gas for ERC20 transfer
-            'gasPrice': w3.to_wei('20', 'gwei')  # Higher gas price for Sepolia
-        })
-        
-        # Sign and send transaction
-        signed_tx = w3.eth.account.sign_transaction(tx, private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        
-        print(f"[INFO] ✅ USDC transfer successful!")
-        print(f"[INFO] Transaction Hash: {tx_hash.hex()}")
-        print(f"[INFO] Block Number: {receipt.blockNumber}")
-        
-        return tx_hash.hex(), receipt.blockNumber
+        return await transfer_usdc_units(recipient_address, amount_wei)
         
     except Exception as e:
         print(f"[ERROR] send_usdc_to_recipient: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"USDC transfer failed: {str(e)}")
 
-@app.post("/process-vote/")
-async def process_vote(vote: VoteInput):
+# Helper: Receipt of a payout transaction, or None while it is not mined
+async def get_payout_receipt(tx_hash: str):
+    return await rpc_pool.get_transaction_receipt("0x" + tx_hash.removeprefix("0x"))
+
+# Batched payouts: transfers to the same recipient within a window share one transaction
+payout_batcher = PayoutBatcher(
+    balance_fn=get_usdc_balance_units,
+    transfer_fn=transfer_usdc_units,
+    multi_transfer_fn=multi_transfer_usdc_units if MULTI_TRANSFER_ADDRESS else None,
+    receipt_fn=get_payout_receipt
+)
+# Seconds between checks of payouts that were sent but not confirmed in time
+PAYOUT_RECONCILE_INTERVAL = float(os.getenv("PAYOUT_RECONCILE_INTERVAL", "60"))
+payout_reconciler_task = None
+
+# Helper: Settle pending payouts as their transactions are mined; a reverted one puts its claim back into voting
+async def reconcile_payouts_forever():
+    while True:
+        await asyncio.sleep(PAYOUT_RECONCILE_INTERVAL)
+        try:
+            for record in await payout_batcher.reconcile_pending():
+                if record["status"] == "failed":
+                    await asyncio.to_thread(reopen_reverted_claim, record["claim_uuid"], record["tx_hash"])
+        except Exception as e:
+            print(f"[PAYOUT] Reconciling pending payouts failed: {e}")
+
+@app.on_event("startup")
+async def start_payout_reconciler():
+    global payout_reconciler_task
+    payout_reconciler_task = asyncio.create_task(reconcile_payouts_forever())
+
+@app.on_event("shutdown")
+async def stop_payout_reconciler():
+    if payout_reconciler_task:
+        payout_reconciler_task.cancel()
+
+# Helper: Pay an approved claim through the batcher and wait for the transaction that pays it
+def pay_claim(claim_uuid: str, recipient: str, amount_usdc):
+    """Recipient and amount must come from the claim row, never from the request"""
+    amount_units = to_units(amount_usdc, USDC_UNIT)
+    if app_loop is None:
+        raise PayoutError("Payout batcher is not running")
+    # The batcher lives on the event loop; approvals run in worker threads
+    return run_on_app_loop(payout_batcher.submit(claim_uuid, recipient, amount_units))
+
+@app.get("/payouts/{claim_uuid}")
+def get_payout(claim_uuid: str):
+    """Audit lookup: which transaction paid this claim"""
+    record = payout_batcher.audit_log.lookup(claim_uuid)
+    if not record:
+        raise HTTPException(status_code=404, detail="No payout recorded for this claim.")
+    return record
+
+def check_voting_available():
     # Check if DynamoDB is available
     if not voting_table:
         raise HTTPException(status_code=503, detail="Voting system is not available. Please check configuration.")
@@ -623,22 +940,112 @@ async def process_vote(vote: VoteInput):
     # Check if Web3 components are available
     if not w3 or not account or not godslite_contract or not usdc_contract:
         raise HTTPException(status_code=503, detail="Blockchain components are not available. Please check configuration.")
-    
-    # Step 1: Get item from DynamoDB
+
+# Helper: Bulkhead a vote runs in; approve/reject move money and go ahead of LLM re-votes
+def vote_bulkhead(vote: VoteInput):
+    return revote_bulkhead if vote.voteResult.lower() in ["higher", "lower"] else payout_bulkhead
+
+# Helper: Release a claim's funds from the disaster pool through the unlock-funds service
+def unlock_claim_funds(disaster_hash: str, claimed_amount_usdc, org_address: str):
+    # Make POST request to unlock funds endpoint
+    unlock_url = "https://unlockfunds.onrender.com/unlock-funds/"
+    unlock_payload = {
+        "disasterHash": disaster_hash,
+        "amount": str(claimed_amount_usdc),
+        "recipient": org_address
+    }
+
+    print(f"[INFO] Making unlock request to: {unlock_url}")
+    print(f"[INFO] Unlock payload: {unlock_payload}")
+
+    with unlock_api_gate:
+        unlock_response = http_transport.post(
+            unlock_url, 
+            json=unlock_payload,
+            headers={"Content-Type": "application/json"},
+            timeout=3000
+        )
+
+    if unlock_response.status_code != 200:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Unlock funds request failed with status {unlock_response.status_code}: {unlock_response.text}"
+        )
+
+    unlock_result = unlock_response.json()
+    print(f"[INFO] Unlock response: {unlock_result}")
+
+    if not unlock_result.get("success"):
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Unlock funds failed: {unlock_result.get('error', 'Unknown error')}"
+        )
+
+    return unlock_result
+
+# Helper: Move a claim out of voting, only if it is still in voting at the amount that was read
+def transition_claim(claim_uuid: str, claim_state: str, expected_amount=None, new_amount=None):
+    update = "SET claim_state = :s"
+    condition = "claim_state = :voting"
+    values = {":s": claim_state, ":voting": "voting"}
+    if expected_amount is not None:
+        condition += " AND claimed_amount = :expected"
+        values[":expected"] = expected_amount
+    if new_amount is not None:
+        update += ", claimed_amount = :a"
+        values[":a"] = new_amount
     try:
-        response = voting_table.get_item(Key={"id": vote.uuid})
-        item = response.get("Item")
-        if not item:
-            raise HTTPException(status_code=404, detail="UUID not found in DB.")
+        voting_table.update_item(
+            Key={"id": claim_uuid},
+            UpdateExpression=update,
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values
+        )
     except ClientError as e:
-        raise HTTPException(status_code=500, detail=f"DynamoDB error: {e.response['Error']['Message']}")
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            raise HTTPException(status_code=409, detail="Claim is no longer in voting or its amount has changed.")
+        raise
 
+# Helper: Put an approved claim back into voting after its payout failed before sending anything
+def reopen_claim(claim_uuid: str):
+    try:
+        voting_table.update_item(
+            Key={"id": claim_uuid},
+            UpdateExpression="SET claim_state = :voting",
+            ConditionExpression="claim_state = :approved AND attribute_not_exists(claims_hash)",
+            ExpressionAttributeValues={":voting": "voting", ":approved": "approved"}
+        )
+    except ClientError as e:
+        print(f"[WARN] Could not reopen claim {claim_uuid} after a failed payout: {e}")
+
+# Helper: EIP-55 form of an EVM address; anything else (e.g. an Aztec address) is returned unchanged
+@lru_cache(maxsize=4096)
+def checksum_address(address):
+    if address and Web3.is_address(address):
+        return Web3.to_checksum_address(address)
+    return address
+
+# Helper: Put a claim back into voting when the transaction recorded as paying it reverted
+def reopen_reverted_claim(claim_uuid: str, tx_hash: str):
+    try:
+        voting_table.update_item(
+            Key={"id": claim_uuid},
+            UpdateExpression="SET claim_state = :voting REMOVE claims_hash",
+            ConditionExpression="claim_state = :approved AND claims_hash = :h",
+            ExpressionAttributeValues={":voting": "voting", ":approved": "approved", ":h": tx_hash}
+        )
+        print(f"[PAYOUT] Transfer {tx_hash} reverted; claim {claim_uuid} is back in voting")
+    except ClientError as e:
+        print(f"[WARN] Could not reopen claim {claim_uuid} after reverted transfer {tx_hash}: {e}")
+
+# Helper: Apply one vote to a claim row already loaded from DynamoDB
+def apply_vote(vote: VoteInput, item: dict):
     vote_result = vote.voteResult.lower()
 
     if vote_result == "approve":
         try:
             # Get organization address and claimed amount from DB
-            org_address = item.get("organization_aztec_address")
+            org_address = checksum_address(item.get("organization_aztec_address"))
             if not org_address:
                 raise HTTPException(status_code=500, detail="Missing organization_aztec_address in DB.")
 
@@ -654,67 +1061,60 @@ async def process_vote(vote: VoteInput):
             print(f"[INFO] Approving claim for {claimed_amount_usdc} USDC to {org_address}")
             print(f"[INFO] Disaster Hash: {disaster_hash}")
 
-            # Make POST request to unlock funds endpoint
-            unlock_url = "https://unlockfunds.onrender.com/unlock-funds/"
-            unlock_payload = {
-                "disasterHash": disaster_hash,
-                "amount": str(claimed_amount_usdc),
-                "recipient": org_address
-            }
-            
-            print(f"[INFO] Making unlock request to: {unlock_url}")
-            print(f"[INFO] Unlock payload: {unlock_payload}")
-            
-            unlock_response = requests.post(
-                unlock_url, 
-                json=unlock_payload,
-                headers={"Content-Type": "application/json"},
-                timeout=3000
-            )
-            
-            if unlock_response.status_code != 200:
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Unlock funds request failed with status {unlock_response.status_code}: {unlock_response.text}"
-                )
-            
-            unlock_result = unlock_response.json()
-            print(f"[INFO] Unlock response: {unlock_result}")
-            
-            if not unlock_result.get("success"):
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Unlock funds failed: {unlock_result.get('error', 'Unknown error')}"
+            if APPROVE_PAYOUT_MODE == "usdc" and not Web3.is_address(org_address):
+                raise HTTPException(status_code=500, detail="organization_aztec_address is not an EVM address.")
+
+            # Take the claim out of voting before any money moves; a second approval, or one that
+            # raced a re-vote changing the amount, fails here instead of paying again
+            transition_claim(vote.uuid, "approved", claimed_amount_usdc)
+
+            try:
+                if APPROVE_PAYOUT_MODE == "usdc":
+                    # Paid from the service wallet; transfers to the same NGO within a window share one transaction
+                    payout = pay_claim(vote.uuid, org_address, claimed_amount_usdc)
+                    release = {"payout": payout}
+                    claims_hash = payout["tx_hash"]
+                else:
+                    unlock_result = unlock_claim_funds(disaster_hash, claimed_amount_usdc, org_address)
+                    release = {"unlockResponse": unlock_result}
+                    claims_hash = unlock_result.get("data", {}).get("transactionHash", "unlock_completed")
+            except PayoutPending as e:
+                # The transfer was broadcast and may still be mined: keep the claim approved and
+                # record the transaction so it can neither be reopened nor paid a second time
+                voting_table.update_item(
+                    Key={"id": vote.uuid},
+                    UpdateExpression="SET claims_hash = :h",
+                    ExpressionAttributeValues={":h": e.tx_hash}
                 )
+                raise HTTPException(status_code=504, detail=str(e))
+            except (HTTPException, PayoutError):
+                # Nothing was paid, so voters can try again
+                reopen_claim(vote.uuid)
+                raise
 
-            # Update DB with approved status and transaction hash
+            # Record the transaction that paid the claim
             voting_table.update_item(
                 Key={"id": vote.uuid},
-                UpdateExpression="SET claim_state = :s, claims_hash = :h",
-                ExpressionAttributeValues={
-                    ":s": "approved",
-                    ":h": unlock_result.get("data", {}).get("transactionHash", "unlock_completed")
-                }
+                UpdateExpression="SET claims_hash = :h",
+                ExpressionAttributeValues={":h": claims_hash}
             )
 
             return {
                 "status": "✅ Claim approved & funds unlocked successfully.",
-                "unlockResponse": unlock_result,
+                **release,
                 "claimed_amount_usdc": str(claimed_amount_usdc),
                 "recipient": org_address,
                 "disasterHash": disaster_hash
             }
             
+        except (HTTPException, UpstreamOverloaded):
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Approval failed: {str(e)}")
 
     elif vote_result == "reject":
         try:
-            voting_table.update_item(
-                Key={"id": vote.uuid},
-                UpdateExpression="SET claim_state = :s",
-                ExpressionAttributeValues={":s": "rejected"}
-            )
+            transition_claim(vote.uuid, "rejected")
             return {"status": "❌ Claim rejected."}
         except ClientError as e:
             raise HTTPException(status_code=500, detail=f"Update error: {e.response['Error']['Message']}")
@@ -725,40 +1125,41 @@ async def process_vote(vote: VoteInput):
             claimed_amount = item.get("claimed_amount", 0)
 
             # Use AI to determine the new amount based on context
-            prompt = (
+            prompt = build_prompt(
                 f"The organization has requested {claimed_amount} USDC as relief funds. "
-                f"The reason they provided is: '{reason}'. "
+                "The reason they provided is: '{reason}'. "
                 f"Voters believe the amount should be '{vote_result}'. "
                 f"Please analyze the request and suggest a revised amount in USDC. "
                 f"Consider the reason provided and whether the amount should be increased or decreased. "
-                f"Respond with just the new amount as a number."
+                f"Respond with the new amount on its own line as 'AMOUNT: <number> USDC'.",
+                {"reason": reason},
+                "process-vote",
+                truncatable=("reason",)
             )
 
-            completion = client.chat.completions.create(
-                model="6866646ff14ab5c885e4386d",
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with mosaia_revote_gate:
+                completion = tracked_completion(
+                    client,
+                    "process-vote",
+                    model="6866646ff14ab5c885e4386d",
+                    messages=[{"role": "user", "content": prompt}],
+                )
             response_content = completion.choices[0].message.content.strip()
             
-            # Extract the number from AI response
-            new_amount = int("".join(filter(str.isdigit, response_content)))
+            # Take the AMOUNT: line, or failing that an amount marked as money; never a stray count like "2 boats"
+            new_amount = extract_amount(response_content)
+            if new_amount is None:
+                raise Exception(f"AI response did not contain an AMOUNT: line or a currency amount: {response_content!r}")
             
             # Ensure minimum amount of 1 USDC
             if new_amount < 1:
-                new_amount = 1
+                new_amount = Decimal(1)
                 print(f"[INFO] AI suggested amount too low, adjusted to minimum: {new_amount} USDC")
 
             print(f"[INFO] AI suggested new amount: {new_amount} USDC (was: {claimed_amount})")
 
-            # Update DB with new amount and send back for re-voting
-            voting_table.update_item(
-                Key={"id": vote.uuid},
-                UpdateExpression="SET claim_state = :s, claimed_amount = :a",
-                ExpressionAttributeValues={
-                    ":s": "voting",
-                    ":a": new_amount
-                }
-            )
+            # Update DB with new amount and send back for re-voting, unless another vote got there first
+            transition_claim(vote.uuid, "voting", item.get("claimed_amount"), new_amount=new_amount)
             
             return {
                 "status": "🔁 Claim sent back for re-voting with updated amount.",
@@ -767,47 +1168,237 @@ async def process_vote(vote: VoteInput):
                 "aiReasoning": "AI analyzed the request and suggested adjustment based on context"
             }
             
+        except (HTTPException, UpstreamOverloaded):
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"AI adjustment failed: {str(e)}")
 
     else:
         raise HTTPException(status_code=400, detail="Invalid vote result. Must be: approve, reject, higher, or lower.")
 
+@app.post("/process-vote/")
+async def process_vote(vote: VoteInput, request: Request):
+    admit("process-vote", request, vote.disasterHash)
+    check_voting_available()
+    return await vote_bulkhead(vote).run(load_and_apply_vote, vote)
+
+def load_and_apply_vote(vote: VoteInput):
+    # Step 1: Get item from DynamoDB; votes move money, so never from a cache or a stale replica
+    try:
+        response = voting_table.get_item(Key={"id": vote.uuid}, ConsistentRead=True)
+        item = response.get("Item")
+        if not item:
+            raise HTTPException(status_code=404, detail="UUID not found in DB.")
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"DynamoDB error: {e.response['Error']['Message']}")
+
+    return apply_vote(vote, item)
+
+# Helper: Load many claim rows with BatchGetItem, retrying unprocessed keys
+def load_claims(claim_ids):
+    """Return {id: item} for the claims that exist; BatchGetItem takes at most 100 keys per call"""
+    items = {}
+    for start in range(0, len(claim_ids), 100):
+        request_items = {
+            CLAIMS_TABLE_NAME: {
+                "Keys": [{"id": claim_id} for claim_id in claim_ids[start:start + 100]],
+                "ConsistentRead": True
+            }
+        }
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get("Responses", {}).get(CLAIMS_TABLE_NAME, []):
+                items[item["id"]] = item
+            request_items = response.get("UnprocessedKeys") or {}
+            if request_items:
+                attempt += 1
+                if attempt > 5:
+                    raise Exception("DynamoDB kept returning unprocessed keys")
+                time.sleep(min(2 ** attempt * 0.05, 1.0))
+    return items
+
+@app.post("/process-votes/batch")
+async def process_votes_batch(batch: BatchVoteInput, request: Request):
+    """
+    Apply many votes in one request. Claims are loaded with a consistent
+    BatchGetItem, votes for the same disaster run one after another (they draw
+    on the same pool), and different disasters run concurrently up to
+    maxConcurrency. Every vote gets its own result; one failure does not fail
+    the batch.
+    """
+    if not batch.votes:
+        raise HTTPException(status_code=400, detail="No votes provided.")
+    if len(batch.votes) > BATCH_VOTE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_VOTE_MAX} votes per batch.")
+    # One admission per disaster the batch touches; BATCH_VOTE_MAX bounds how many votes it carries
+    admit("process-votes-batch", request, disaster_hashes={vote.disasterHash for vote in batch.votes})
+    check_voting_available()
+
+    started = time.perf_counter()
+    results = [None] * len(batch.votes)
+
+    # The same claim twice in one batch would act on a stale row, so only the first one counts
+    seen = set()
+    pending = []
+    for index, vote in enumerate(batch.votes):
+        if vote.uuid in seen:
+            results[index] = {"uuid": vote.uuid, "status": "error", "statusCode": 400,
+                              "error": "Duplicate uuid in batch."}
+        else:
+            seen.add(vote.uuid)
+            pending.append(index)
+
+    try:
+        items = await asyncio.to_thread(load_claims, [batch.votes[index].uuid for index in pending])
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"DynamoDB error: {e.response['Error']['Message']}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
+
+    groups = {}
+    for index in pending:
+        vote = batch.votes[index]
+        if vote.uuid not in items:
+            results[index] = {"uuid": vote.uuid, "status": "error", "statusCode": 404,
+                              "error": "UUID not found in DB."}
+            continue
+        # Unlocks draw on the disaster's pool, so they go one at a time; wallet payouts coalesce in the batcher
+        group_key = vote.uuid if APPROVE_PAYOUT_MODE == "usdc" else vote.disasterHash.lower().removeprefix("0x")
+        groups.setdefault(group_key, []).append(index)
+
+    semaphore = asyncio.Semaphore(max(1, min(batch.maxConcurrency, BATCH_VOTE_MAX_CONCURRENCY)))
+
+    async def run_group(indexes):
+        async with semaphore:
+            for index in indexes:
+                vote = batch.votes[index]
+                try:
+                    result = await vote_bulkhead(vote).run(apply_vote, vote, items[vote.uuid])
+                    results[index] = {"uuid": vote.uuid, "status": "ok", "statusCode": 200, "result": result}
+                except HTTPException as e:
+                    results[index] = {"uuid": vote.uuid, "status": "error", "statusCode": e.status_code,
+                                      "error": e.detail}
+                except Exception as e:
+                    results[index] = {"uuid": vote.uuid, "status": "error", "statusCode": 500,
+                                      "error": str(e)}
+
+    await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    print(f"[INFO] Batch of {len(results)} votes: {succeeded} succeeded in {elapsed:.2f}s")
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "disasters": len({batch.votes[index].disasterHash.lower().removeprefix("0x") for index in pending}),
+            "elapsedSeconds": round(elapsed, 3),
+            "claimsPerSecond": round(len(results) / elapsed, 2) if elapsed > 0 else None
+        }
+    }
+
+# Helper: /metrics/* describe the service's internals, so only local callers or holders of the profiling token see them
+def require_operator(request: Request):
+    if profiling.token_valid(request.headers.get("X-Profiling-Token")):
+        return
+    # ngrok delivers public traffic from localhost as well, but always adds X-Forwarded-For
+    client_host = request.client.host if request.client else ""
+    if client_host in ("127.0.0.1", "::1") and "x-forwarded-for" not in request.headers:
+        return
+    raise HTTPException(status_code=404, detail="Not Found")
+
+# === LLM usage endpoint ===
+@app.get("/metrics/llm", dependencies=[Depends(require_operator)])
+def llm_metrics():
+    """Cumulative tokens, latency and cost per endpoint and per agent model"""
+    return LLM_USAGE.snapshot()
+
+# === Admission control endpoint ===
+@app.get("/metrics/admission", dependencies=[Depends(require_operator)])
+def admission_metrics():
+    """Admitted versus rejected requests and current upstream queue depths"""
+    return admission_snapshot()
+
+# === Verdict cache endpoint ===
+@app.get("/metrics/verdict-cache", dependencies=[Depends(require_operator)])
+def verdict_cache_metrics():
+    """Hit, miss and invalidation counts of the fact-check verdict cache"""
+    return verdict_cache.stats()
+
+# === RPC pool endpoint ===
+@app.get("/metrics/rpc", dependencies=[Depends(require_operator)])
+def rpc_metrics():
+    """Per-endpoint latency, error counts and health scores of the RPC pool"""
+    return rpc_pool.stats()
+
+# === HTTP transport endpoint ===
+@app.get("/metrics/transport", dependencies=[Depends(require_operator)])
+def transport_metrics():
+    """Calls, errors and average latency per upstream host on the shared HTTP transport"""
+    return http_transport.stats()
+
+# === Disaster registry endpoint ===
+@app.get("/metrics/disasters", dependencies=[Depends(require_operator)])
+def disaster_registry_metrics():
+    """Disasters held in the in-process registry and lookup hit rate"""
+    return disaster_registry.stats()
+
+# === Bulkhead endpoint ===
+@app.get("/metrics/bulkheads", dependencies=[Depends(require_operator)])
+def bulkhead_metrics():
+    """Running, queued and shed work per endpoint class"""
+    return bulkheads.snapshot()
+
+# === Profiling endpoint (opt-in via PROFILING_TOKEN) ===
+@app.get("/admin/profile")
+async def capture_profile(request: Request, mode: str = "wall", seconds: float = 10,
+                          interval: float = 0.005, format: str = "folded"):
+    """
+    Profile this worker for a few seconds without restarting it. mode=wall samples
+    every thread's stack, idle ones included, mode=memory diffs tracemalloc snapshots. format=folded
+    returns flamegraph.pl / speedscope input, format=json a summary.
+    """
+    if not profiling.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.token_valid(request.headers.get("X-Profiling-Token")):
+        raise HTTPException(status_code=403, detail="Invalid profiling token.")
+    if mode not in ("wall", "memory") or format not in ("folded", "json"):
+        raise HTTPException(status_code=400, detail="mode must be wall or memory, format folded or json.")
+    seconds = min(max(seconds, 0.1), profiling.PROFILING_MAX_SECONDS)
+
+    try:
+        if mode == "wall":
+            profile = await asyncio.to_thread(profiling.sample_wall, seconds, max(interval, 0.001))
+        else:
+            state = profiling.start_allocations()
+            try:
+                await asyncio.sleep(seconds)
+            except BaseException:
+                # Client went away mid-capture: stop tracing and free the capture slot
+                profiling.finish_allocations(state, seconds)
+                raise
+            profile = await asyncio.to_thread(profiling.finish_allocations, state, seconds)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "folded":
+        return PlainTextResponse(profiling.folded_text(profile))
+    return profiling.summary(profile)
+
+# === Payout batcher endpoint ===
+@app.get("/metrics/payouts", dependencies=[Depends(require_operator)])
+def payout_metrics():
+    """Pending and sent payout batches"""
+    return payout_batcher.stats()
+
 # === Health check endpoint ===
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "disaster-relief-fact-checker"}
 
-# === Test endpoint ===
-@app.get("/test-parser")
-def test_parser():
-    """Test endpoint to verify the parser works with different formats"""
-    test_responses = [
-        '{"amount": 1000, "comment": "Test JSON", "sources": ["http://example.com"]}',
-        'amount: 2000\ncomment: Test YAML\nsources: http://example.com',
-        'amount: 3000\nreasoning: The New Life Foundation has provided essential services\nsources: https://newlifefoundation.in/'
-    ]
-    
-    results = []
-    for i, response in enumerate(test_responses):
-        try:
-            parsed = parse_agent_response(response)
-            results.append({
-                "test_case": i + 1,
-                "input": response,
-                "parsed": parsed,
-                "status": "success"
-            })
-        except Exception as e:
-            results.append({
-                "test_case": i + 1,
-                "input": response,
-                "error": str(e),
-                "status": "failed"
-            })
-    
-    return {"test_results": results}
-
 if __name__ == "__main__":
     import uvicorn
     
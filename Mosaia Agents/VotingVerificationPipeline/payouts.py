@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timezone
+
+# Pending transfers are held at most this long so transfers to the same recipient can be coalesced
+PAYOUT_WINDOW_SECONDS = float(os.getenv("PAYOUT_WINDOW_SECONDS", "30"))
+# A batch no other claim has joined for this long is sent before the window ends, so a lone claim
+# (and the approval thread waiting on it) is not held for the whole window
+PAYOUT_IDLE_SECONDS = float(os.getenv("PAYOUT_IDLE_SECONDS", "2"))
+# Append-only JSONL trail mapping each claim uuid to the transaction that paid it
+PAYOUT_AUDIT_PATH = os.getenv("PAYOUT_AUDIT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "payout_audit.jsonl"))
+
+
+class PayoutError(Exception):
+    """A queued payout could not be sent"""
+
+
+class PayoutPending(PayoutError):
+    """The transfer was broadcast but not confirmed; it may still be mined, so the claim must not be paid again"""
+
+    def __init__(self, tx_hash, message):
+        super().__init__(message)
+        self.tx_hash = tx_hash
+
+
+def to_units(amount, unit=10**6):
+    """Token base units for a decimal amount (USDC has 6 decimals); rejects anything not finite and positive"""
+    try:
+        value = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise PayoutError(f"Invalid payout amount: {amount!r}")
+    if not value.is_finite() or value <= 0:
+        raise PayoutError(f"Payout amount must be finite and positive, got {amount!r}")
+    units = int(value * unit)
+    if units <= 0:
+        raise PayoutError(f"Payout amount {amount!r} is below the smallest unit")
+    return units
+
+
+class PayoutAuditLog:
+    """JSONL audit trail with an in-memory index by claim uuid"""
+
+    def __init__(self, path=PAYOUT_AUDIT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_claim = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._by_claim[record["claim_uuid"]] = record
+
+    def append(self, records):
+        with self._lock:
+            with open(self.path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for record in records:
+                self._by_claim[record["claim_uuid"]] = record
+
+    def lookup(self, claim_uuid):
+        with self._lock:
+            return self._by_claim.get(claim_uuid)
+
+    def pending(self):
+        """Latest records of transfers sent but not yet confirmed or failed"""
+        with self._lock:
+            return [record for record in self._by_claim.values() if record.get("status") == "pending"]
+
+
+class PayoutBatcher:
+    """
+    Coalesces USDC payouts per recipient over a short window. The balance and
+    transfer functions are coroutines. A transfer function that raises an
+    exception carrying a tx_hash attribute reports a transaction that was sent
+    but not confirmed; its claims are recorded as pending, never failed, so a
+    retry cannot pay them twice.
+
+    Every flush reads the wallet balance once, then sends either one transfer
+    per recipient or, when a multi-transfer function is configured, a single
+    transaction for the whole batch. Each claim's future resolves with the
+    transaction that paid it, and the mapping is appended to the audit log.
+
+    receipt_fn(tx_hash) returns the receipt of a mined transaction or None;
+    with it, pending records are rewritten as confirmed or failed once their
+    transaction is mined, both by reconcile_pending() and when a claim with a
+    pending record is submitted again.
+    """
+
+    def __init__(self, balance_fn, transfer_fn, multi_transfer_fn=None, receipt_fn=None,
+                 window=PAYOUT_WINDOW_SECONDS, idle=PAYOUT_IDLE_SECONDS, audit_log=None):
+        self.balance_fn = balance_fn
+        self.transfer_fn = transfer_fn
+        self.multi_transfer_fn = multi_transfer_fn
+        self.receipt_fn = receipt_fn
+        self.window = window
+        self.idle = idle
+        self.audit_log = audit_log or PayoutAuditLog()
+        self._pending = {}
+        # Claims waiting for the window, and claims whose transfer has not settled or failed yet
+        self._claims = set()
+        self._in_flight = set()
+        self._flush_task = None
+        self._last_queued = 0.0
+        self._lock = asyncio.Lock()
+        self.batches_sent = 0
+        self.transfers_sent = 0
+        self.claims_paid = 0
+        self.transfers_pending = 0
+
+    async def submit(self, claim_uuid, recipient, amount_units):
+        """Queue a payout and wait until the transaction that pays it is confirmed"""
+        if not isinstance(amount_units, int) or amount_units <= 0:
+            raise PayoutError("Payout amount must be a positive number of base units")
+        paid = await self._recorded(claim_uuid)
+        if paid:
+            print(f"[PAYOUT] Claim {claim_uuid} was already paid in {paid['tx_hash']}")
+            return paid
+
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if claim_uuid in self._claims or claim_uuid in self._in_flight:
+                raise PayoutError(f"Claim {claim_uuid} is already queued for payout")
+            # A transfer may have settled between the lookup above and taking the lock
+            paid = await self._recorded(claim_uuid, reconcile=False)
+            if paid:
+                return paid
+            future = loop.create_future()
+            self._claims.add(claim_uuid)
+            self._pending.setdefault(recipient, []).append((claim_uuid, amount_units, future))
+            self._last_queued = time.monotonic()
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_after_window())
+        print(f"[PAYOUT] Queued {amount_units} units for {recipient} (claim {claim_uuid})")
+        return await future
+
+    async def _recorded(self, claim_uuid, reconcile=True):
+        """
+        The audit record of a claim already paid, or None if it may be paid.
+        A pending record is checked against the chain first; it raises
+        PayoutPending while its transaction is still unmined.
+        """
+        record = self.audit_log.lookup(claim_uuid)
+        if record and record.get("status") == "pending" and reconcile:
+            record = (await self._reconcile([record]))[0] or record
+        if record and record.get("status") == "failed":
+            # Mined but reverted: nothing was transferred, so the claim can be paid
+            return None
+        if record and record.get("status") == "pending":
+            raise PayoutPending(record["tx_hash"], f"Claim {claim_uuid} was sent in {record['tx_hash']}, "
+                                                   f"which is not confirmed yet")
+        return record
+
+    async def reconcile_pending(self):
+        """Rewrite pending records whose transaction has been mined; returns the rewritten records"""
+        return [record for record in await self._reconcile(self.audit_log.pending()) if record]
+
+    async def _reconcile(self, records):
+        """Confirmed or failed versions of the given pending records, None for those still unmined"""
+        if self.receipt_fn is None:
+            return [None] * len(records)
+        receipts = {}
+        for tx_hash in {record["tx_hash"] for record in records}:
+            try:
+                receipts[tx_hash] = await self.receipt_fn(tx_hash)
+            except Exception as e:
+                print(f"[PAYOUT] Could not check pending transfer {tx_hash}: {e}")
+        checked_at = datetime.now(timezone.utc).isoformat()
+        resolved = []
+        for record in records:
+            receipt = receipts.get(record["tx_hash"])
+            if receipt is None:
+                resolved.append(None)
+                continue
+            status = "confirmed" if receipt["status"] == 1 else "failed"
+            resolved.append({**record, "status": status, "block_number": receipt["blockNumber"],
+                             "reconciled_at": checked_at})
+            if status == "confirmed":
+                self.claims_paid += 1
+            print(f"[PAYOUT] Pending transfer {record['tx_hash']} for claim {record['claim_uuid']} {status}")
+        if any(resolved):
+            self.audit_log.append([record for record in resolved if record])
+        return resolved
+
+    async def _flush_after_window(self):
+        # Sent once no claim has joined for idle seconds, or when the window ends, whichever comes first
+        started = time.monotonic()
+        while True:
+            due = min(started + self.window, self._last_queued + self.idle)
+            if time.monotonic() >= due:
+                break
+            await asyncio.sleep(due - time.monotonic())
+        await self.flush()
+
+    async def flush(self):
+        """Send everything queued so far"""
+        async with self._lock:
+            batch = self._pending
+            self._pending = {}
+            for claims in batch.values():
+                for claim_uuid, _, _ in claims:
+                    self._claims.discard(claim_uuid)
+                    self._in_flight.add(claim_uuid)
+        if not batch:
+            return
+        try:
+            await self._send(batch)
+        finally:
+            async with self._lock:
+                for claims in batch.values():
+                    for claim_uuid, _, future in claims:
+                        self._in_flight.discard(claim_uuid)
+                        if not future.done():
+                            future.set_exception(PayoutError("Payout was not sent"))
+                # Claims queued while this batch was being sent still need a flush of their own
+                if self._pending and (self._flush_task is None or self._flush_task.done()
+                                      or self._flush_task is asyncio.current_task()):
+                    self._flush_task = asyncio.create_task(self._flush_after_window())
+
+    async def _send(self, batch):
+        batch_id = str(uuid.uuid4())
+        totals = {recipient: sum(amount for _, amount, _ in claims) for recipient, claims in batch.items()}
+        try:
+            balance = await self.balance_fn()
+        except Exception as e:
+            self._fail(batch, PayoutError(f"Balance check failed: {e}"))
+            return
+
+        # Pay recipients in arrival order while the balance covers them
+        affordable, unaffordable = {}, {}
+        remaining = balance
+        for recipient, total in totals.items():
+            if total <= remaining:
+                affordable[recipient] = batch[recipient]
+                remaining -= total
+            else:
+                unaffordable[recipient] = batch[recipient]
+        if unaffordable:
+            self._fail(unaffordable, PayoutError(f"Insufficient USDC balance. Available: {balance} units"))
+        if not affordable:
+            return
+
+        print(f"[PAYOUT] Batch {batch_id}: {sum(len(c) for c in affordable.values())} claim(s) "
+              f"to {len(affordable)} recipient(s), balance {balance} units")
+
+        if self.multi_transfer_fn and len(affordable) > 1:
+            recipients = list(affordable)
+            try:
+                tx_hash, block_number = await self.multi_transfer_fn(
+                    recipients, [totals[r] for r in recipients]
+                )
+            except Exception as e:
+                if getattr(e, "tx_hash", None) is not None:
+                    self._settle_pending(batch_id, affordable, e)
+                else:
+                    self._fail(affordable, PayoutError(f"Multi-transfer failed: {e}"))
+                return
+            self.transfers_sent += 1
+            for recipient in recipients:
+                self._settle(batch_id, recipient, affordable[recipient], tx_hash, block_number)
+        else:
+            for recipient, claims in affordable.items():
+                try:
+                    tx_hash, block_number = await self.transfer_fn(recipient, totals[recipient])
+                except Exception as e:
+                    if getattr(e, "tx_hash", None) is not None:
+                        self._settle_pending(batch_id, {recipient: claims}, e)
+                    else:
+                        self._fail({recipient: claims}, PayoutError(f"Transfer failed: {e}"))
+                    continue
+                self.transfers_sent += 1
+                self._settle(batch_id, recipient, claims, tx_hash, block_number)
+        self.batches_sent += 1
+
+    def _settle(self, batch_id, recipient, claims, tx_hash, block_number):
+        paid_at = datetime.now(timezone.utc).isoformat()
+        records = [{
+            "claim_uuid": claim_uuid,
+            "recipient": recipient,
+            "amount_units": amount,
+            "tx_hash": tx_hash,
+            "block_number": block_number,
+            "batch_id": batch_id,
+            "coalesced_claims": len(claims),
+            "status": "confirmed",
+            "paid_at": paid_at
+        } for claim_uuid, amount, _ in claims]
+        self.audit_log.append(records)
+        for record, (_, _, future) in zip(records, claims):
+            if not future.done():
+                future.set_result(record)
+        self.claims_paid += len(claims)
+
+    def _settle_pending(self, batch_id, group, error):
+        """Record claims whose transaction was sent but not confirmed, so they are not sent again"""
+        tx_hash = error.tx_hash.hex() if isinstance(error.tx_hash, bytes) else str(error.tx_hash)
+        sent_at = datetime.now(timezone.utc).isoformat()
+        records = [{
+            "claim_uuid": claim_uuid,
+            "recipient": recipient,
+            "amount_units": amount,
+            "tx_hash": tx_hash,
+            "block_number": None,
+            "status": "pending",
+            "batch_id": batch_id,
+            "coalesced_claims": len(claims),
+            "paid_at": sent_at
+        } for recipient, claims in group.items() for claim_uuid, amount, _ in claims]
+        self.audit_log.append(records)
+        print(f"[PAYOUT] {tx_hash} is not confirmed ({error}); {len(records)} claim(s) left pending")
+        for claims in group.values():
+            for _, _, future in claims:
+                if not future.done():
+                    future.set_exception(PayoutPending(tx_hash, f"Payout sent in {tx_hash} but not confirmed: {error}"))
+        self.transfers_pending += 1
+
+    @staticmethod
+    def _fail(group, error):
+        print(f"[PAYOUT] {error}")
+        for claims in group.values():
+            for _, _, future in claims:
+                if not future.done():
+                    future.set_exception(error)
+
+    def stats(self):
+        return {
+            "pending_recipients": len(self._pending),
+            "pending_claims": len(self._claims),
+            "in_flight_claims": len(self._in_flight),
+            "batches_sent": self.batches_sent,
+            "transfers_sent": self.transfers_sent,
+            "claims_paid": self.claims_paid,
+            "transfers_pending": self.transfers_pending,
+            "window_seconds": self.window,
+            "idle_seconds": self.idle,
+            "pending_records": len(self.audit_log.pending()),
+        }
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import hmac
+import threading
+import tracemalloc
+from collections import Counter
+
+# The profiling endpoint is disabled unless this token is set
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+PROFILING_MAX_FRAMES = int(os.getenv("PROFILING_MAX_FRAMES", "64"))
+
+# Only one capture at a time; two samplers would profile each other
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another capture is already running on this worker"""
+
+
+def token_valid(token):
+    return bool(PROFILING_TOKEN) and hmac.compare_digest(token or "", PROFILING_TOKEN)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _folded(frame, thread_name):
+    """Root-first "thread;caller;callee" line for one stack, as flamegraph.pl and speedscope read it"""
+    labels = []
+    while frame is not None and len(labels) < PROFILING_MAX_FRAMES:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+def sample_wall(seconds, interval=0.005):
+    """
+    Sample every thread's stack with sys._current_frames() for the given
+    duration. Returns folded stacks with sample counts. This is wall-clock
+    time: a thread waiting on a lock, socket or queue is sampled as often as
+    one on the CPU, so idle pool threads show up under their wait call.
+    Blocking; run it off the event loop so the worker keeps serving while it
+    is being profiled.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        own_id = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stacks[_folded(frame, names.get(thread_id, f"thread-{thread_id}"))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {"mode": "wall", "seconds": seconds, "interval": interval, "samples": samples, "stacks": stacks}
+    finally:
+        _capture_lock.release()
+
+
+def start_allocations():
+    """Begin an allocation capture; returns the state finish_allocations needs"""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(PROFILING_MAX_FRAMES)
+    return started_tracing, tracemalloc.take_snapshot()
+
+
+def finish_allocations(state, seconds, limit=50):
+    """Allocation growth since start_allocations as folded stacks weighted by bytes"""
+    started_tracing, before = state
+    try:
+        after = tracemalloc.take_snapshot()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "traceback")
+        stacks = Counter()
+        for stat in diff:
+            if stat.size_diff > 0:
+                # tracemalloc tracebacks are most recent call last, which is already root-first
+                stack = ";".join(
+                    f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in stat.traceback
+                )
+                stacks[stack] += stat.size_diff
+        top = [
+            {"location": str(stat.traceback[-1]), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in diff[:limit]
+        ]
+        current, peak = tracemalloc.get_traced_memory()
+        return {"mode": "memory", "seconds": seconds, "traced_bytes": current, "peak_bytes": peak,
+                "top": top, "stacks": stacks}
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+
+def folded_text(profile):
+    """One "stack count" line per stack, heaviest first"""
+    return "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].most_common()) + "\n"
+
+
+def summary(profile, limit=50):
+    """JSON-friendly form: the heaviest stacks plus, for wall-clock profiles, samples per leaf function"""
+    result = {key: value for key, value in profile.items() if key != "stacks"}
+    result["stacks"] = [{"stack": stack, "weight": count} for stack, count in profile["stacks"].most_common(limit)]
+    if profile["mode"] == "wall":
+        leaf = Counter()
+        for stack, count in profile["stacks"].items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        result["self_samples"] = [{"frame": frame, "samples": count} for frame, count in leaf.most_common(limit)]
+    return result
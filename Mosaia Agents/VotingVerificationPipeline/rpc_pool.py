@@ -0,0 +1,273 @@
+import os
+import re
+import time
+import asyncio
+from urllib.parse import urlsplit
+import aiohttp
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3.exceptions import TransactionNotFound
+
+# Comma-separated RPC endpoints; falls back to the single SEPOLIA_RPC_URL
+RPC_URLS = [url.strip() for url in os.getenv("SEPOLIA_RPC_URLS", os.getenv("SEPOLIA_RPC_URL", "")).split(",") if url.strip()]
+RPC_REQUEST_TIMEOUT = float(os.getenv("RPC_REQUEST_TIMEOUT", "10"))
+RPC_COOLDOWN_SECONDS = float(os.getenv("RPC_COOLDOWN_SECONDS", "30"))
+RPC_PROBE_INTERVAL = float(os.getenv("RPC_PROBE_INTERVAL", "30"))
+RPC_POOL_CONNECTIONS = int(os.getenv("RPC_POOL_CONNECTIONS", "20"))
+# Seconds between receipt polls while waiting for a transaction to be mined
+RECEIPT_POLL_INTERVAL = float(os.getenv("RECEIPT_POLL_INTERVAL", "2"))
+# Weight of the newest sample in the moving latency average
+LATENCY_SMOOTHING = 0.3
+
+
+# Anything URL-shaped in an error message; provider URLs usually carry the API key in the path
+_URL_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://[^\s'\"<>,;)]+")
+
+
+def redact_url(url):
+    """scheme://host[:port] without credentials, path or query, safe to log and serve"""
+    parts = urlsplit(url)
+    host = parts.hostname or "unknown"
+    return f"{parts.scheme}://{host}:{parts.port}" if parts.port else f"{parts.scheme}://{host}"
+
+
+def scrub(text):
+    """Text with every URL reduced to its redacted form"""
+    return _URL_RE.sub(lambda match: redact_url(match.group(0)), str(text))
+
+
+class RpcUnavailable(Exception):
+    """Every endpoint failed or is cooling down"""
+
+
+class TransactionPending(Exception):
+    """A transaction may have been broadcast but is not confirmed; it can still be mined, so never resend its payment"""
+
+    def __init__(self, tx_hash, message):
+        super().__init__(message)
+        self.tx_hash = tx_hash
+
+
+class RpcEndpoint:
+    """One RPC URL with its health score and latency statistics"""
+
+    def __init__(self, url, index=0):
+        self.url = url
+        # Used wherever the endpoint is named, since the URL itself may hold an API key
+        self.label = f"rpc{index} {redact_url(url)}"
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(url))
+        self.contracts = {}
+        self.latency = None
+        self.max_latency = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def score(self):
+        """Lower is better: smoothed latency, penalised for recent failures"""
+        latency = self.latency if self.latency is not None else RPC_REQUEST_TIMEOUT / 2
+        return latency * (1 + 2 * self.consecutive_failures)
+
+    def record_success(self, latency):
+        self.calls += 1
+        self.consecutive_failures = 0
+        self.max_latency = max(self.max_latency, latency)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+
+    def record_failure(self, error, now):
+        self.calls += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_error = scrub(error)[:200]
+        # Back off longer each time the endpoint keeps failing
+        self.cooldown_until = now + RPC_COOLDOWN_SECONDS * min(2 ** (self.consecutive_failures - 1), 8)
+
+    def stats(self):
+        return {
+            "endpoint": self.label,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "calls": self.calls,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "cooling_down": not self.available(time.monotonic()),
+            "last_error": self.last_error,
+            "score": round(self.score(), 4),
+        }
+
+
+class RpcPool:
+    """
+    AsyncWeb3 endpoints sharing one pooled aiohttp session. Calls go to the
+    healthiest, fastest endpoint first and fail over to the others in order.
+    """
+
+    def __init__(self, urls=None):
+        urls = urls or RPC_URLS
+        if not urls:
+            raise ValueError("At least one RPC URL is required")
+        self.endpoints = [RpcEndpoint(url, index) for index, url in enumerate(urls)]
+        self.session = None
+        self._probe_task = None
+
+    async def start(self):
+        """Attach the shared session to every provider and start background health probes"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=RPC_POOL_CONNECTIONS, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=RPC_REQUEST_TIMEOUT * 3)
+            )
+            for endpoint in self.endpoints:
+                await endpoint.w3.provider.cache_async_session(self.session)
+        if len(self.endpoints) > 1 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_forever())
+        print(f"[RPC] Pool started with {len(self.endpoints)} endpoint(s)")
+
+    async def close(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def _ranked(self):
+        now = time.monotonic()
+        available = [endpoint for endpoint in self.endpoints if endpoint.available(now)]
+        # If everything is cooling down, try the least bad endpoints rather than failing outright
+        candidates = available or list(self.endpoints)
+        return sorted(candidates, key=lambda endpoint: endpoint.score())
+
+    def contract(self, endpoint_w3, address, abi):
+        """Contract object bound to one endpoint, cached per address"""
+        for endpoint in self.endpoints:
+            if endpoint.w3 is endpoint_w3:
+                key = (address, id(abi))
+                if key not in endpoint.contracts:
+                    endpoint.contracts[key] = endpoint_w3.eth.contract(address=address, abi=abi)
+                return endpoint.contracts[key]
+        return endpoint_w3.eth.contract(address=address, abi=abi)
+
+    async def call(self, fn, timeout=RPC_REQUEST_TIMEOUT):
+        """Run fn(w3) against the best endpoint, failing over until one succeeds"""
+        if self.session is None:
+            await self.start()
+        errors = []
+        for endpoint in self._ranked():
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(fn(endpoint.w3), timeout=timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                endpoint.record_failure(e, time.monotonic())
+                errors.append(f"{endpoint.label}: {scrub(e)}")
+                print(f"[RPC] {endpoint.label} failed ({scrub(e)}), failing over")
+                continue
+            endpoint.record_success(time.monotonic() - started)
+            return result
+        raise RpcUnavailable("All RPC endpoints failed: " + "; ".join(errors))
+
+    async def send_raw_transaction(self, raw_transaction, sender=None, nonce=None):
+        """
+        Broadcast a signed transaction and return its hash. A failed or timed
+        out send may still have reached the network, so before trying the next
+        endpoint the pool looks the hash up: if it is known the send succeeded,
+        and if the sender's nonce was used by another transaction it fails for
+        good. Only when neither is true are the same bytes sent elsewhere, which
+        cannot create a second transaction.
+        """
+        if self.session is None:
+            await self.start()
+        tx_hash = AsyncWeb3.keccak(raw_transaction)
+        errors = []
+        for endpoint in self._ranked():
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(endpoint.w3.eth.send_raw_transaction(raw_transaction), timeout=RPC_REQUEST_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # An endpoint that already has this exact transaction accepted it earlier
+                if "already known" in str(e).lower():
+                    return tx_hash
+                endpoint.record_failure(e, time.monotonic())
+                errors.append(f"{endpoint.label}: {scrub(e)}")
+                print(f"[RPC] Sending {tx_hash.hex()} via {endpoint.label} failed ({scrub(e)}), checking before failing over")
+                state = await self._broadcast_state(tx_hash, sender, nonce)
+                if state == "known":
+                    return tx_hash
+                if state == "replaced":
+                    raise Exception(f"Nonce {nonce} was used by another transaction; {tx_hash.hex()} was not sent")
+                continue
+            endpoint.record_success(time.monotonic() - started)
+            return tx_hash
+        raise RpcUnavailable("All RPC endpoints failed: " + "; ".join(errors))
+
+    async def _broadcast_state(self, tx_hash, sender, nonce):
+        """"known" if the network has tx_hash, "replaced" if its nonce went to another transaction, else None"""
+        async def check(w3):
+            try:
+                await w3.eth.get_transaction(tx_hash)
+                return "known"
+            except TransactionNotFound:
+                pass
+            if sender is not None and nonce is not None:
+                if await w3.eth.get_transaction_count(sender, "latest") > nonce:
+                    return "replaced"
+            return None
+        try:
+            return await self.call(check)
+        except RpcUnavailable as e:
+            # Cannot tell whether the first send went through; resending could be wrong either way
+            raise TransactionPending(tx_hash, f"Could not confirm whether {tx_hash.hex()} was broadcast: {e}")
+
+    async def get_transaction_receipt(self, tx_hash):
+        """Receipt of a mined transaction, or None while it is not mined yet"""
+        async def fetch(w3):
+            try:
+                return await w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                return None
+        return await self.call(fetch)
+
+    async def wait_for_receipt(self, tx_hash, timeout, poll=RECEIPT_POLL_INTERVAL):
+        """
+        Poll for the receipt with short calls, so a slow block only costs time
+        and never marks a healthy endpoint as failing. Raises TransactionPending
+        once timeout passes without one.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                receipt = await self.get_transaction_receipt(tx_hash)
+            except RpcUnavailable as e:
+                print(f"[RPC] Receipt poll for {tx_hash.hex()} failed: {e}")
+                receipt = None
+            if receipt is not None:
+                return receipt
+            if time.monotonic() >= deadline:
+                raise TransactionPending(tx_hash, f"{tx_hash.hex()} was not mined within {timeout:.0f}s")
+            await asyncio.sleep(poll)
+
+    async def _probe_forever(self):
+        while True:
+            await asyncio.sleep(RPC_PROBE_INTERVAL)
+            for endpoint in self.endpoints:
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(endpoint.w3.eth.block_number, timeout=RPC_REQUEST_TIMEOUT)
+                    endpoint.record_success(time.monotonic() - started)
+                    endpoint.cooldown_until = 0.0
+                except Exception as e:
+                    endpoint.record_failure(e, time.monotonic())
+
+    def stats(self):
+        return {"endpoints": [endpoint.stats() for endpoint in self.endpoints]}
@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Pipeline modules are imported the way the container runs them, from the pipeline directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main reads its configuration at import time; point it at nothing real
+os.environ.setdefault("SEPOLIA_RPC_URL", "http://127.0.0.1:8545")
+os.environ.setdefault("verifyagent", "test")
+# Anvil's first well-known development key; never holds real funds
+os.environ.setdefault("private_key", "ac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+os.environ.setdefault("NGROK_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_CLIENT_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_CLIENT_BURST", "1000000")
+os.environ.setdefault("RATE_LIMIT_DISASTER_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_DISASTER_BURST", "1000")
+os.environ.setdefault("PAYOUT_AUDIT_PATH", os.devnull)
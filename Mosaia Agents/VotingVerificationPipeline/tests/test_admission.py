@@ -0,0 +1,83 @@
+import pytest
+from fastapi import HTTPException, Request
+import admission
+from admission import RateLimiter, TokenBucket, client_key
+
+
+def make_request(forwarded=None, host="10.0.0.1"):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+def test_client_key_uses_the_hop_the_proxy_appended():
+    # ngrok appends the real peer after whatever the client sent
+    assert client_key(make_request("1.1.1.1, 203.0.113.7"), trusted_hops=1) == "203.0.113.7"
+    assert client_key(make_request("203.0.113.7"), trusted_hops=1) == "203.0.113.7"
+
+
+def test_forwarded_for_is_ignored_unless_a_proxy_is_configured():
+    assert admission.TRUSTED_PROXY_HOPS == 0
+    assert client_key(make_request("203.0.113.7")) == "10.0.0.1"
+
+
+def test_spoofed_forwarded_for_does_not_change_the_key():
+    keys = {client_key(make_request(f"198.51.100.{i}, 203.0.113.7"), trusted_hops=1) for i in range(20)}
+    assert keys == {"203.0.113.7"}
+
+
+def test_client_key_with_several_proxies_and_without_header():
+    assert client_key(make_request("6.6.6.6, 203.0.113.7, 10.1.1.1"), trusted_hops=2) == "203.0.113.7"
+    assert client_key(make_request("203.0.113.7"), trusted_hops=2) == "10.0.0.1"
+    assert client_key(make_request("6.6.6.6"), trusted_hops=0) == "10.0.0.1"
+    assert client_key(make_request()) == "10.0.0.1"
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2, clock=lambda: now[0])
+    assert bucket.try_take() == 0.0
+    assert bucket.try_take() == 0.0
+    assert bucket.try_take() == pytest.approx(1.0)
+    now[0] = 1.0
+    assert bucket.try_take() == 0.0
+
+
+def test_spoofing_cannot_get_past_the_client_limit(monkeypatch):
+    monkeypatch.setattr(admission, "client_limiter", RateLimiter("client", per_minute=1, burst=3))
+    for i in range(3):
+        admission.admit("fact-check", make_request(f"198.51.100.{i}, 203.0.113.7"))
+    with pytest.raises(HTTPException) as raised:
+        admission.admit("fact-check", make_request("198.51.100.99, 203.0.113.7"))
+    assert raised.value.status_code == 429
+
+
+def test_batch_is_charged_once_per_disaster(monkeypatch):
+    monkeypatch.setattr(admission, "disaster_limiter", RateLimiter("disaster", per_minute=1, burst=2))
+    # However many votes it carries for aa, the batch counts as one request against aa
+    admission.admit("process-votes-batch", make_request(host="10.0.0.2"), disaster_hashes={"0xAA", "aa", "bb"})
+    admission.admit("process-votes-batch", make_request(host="10.0.0.2"), disaster_hashes={"aa"})
+    with pytest.raises(HTTPException) as raised:
+        admission.admit("process-votes-batch", make_request(host="10.0.0.3"), disaster_hashes={"aa"})
+    assert raised.value.status_code == 429
+
+
+def test_batch_rejection_takes_nothing_from_other_disasters(monkeypatch):
+    limiter = RateLimiter("disaster", per_minute=1, burst=1)
+    monkeypatch.setattr(admission, "disaster_limiter", limiter)
+    admission.admit("process-vote", make_request(host="10.0.0.4"), "aa")
+    with pytest.raises(HTTPException):
+        admission.admit("process-votes-batch", make_request(host="10.0.0.5"), disaster_hashes={"aa", "bb"})
+    # bb was not charged because the batch as a whole was refused
+    assert limiter.check("bb") == 0.0
+
+
+def test_disaster_rejection_gives_the_client_its_token_back(monkeypatch):
+    clients = RateLimiter("client", per_minute=1, burst=2)
+    monkeypatch.setattr(admission, "client_limiter", clients)
+    monkeypatch.setattr(admission, "disaster_limiter", RateLimiter("disaster", per_minute=1, burst=1))
+    admission.admit("process-vote", make_request(host="10.0.0.7"), "aa")
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            admission.admit("process-vote", make_request(host="10.0.0.7"), "aa")
+    # Only the admitted request was charged to the client
+    admission.admit("fact-check", make_request(host="10.0.0.7"))
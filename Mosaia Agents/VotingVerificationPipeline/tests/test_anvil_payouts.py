@@ -0,0 +1,18 @@
+import os
+import sys
+import shutil
+import subprocess
+import pytest
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(not shutil.which("anvil") or not os.getenv("ANVIL_FORK_URL"),
+                    reason="needs the anvil binary and ANVIL_FORK_URL pointing at a Sepolia RPC")
+def test_approved_claims_are_paid_once_on_a_forked_chain():
+    # Runs in its own process because main reads the chain settings at import time
+    result = subprocess.run(
+        [sys.executable, "anvil_payouts.py"], cwd=PIPELINE_DIR,
+        capture_output=True, text=True, timeout=600
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException, Request
+import main
+from bulkhead import BulkheadRegistry
+from test_votes import FakeClaimsTable, FakeDynamoDB, FakeUnlockApi, vote
+
+FACT_CHECKS = 200
+DIAGNOSTICS = 20
+APPROVALS = 10
+
+
+def test_approvals_are_admitted_and_finish_while_fact_checks_and_diagnostics_are_stuck(monkeypatch):
+    items = {f"c{i}": {"id": f"c{i}", "claim_state": "voting", "claimed_amount": Decimal(10),
+                       "organization_aztec_address": "0x" + "11" * 20} for i in range(APPROVALS)}
+    table = FakeClaimsTable(items)
+    # Fact-checks and diagnostics hold their workers until the approvals are done
+    release = threading.Event()
+    monkeypatch.setattr(main, "voting_table", table)
+    monkeypatch.setattr(main, "dynamodb", FakeDynamoDB(table))
+    monkeypatch.setattr(main, "http_transport", FakeUnlockApi())
+    monkeypatch.setattr(main, "check_voting_available", lambda: None)
+    monkeypatch.setattr(main, "run_fact_check", lambda data: release.wait(10))
+    monkeypatch.setattr(main, "run_parser_tests", lambda: release.wait(10))
+    request = Request({"type": "http", "headers": [], "client": ("test", 0)})
+    shed_before = {name: snapshot["shed"] for name, snapshot in main.bulkheads.snapshot().items()}
+
+    async def call(endpoint):
+        try:
+            await endpoint
+            return 200
+        except HTTPException as e:
+            return e.status_code
+
+    async def scenario():
+        statement = main.FactCheckInput(statement="Flood needs 1500 USDC", disaster_hash="0x" + "ab" * 32)
+        flood = [asyncio.ensure_future(call(main.fact_check(statement, request))) for _ in range(FACT_CHECKS)]
+        flood += [asyncio.ensure_future(call(main.test_parser())) for _ in range(DIAGNOSTICS)]
+        await asyncio.sleep(0)
+        try:
+            # Every slow worker is blocked, so these can only finish on the payout bulkhead's own workers
+            approvals = await asyncio.wait_for(
+                asyncio.gather(*(main.process_vote(vote(f"c{i}"), request) for i in range(APPROVALS))), timeout=10
+            )
+            stuck = main.bulkheads.snapshot()
+        finally:
+            release.set()
+        return approvals, stuck, await asyncio.gather(*flood)
+
+    approvals, stuck, statuses = asyncio.run(scenario())
+    shed = {name: snapshot["shed"] - shed_before[name] for name, snapshot in main.bulkheads.snapshot().items()}
+
+    assert len(approvals) == APPROVALS
+    assert all(item["claim_state"] == "approved" for item in items.values())
+    # The slow classes were full when the approvals completed, and shed what did not fit
+    assert stuck["fact-check"]["running"] == stuck["fact-check"]["workers"]
+    assert stuck["diagnostics"]["running"] == stuck["diagnostics"]["workers"]
+    assert shed["fact-check"] > 0 and shed["diagnostics"] > 0
+    assert shed["payouts"] == 0
+    assert set(statuses) == {200, 503}
+
+
+def test_queued_work_runs_in_arrival_order_and_overflow_is_shed():
+    registry = BulkheadRegistry()
+    bulkhead = registry.add("test-order", workers=1, queue_size=2)
+    release = threading.Event()
+    order = []
+
+    async def scenario():
+        first = asyncio.ensure_future(bulkhead.run(release.wait, 10))
+        queued = [asyncio.ensure_future(bulkhead.run(order.append, i)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as overflow:
+            await bulkhead.run(order.append, 3)
+        release.set()
+        await asyncio.gather(first, *queued)
+        return overflow.value
+
+    overflow = asyncio.run(scenario())
+    registry.shutdown()
+    assert overflow.status_code == 503
+    assert order == [1, 2]
+    assert bulkhead.snapshot()["shed"] == 1
+
+
+def test_lower_priority_work_is_not_queued_while_higher_priority_work_waits():
+    registry = BulkheadRegistry()
+    high = registry.add("test-high", workers=1, queue_size=4, priority=2)
+    low = registry.add("test-low", workers=1, queue_size=4, priority=0)
+    release = threading.Event()
+
+    async def scenario():
+        busy = [asyncio.ensure_future(bulkhead.run(release.wait, 10)) for bulkhead in (high, low)]
+        waiting = asyncio.ensure_future(high.run(release.wait, 10))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(HTTPException):
+                await low.run(release.wait, 10)
+        finally:
+            release.set()
+        await asyncio.gather(*busy, waiting)
+
+    asyncio.run(scenario())
+    registry.shutdown()
+    assert (high.snapshot()["shed"], low.snapshot()["shed"]) == (0, 1)
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from admission import UpstreamGate, overloaded
+from consensus import FACT_CHECK_CONSENSUS_MODELS, parse_member, run_consensus
+
+
+class FakeMembers:
+    """Members answering after a delay, each holding a gate slot while it runs"""
+
+    def __init__(self, replies, gate=None):
+        self.replies = replies
+        self.gate = gate or UpstreamGate("test", concurrency=10, queue_size=10, queue_timeout=1)
+        self.cancelled = []
+        self.settings = []
+
+    async def ask(self, model, **settings):
+        self.settings.append(settings)
+        delay, reply = self.replies[model]
+        async with self.gate:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(model)
+                raise
+        if isinstance(reply, Exception):
+            raise reply
+        return reply, {"model": model}
+
+
+def test_stragglers_are_cancelled_once_quorum_is_reached():
+    members = FakeMembers({"a": (0.01, 100.0), "b": (0.02, 105.0), "slow": (30, 100.0)})
+    result = asyncio.run(run_consensus(members.ask, models=["a", "b", "slow"], timeout=60))
+
+    assert result["stats"]["reached"]
+    assert result["stats"]["cancelled"] == 1
+    assert members.cancelled == ["slow"]
+    # The straggler gave its upstream slot back instead of holding it until it answered
+    assert members.gate.snapshot()["in_flight"] == 0
+
+
+def test_overloaded_upstream_is_raised_not_counted_as_a_failed_member():
+    members = FakeMembers({
+        "a": (0.01, overloaded("mosaia is at capacity", retry_after=5)),
+        "b": (30, 100.0),
+        "c": (30, 100.0),
+    })
+    with pytest.raises(Exception) as raised:
+        asyncio.run(run_consensus(members.ask, models=["a", "b", "c"], timeout=60))
+
+    assert raised.value.status_code == 503
+    assert sorted(members.cancelled) == ["b", "c"]
+
+
+def test_failed_members_are_counted_and_the_rest_still_decide():
+    members = FakeMembers({"a": (0.01, RuntimeError("bad gateway")), "b": (0.01, 100.0), "c": (0.02, 110.0)})
+    result = asyncio.run(run_consensus(members.ask, models=["a", "b", "c"], timeout=60))
+
+    assert result["stats"]["failed"] == 1
+    assert result["amount"] == 105.0
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        gate = UpstreamGate("test", concurrency=1, queue_size=5, queue_timeout=5)
+        await gate.acquire_async()
+        waiter = asyncio.ensure_future(gate.acquire_async())
+        await asyncio.sleep(0.1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        gate.release()
+        return gate.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["in_flight"] == 0
+    assert snapshot["waiting"] == 0
+
+
+def test_waiting_for_a_slot_does_not_block_the_event_loop():
+    async def scenario():
+        gate = UpstreamGate("test", concurrency=1, queue_size=5, queue_timeout=5)
+        await gate.acquire_async()
+        waiter = asyncio.ensure_future(gate.acquire_async())
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        gate.release()
+        await waiter
+        gate.release()
+        return ticks, gate.snapshot()
+
+    ticks, snapshot = asyncio.run(scenario())
+    assert ticks == 5
+    assert snapshot["in_flight"] == 0 and snapshot["waiting"] == 0
+
+
+def test_members_are_asked_with_their_own_settings():
+    members = FakeMembers({"agent": (0, 100.0)})
+    asyncio.run(run_consensus(members.ask, models=["agent@0.2", "agent@1.0", "agent"], timeout=60))
+
+    assert sorted(members.settings, key=str) == sorted([{"temperature": 0.2}, {"temperature": 1.0}, {}], key=str)
+    assert parse_member("agent@0.7") == ("agent", {"temperature": 0.7})
+
+
+def test_default_members_are_not_identical_calls():
+    assert len(set(FACT_CHECK_CONSENSUS_MODELS)) == len(FACT_CHECK_CONSENSUS_MODELS)
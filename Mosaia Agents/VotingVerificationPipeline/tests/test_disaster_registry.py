@@ -0,0 +1,26 @@
+from disaster_registry import DisasterRecord, DisasterRegistry
+
+
+def record(index):
+    return DisasterRecord(key=index.to_bytes(32, "big"), title=f"disaster {index}", fetched_at=0)
+
+
+def test_registry_stays_within_its_size():
+    registry = DisasterRegistry(max_size=3)
+    for index in range(10):
+        registry.put(record(index))
+
+    assert len(registry) == 3
+    assert registry.stats()["evictions"] == 7
+    assert [index for index in range(10) if index.to_bytes(32, "big") in registry] == [7, 8, 9]
+
+
+def test_recently_read_disasters_are_kept():
+    registry = DisasterRegistry(max_size=2)
+    registry.put(record(1))
+    registry.put(record(2))
+    assert registry.get((1).to_bytes(32, "big")) is not None
+    registry.put(record(3))
+
+    assert (1).to_bytes(32, "big") in registry
+    assert (2).to_bytes(32, "big") not in registry
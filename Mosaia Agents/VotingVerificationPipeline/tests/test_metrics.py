@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+import main
+import profiling
+
+
+def test_metrics_are_hidden_from_remote_callers(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "operator-token")
+    client = TestClient(main.app)
+
+    assert client.get("/metrics/rpc").status_code == 404
+    assert client.get("/metrics/rpc", headers={"X-Profiling-Token": "wrong"}).status_code == 404
+    assert client.get("/metrics/rpc", headers={"X-Profiling-Token": "operator-token"}).status_code == 200
+
+
+def test_metrics_are_served_to_local_callers_but_not_to_forwarded_ones(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    local = TestClient(main.app, client=("127.0.0.1", 50000))
+
+    assert local.get("/metrics/bulkheads").status_code == 200
+    # ngrok connects from localhost too, on behalf of a public client
+    assert local.get("/metrics/bulkheads", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 404
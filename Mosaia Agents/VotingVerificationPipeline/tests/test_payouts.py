@@ -0,0 +1,215 @@
+import asyncio
+import pytest
+from payouts import PayoutAuditLog, PayoutBatcher, PayoutError, PayoutPending, to_units
+from rpc_pool import TransactionPending
+
+
+class FakeChain:
+    """Balance and transfer coroutines that record what would have been sent"""
+
+    def __init__(self, balance=10**12, transfer_delay=0.0):
+        self.balance = balance
+        self.transfer_delay = transfer_delay
+        self.transfers = []
+        self.transfer_started = asyncio.Event()
+
+    async def balance_fn(self):
+        return self.balance
+
+    async def transfer_fn(self, recipient, amount):
+        self.transfer_started.set()
+        await asyncio.sleep(self.transfer_delay)
+        self.transfers.append((recipient, amount))
+        self.balance -= amount
+        return f"0x{len(self.transfers):064x}", len(self.transfers)
+
+
+def make_batcher(tmp_path, chain, window=0.01):
+    return PayoutBatcher(chain.balance_fn, chain.transfer_fn, window=window,
+                         audit_log=PayoutAuditLog(str(tmp_path / "audit.jsonl")))
+
+
+def test_payouts_to_one_recipient_share_a_transfer(tmp_path):
+    async def scenario():
+        chain = FakeChain()
+        batcher = make_batcher(tmp_path, chain)
+        records = await asyncio.gather(
+            batcher.submit("a", "0xR", 100), batcher.submit("b", "0xR", 50), batcher.submit("c", "0xT", 1)
+        )
+        return chain, records
+
+    chain, records = asyncio.run(scenario())
+    assert sorted(chain.transfers) == [("0xR", 150), ("0xT", 1)]
+    assert records[0]["tx_hash"] == records[1]["tx_hash"] != records[2]["tx_hash"]
+
+
+def test_claim_submitted_during_a_transfer_is_still_sent(tmp_path):
+    async def scenario():
+        chain = FakeChain(transfer_delay=0.2)
+        batcher = make_batcher(tmp_path, chain)
+        first = asyncio.create_task(batcher.submit("a", "0xR", 100))
+        await chain.transfer_started.wait()
+        # The first flush is still waiting on its transfer here
+        second = await asyncio.wait_for(batcher.submit("b", "0xT", 5), timeout=5)
+        await first
+        return chain, second
+
+    chain, second = asyncio.run(scenario())
+    assert chain.transfers == [("0xR", 100), ("0xT", 5)]
+    assert second["claim_uuid"] == "b"
+
+
+def test_retry_while_transfer_is_in_flight_is_not_paid_twice(tmp_path):
+    async def scenario():
+        chain = FakeChain(transfer_delay=0.2)
+        batcher = make_batcher(tmp_path, chain)
+        first = asyncio.create_task(batcher.submit("a", "0xR", 100))
+        await chain.transfer_started.wait()
+        with pytest.raises(PayoutError):
+            await batcher.submit("a", "0xR", 100)
+        record = await first
+        # Once settled, a retry returns the recorded payment instead of paying again
+        again = await batcher.submit("a", "0xR", 100)
+        return chain, record, again
+
+    chain, record, again = asyncio.run(scenario())
+    assert chain.transfers == [("0xR", 100)]
+    assert again["tx_hash"] == record["tx_hash"]
+
+
+def test_unconfirmed_transfer_is_recorded_pending_and_never_resent(tmp_path):
+    async def unconfirmed(recipient, amount):
+        chain.transfers.append((recipient, amount))
+        raise TransactionPending(bytes.fromhex("ab" * 32), "not mined within 180s")
+
+    async def scenario():
+        batcher = make_batcher(tmp_path, chain)
+        batcher.transfer_fn = unconfirmed
+        with pytest.raises(PayoutPending) as first:
+            await batcher.submit("a", "0xR", 100)
+        with pytest.raises(PayoutPending) as retry:
+            await batcher.submit("a", "0xR", 100)
+        return first.value, retry.value, batcher.audit_log.lookup("a")
+
+    chain = FakeChain()
+    first, retry, record = asyncio.run(scenario())
+    assert chain.transfers == [("0xR", 100)]
+    assert first.tx_hash == retry.tx_hash == record["tx_hash"] == "ab" * 32
+    assert record["status"] == "pending"
+
+
+def send_unconfirmed(tmp_path, chain, receipt=None):
+    """A batcher whose transfers are broadcast but never confirmed, and whose receipts are the given one"""
+    async def unconfirmed(recipient, amount):
+        chain.transfers.append((recipient, amount))
+        raise TransactionPending(bytes.fromhex("ab" * 32), "not mined within 180s")
+
+    async def receipt_fn(tx_hash):
+        return receipt
+
+    batcher = make_batcher(tmp_path, chain)
+    batcher.transfer_fn = unconfirmed
+    batcher.receipt_fn = receipt_fn
+    return batcher
+
+
+def test_pending_payout_is_confirmed_once_mined(tmp_path):
+    async def scenario():
+        batcher = send_unconfirmed(tmp_path, chain)
+        with pytest.raises(PayoutPending):
+            await batcher.submit("a", "0xR", 100)
+        assert await batcher.reconcile_pending() == []
+        # Mined after the wait gave up
+        batcher.receipt_fn = lambda tx_hash: asyncio.sleep(0, {"status": 1, "blockNumber": 42})
+        reconciled = await batcher.reconcile_pending()
+        again = await batcher.submit("a", "0xR", 100)
+        return batcher, reconciled, again
+
+    chain = FakeChain()
+    batcher, reconciled, again = asyncio.run(scenario())
+    assert chain.transfers == [("0xR", 100)]
+    assert [(r["claim_uuid"], r["status"], r["block_number"]) for r in reconciled] == [("a", "confirmed", 42)]
+    assert again["status"] == "confirmed"
+    assert batcher.audit_log.pending() == []
+
+
+def test_retry_after_a_pending_payout_is_mined_is_not_paid_twice(tmp_path):
+    async def scenario():
+        batcher = send_unconfirmed(tmp_path, chain)
+        with pytest.raises(PayoutPending):
+            await batcher.submit("a", "0xR", 100)
+        batcher.receipt_fn = lambda tx_hash: asyncio.sleep(0, {"status": 1, "blockNumber": 7})
+        return await batcher.submit("a", "0xR", 100)
+
+    chain = FakeChain()
+    record = asyncio.run(scenario())
+    assert chain.transfers == [("0xR", 100)]
+    assert record["status"] == "confirmed"
+
+
+def test_reverted_payout_can_be_paid_again(tmp_path):
+    async def scenario():
+        batcher = send_unconfirmed(tmp_path, chain)
+        with pytest.raises(PayoutPending):
+            await batcher.submit("a", "0xR", 100)
+        batcher.receipt_fn = lambda tx_hash: asyncio.sleep(0, {"status": 0, "blockNumber": 9})
+        reconciled = await batcher.reconcile_pending()
+        batcher.transfer_fn = chain.transfer_fn
+        return reconciled, await batcher.submit("a", "0xR", 100)
+
+    chain = FakeChain()
+    reconciled, paid = asyncio.run(scenario())
+    assert [r["status"] for r in reconciled] == ["failed"]
+    assert chain.transfers == [("0xR", 100), ("0xR", 100)]
+    assert paid["status"] == "confirmed"
+
+
+def test_lone_claim_is_sent_after_the_idle_gap_not_the_window(tmp_path):
+    async def scenario():
+        chain = FakeChain()
+        batcher = PayoutBatcher(chain.balance_fn, chain.transfer_fn, window=60, idle=0.01,
+                                audit_log=PayoutAuditLog(str(tmp_path / "audit.jsonl")))
+        return await asyncio.wait_for(batcher.submit("a", "0xR", 100), timeout=5)
+
+    assert asyncio.run(scenario())["claim_uuid"] == "a"
+
+
+def test_paid_claims_survive_a_restart(tmp_path):
+    async def pay(chain):
+        return await make_batcher(tmp_path, chain).submit("a", "0xR", 100)
+
+    chain = FakeChain()
+    first = asyncio.run(pay(chain))
+    second = asyncio.run(pay(chain))
+    assert chain.transfers == [("0xR", 100)]
+    assert second["tx_hash"] == first["tx_hash"]
+
+
+def test_unaffordable_recipients_fail_without_blocking_others(tmp_path):
+    async def scenario():
+        chain = FakeChain(balance=120)
+        batcher = make_batcher(tmp_path, chain)
+        return await asyncio.gather(
+            batcher.submit("a", "0xR", 100), batcher.submit("b", "0xT", 50), return_exceptions=True
+        )
+
+    paid, failed = asyncio.run(scenario())
+    assert paid["recipient"] == "0xR"
+    assert isinstance(failed, PayoutError)
+
+
+@pytest.mark.parametrize("amount", ["Infinity", "-Infinity", "NaN", "0", "-5", "0.0000001", "abc", None])
+def test_invalid_amounts_are_rejected(amount):
+    with pytest.raises(PayoutError):
+        to_units(amount)
+
+
+def test_amounts_convert_to_base_units():
+    assert to_units("12.5") == 12_500_000
+    assert to_units(3) == 3_000_000
+
+
+def test_non_integer_units_are_rejected(tmp_path):
+    batcher = make_batcher(tmp_path, FakeChain())
+    with pytest.raises(PayoutError):
+        asyncio.run(batcher.submit("a", "0xR", 1.5))
@@ -0,0 +1,62 @@
+import re
+import threading
+import pytest
+from fastapi.testclient import TestClient
+import main
+import profiling
+
+TOKEN = {"X-Profiling-Token": "operator-token"}
+
+
+def test_profiling_is_hidden_without_a_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    response = TestClient(main.app).get("/admin/profile", headers=TOKEN)
+    assert response.status_code == 404
+
+
+def test_wrong_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "operator-token")
+    client = TestClient(main.app)
+
+    assert client.get("/admin/profile").status_code == 403
+    assert client.get("/admin/profile", headers={"X-Profiling-Token": "operator-tokeN"}).status_code == 403
+
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "operator-token")
+    response = TestClient(main.app).get("/admin/profile", params={"mode": "cpu"}, headers=TOKEN)
+    assert response.status_code == 400
+
+
+def test_seconds_are_clamped(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "operator-token")
+    monkeypatch.setattr(profiling, "PROFILING_MAX_SECONDS", 0.2)
+    client = TestClient(main.app)
+
+    longest = client.get("/admin/profile", params={"seconds": 3600, "format": "json"}, headers=TOKEN).json()
+    shortest = client.get("/admin/profile", params={"seconds": -5, "format": "json"}, headers=TOKEN).json()
+    assert (longest["mode"], longest["seconds"]) == ("wall", 0.2)
+    assert shortest["seconds"] == 0.1
+
+
+def test_folded_output_includes_idle_threads(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "operator-token")
+    release = threading.Event()
+    waiter = threading.Thread(target=release.wait, name="idle-waiter", daemon=True)
+    waiter.start()
+    try:
+        response = TestClient(main.app).get("/admin/profile", params={"seconds": 0.1}, headers=TOKEN)
+    finally:
+        release.set()
+
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    # flamegraph.pl input: "thread;root;...;leaf count"
+    assert all(re.fullmatch(r"[^ ].*;.* \d+", line) for line in lines)
+    # Wall-clock sampling: a thread blocked on an Event is still sampled
+    assert any(line.startswith("idle-waiter;") for line in lines)
+
+
+def test_second_capture_is_busy():
+    with profiling._capture_lock, pytest.raises(profiling.ProfilerBusy):
+        profiling.sample_wall(0.01)
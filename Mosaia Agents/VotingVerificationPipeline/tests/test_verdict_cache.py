@@ -0,0 +1,88 @@
+import sqlite3
+from verdict_cache import VerdictCache, funding_fingerprint, verdict_key
+
+VERDICT = {"verdict": "approve", "reason": "matches the report"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_resubmitted_statement_is_a_hit():
+    cache = VerdictCache(disk_path=None)
+    fingerprint = funding_fingerprint("100", "1000")
+    cache.put("Send  boats to the Delta", "0xABC", fingerprint, VERDICT)
+
+    # Case, whitespace and the 0x prefix do not change the key
+    assert cache.get("send boats to the delta", "abc", fingerprint) == VERDICT
+    assert cache.stats()["hits"] == 1
+
+
+def test_funding_change_invalidates_the_disaster():
+    cache = VerdictCache(disk_path=None)
+    before, after = funding_fingerprint("100", "1000"), funding_fingerprint("250", "1000")
+    cache.observe_funding("0xabc", before)
+    cache.put("boats", "0xabc", before, VERDICT)
+    cache.put("boats", "0xdef", before, VERDICT)
+
+    cache.observe_funding("0xabc", after)
+
+    assert cache.get("boats", "0xabc", before) is None
+    assert cache.get("boats", "0xdef", before) == VERDICT
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_fingerprints_are_bounded_with_the_entries():
+    cache = VerdictCache(max_entries=3, disk_path=None)
+    for index in range(10):
+        cache.observe_funding(f"0x{index}", "1/2")
+    assert cache.stats()["tracked_disasters"] == 3
+
+
+def test_expired_verdict_is_a_miss():
+    clock = FakeClock()
+    cache = VerdictCache(disk_path=None, clock=clock)
+    cache.put("boats", "0xabc", "1/2", VERDICT)
+    clock.now += 10**6
+    assert cache.get("boats", "0xabc", "1/2") is None
+
+
+def test_disk_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    VerdictCache(disk_path=path).put("boats", "0xabc", "1/2", VERDICT)
+
+    other_worker = VerdictCache(disk_path=path)
+    assert other_worker.get("boats", "0xabc", "1/2") == VERDICT
+    assert other_worker.stats()["disk_hits"] == 1
+
+
+def test_funding_change_clears_the_disk_tier(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    cache = VerdictCache(disk_path=path)
+    cache.observe_funding("0xabc", "1/2")
+    cache.put("boats", "0xabc", "1/2", VERDICT)
+    cache.observe_funding("0xabc", "2/2")
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] == 0
+
+
+def test_disk_errors_fall_back_to_memory(tmp_path):
+    cache = VerdictCache(disk_path=str(tmp_path / "verdicts.sqlite3"))
+    cache.observe_funding("0xabc", "1/2")
+    cache.put("boats", "0xabc", "1/2", VERDICT)
+    cache.disk._conn.close()
+
+    # Every disk call now raises sqlite3.ProgrammingError
+    cache.observe_funding("0xabc", "2/2")
+    cache.put("boats", "0xabc", "2/2", VERDICT)
+    assert cache.get("boats", "0xabc", "2/2") == VERDICT
+    assert cache.get("other", "0xabc", "2/2") is None
+
+
+def test_key_includes_the_funding_state():
+    assert verdict_key("boats", "0xabc", "1/2") != verdict_key("boats", "0xabc", "2/2")
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, Request
+import main
+
+
+class FakeClaimsTable:
+    """gods-hand-claims in memory, honouring the simple SET and condition expressions the service uses"""
+
+    def __init__(self, items):
+        self.items = items
+        self.reads = []
+        self._lock = threading.Lock()
+
+    def get_item(self, Key, ConsistentRead=False, **kwargs):
+        self.reads.append(ConsistentRead)
+        item = self.items.get(Key["id"])
+        return {"Item": dict(item)} if item else {}
+
+    def _holds(self, item, condition, values):
+        for clause in condition.split(" AND "):
+            if clause.startswith("attribute_not_exists("):
+                if clause[len("attribute_not_exists("):-1] in item:
+                    return False
+                continue
+            name, operator, value = clause.split()
+            if (item.get(name) == values[value]) != (operator == "="):
+                return False
+        return True
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None, **kwargs):
+        with self._lock:
+            item = self.items[Key["id"]]
+            if ConditionExpression and not self._holds(item, ConditionExpression, ExpressionAttributeValues):
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}},
+                                  "UpdateItem")
+            for assignment in UpdateExpression.removeprefix("SET ").split(", "):
+                name, value = assignment.split(" = ")
+                item[name] = ExpressionAttributeValues[value]
+        return {}
+
+
+class FakeDynamoDB:
+    def __init__(self, table):
+        self.table = table
+        self.consistent = []
+
+    def batch_get_item(self, RequestItems):
+        request = RequestItems[main.CLAIMS_TABLE_NAME]
+        self.consistent.append(request.get("ConsistentRead", False))
+        found = [dict(self.table.items[key["id"]]) for key in request["Keys"] if key["id"] in self.table.items]
+        return {"Responses": {main.CLAIMS_TABLE_NAME: found}}
+
+
+class FakeUnlockApi:
+    def __init__(self, success=True):
+        self.success = success
+        self.calls = []
+
+    def post(self, url, json=None, **kwargs):
+        self.calls.append(json)
+        return SimpleNamespace(status_code=200, text="", json=lambda: {
+            "success": self.success, "data": {"transactionHash": f"0x{len(self.calls):064x}"}
+        })
+
+
+@pytest.fixture
+def claims(monkeypatch):
+    items = {
+        "c1": {"id": "c1", "claim_state": "voting", "claimed_amount": Decimal(10),
+               "organization_aztec_address": "0x" + "11" * 20},
+        "c2": {"id": "c2", "claim_state": "voting", "claimed_amount": Decimal(5),
+               "organization_aztec_address": "0x" + "22" * 20},
+    }
+    table = FakeClaimsTable(items)
+    unlock = FakeUnlockApi()
+    dynamodb = FakeDynamoDB(table)
+    monkeypatch.setattr(main, "voting_table", table)
+    monkeypatch.setattr(main, "dynamodb", dynamodb)
+    monkeypatch.setattr(main, "http_transport", unlock)
+    return SimpleNamespace(items=items, table=table, unlock=unlock, dynamodb=dynamodb)
+
+
+def vote(uuid, result="approve"):
+    return main.VoteInput(voteResult=result, uuid=uuid, disasterHash="0x" + "ab" * 32)
+
+
+def test_vote_reads_the_claim_consistently(claims):
+    main.load_and_apply_vote(vote("c1"))
+    assert claims.table.reads == [True]
+    assert claims.items["c1"]["claim_state"] == "approved"
+    assert claims.items["c1"]["claims_hash"] == f"0x{1:064x}"
+
+
+def test_second_approval_does_not_unlock_again(claims):
+    main.load_and_apply_vote(vote("c1"))
+    with pytest.raises(HTTPException) as raised:
+        main.load_and_apply_vote(vote("c1"))
+    assert raised.value.status_code == 409
+    assert len(claims.unlock.calls) == 1
+
+
+def test_approval_of_a_stale_row_is_refused_before_money_moves(claims):
+    stale = dict(claims.items["c1"])
+    # A re-vote changed the amount after this row was read
+    claims.items["c1"]["claimed_amount"] = Decimal(7)
+    with pytest.raises(HTTPException) as raised:
+        main.apply_vote(vote("c1"), stale)
+    assert raised.value.status_code == 409
+    assert claims.unlock.calls == []
+    assert claims.items["c1"]["claim_state"] == "voting"
+
+
+def test_failed_unlock_puts_the_claim_back_into_voting(claims):
+    claims.unlock.success = False
+    with pytest.raises(HTTPException) as raised:
+        main.load_and_apply_vote(vote("c1"))
+    assert raised.value.status_code == 500
+    assert claims.items["c1"]["claim_state"] == "voting"
+
+
+def test_unconfirmed_payout_keeps_the_claim_approved(claims, monkeypatch):
+    def unconfirmed(claim_uuid, recipient, amount_usdc):
+        raise main.PayoutPending("0x" + "ab" * 32, "Payout sent but not confirmed")
+
+    monkeypatch.setattr(main, "APPROVE_PAYOUT_MODE", "usdc")
+    monkeypatch.setattr(main, "pay_claim", unconfirmed)
+    with pytest.raises(HTTPException) as raised:
+        main.load_and_apply_vote(vote("c1"))
+    assert raised.value.status_code == 504
+    # Still approved and tied to the transaction, so voters cannot reopen and pay it again
+    assert claims.items["c1"]["claim_state"] == "approved"
+    assert claims.items["c1"]["claims_hash"] == "0x" + "ab" * 32
+
+
+def test_rejecting_a_paid_claim_is_refused(claims):
+    main.load_and_apply_vote(vote("c1"))
+    with pytest.raises(HTTPException) as raised:
+        main.load_and_apply_vote(vote("c1", "reject"))
+    assert raised.value.status_code == 409
+    assert claims.items["c1"]["claim_state"] == "approved"
+
+
+def test_batch_reads_consistently_and_pays_each_claim_once(claims):
+    request = Request({"type": "http", "headers": [], "client": ("test", 0)})
+    batch = main.BatchVoteInput(votes=[vote("c1"), vote("c2")])
+    first = asyncio.run(main.process_votes_batch(batch, request))
+    second = asyncio.run(main.process_votes_batch(batch, request))
+
+    assert claims.dynamodb.consistent == [True, True]
+    assert first["summary"]["succeeded"] == 2
+    assert [result["statusCode"] for result in second["results"]] == [409, 409]
+    assert len(claims.unlock.calls) == 2
+
+
+def reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def test_revote_takes_the_currency_amount_not_the_first_number(claims, monkeypatch):
+    monkeypatch.setattr(main, "tracked_completion", lambda *args, **kwargs: reply("We need 2 boats and 1500 USDC"))
+    result = main.load_and_apply_vote(vote("c1", "higher"))
+    assert result["newAmount"] == Decimal(1500)
+    assert claims.items["c1"]["claimed_amount"] == Decimal(1500)
+
+
+def test_revote_reply_without_label_or_currency_is_refused(claims, monkeypatch):
+    monkeypatch.setattr(main, "tracked_completion", lambda *args, **kwargs: reply("We need 2 boats"))
+    with pytest.raises(HTTPException) as raised:
+        main.load_and_apply_vote(vote("c1", "lower"))
+    assert raised.value.status_code == 500
+    assert claims.items["c1"]["claimed_amount"] == Decimal(10)
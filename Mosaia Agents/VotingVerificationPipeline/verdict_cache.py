@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+# How long a verdict stays valid even if funding never changes
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", "3600"))
+# Entries kept in the in-process tier
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "1024"))
+# Optional SQLite file shared by all workers on the host, e.g. /tmp/verdicts.sqlite3
+VERDICT_CACHE_PATH = os.getenv("VERDICT_CACHE_PATH")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    """Fold case, unicode forms and whitespace so trivially different resubmissions share a key"""
+    text = unicodedata.normalize("NFKC", statement or "").casefold()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def normalize_disaster_hash(disaster_hash):
+    return (disaster_hash or "").lower().removeprefix("0x")
+
+
+def funding_fingerprint(total_donated, target_amount):
+    """Stable string for the funding state a verdict was computed against"""
+    def canonical(value):
+        try:
+            return format(Decimal(str(value)).normalize(), "f")
+        except (InvalidOperation, ValueError):
+            return str(value)
+    return f"{canonical(total_donated)}/{canonical(target_amount)}"
+
+
+def verdict_key(statement, disaster_hash, fingerprint):
+    statement_hash = hashlib.sha256(normalize_statement(statement).encode()).hexdigest()
+    return f"{normalize_disaster_hash(disaster_hash)}:{fingerprint}:{statement_hash}"
+
+
+class _DiskTier:
+    """SQLite-backed tier so several uvicorn workers can share verdicts"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key TEXT PRIMARY KEY, disaster_hash TEXT, fingerprint TEXT, "
+                "created_at REAL, payload TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_disaster ON verdicts (disaster_hash)")
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, payload FROM verdicts WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or now - row[0] > VERDICT_CACHE_TTL:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key, disaster_hash, fingerprint, created_at, payload):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)",
+                (key, disaster_hash, fingerprint, created_at, json.dumps(payload, default=str))
+            )
+
+    def invalidate_stale(self, disaster_hash, fingerprint):
+        """Drop verdicts for this disaster computed against any other funding state"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE disaster_hash = ? AND fingerprint != ?",
+                (disaster_hash, fingerprint)
+            )
+
+
+class VerdictCache:
+    """Fact-check verdicts keyed by petition text, disaster and funding state"""
+
+    def __init__(self, max_entries=VERDICT_CACHE_SIZE, disk_path=VERDICT_CACHE_PATH, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        # Last funding state seen per disaster, least recently seen first. Keys already carry the
+        # fingerprint, so forgetting one only skips an eager cleanup; it never serves a stale verdict
+        self._fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.disk = None
+        if disk_path:
+            try:
+                self.disk = _DiskTier(disk_path)
+                print(f"[CACHE] Shared verdict cache at {disk_path}")
+            except sqlite3.Error as e:
+                print(f"[WARN] Shared verdict cache disabled: {e}")
+
+    def observe_funding(self, disaster_hash, fingerprint):
+        """Invalidate a disaster's verdicts as soon as its funding state is seen to change"""
+        disaster_hash = normalize_disaster_hash(disaster_hash)
+        with self._lock:
+            previous = self._fingerprints.get(disaster_hash)
+            self._fingerprints[disaster_hash] = fingerprint
+            self._fingerprints.move_to_end(disaster_hash)
+            while len(self._fingerprints) > self.max_entries:
+                self._fingerprints.popitem(last=False)
+            if previous is None or previous == fingerprint:
+                return
+            stale = [key for key in self._entries if key.startswith(f"{disaster_hash}:")
+                     and not key.startswith(f"{disaster_hash}:{fingerprint}:")]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+        print(f"[CACHE] Funding changed for {disaster_hash} ({previous} -> {fingerprint}), dropped {len(stale)} verdict(s)")
+        if self.disk:
+            try:
+                self.disk.invalidate_stale(disaster_hash, fingerprint)
+            except sqlite3.Error as e:
+                # The stale rows are keyed by the old fingerprint, so they can no longer be read anyway
+                print(f"[WARN] Shared verdict cache invalidation failed: {e}")
+
+    def get(self, statement, disaster_hash, fingerprint):
+        key = verdict_key(statement, disaster_hash, fingerprint)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] <= VERDICT_CACHE_TTL:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        if self.disk:
+            try:
+                entry = self.disk.get(key, now)
+            except sqlite3.Error as e:
+                print(f"[WARN] Shared verdict cache read failed: {e}")
+                entry = None
+            if entry:
+                with self._lock:
+                    self._store(key, entry)
+                    self.disk_hits += 1
+                return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, statement, disaster_hash, fingerprint, verdict):
+        key = verdict_key(statement, disaster_hash, fingerprint)
+        created_at = self.clock()
+        with self._lock:
+            self._store(key, (created_at, verdict))
+        if self.disk:
+            try:
+                self.disk.put(key, normalize_disaster_hash(disaster_hash), fingerprint, created_at, verdict)
+            except sqlite3.Error as e:
+                print(f"[WARN] Shared verdict cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "tracked_disasters": len(self._fingerprints),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "shared_tier": bool(self.disk),
+            }
+
+
+verdict_cache = VerdictCache()